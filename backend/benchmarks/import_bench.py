@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Spreadsheet import benchmark for RAIDMASTER Multi-AI API
+Generates a RAID log CSV, then imports it through the API under uvicorn once with a
+single worker process and once with one per core, reporting rows per second, the
+speedup and the latency of a cheap endpoint while the import runs.
+
+Usage: python backend/benchmarks/import_bench.py [--rows 200000] [--workers 1,0]
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from upload_bench import BACKEND_DIR, free_port, percentile, probe, wait_until_ready
+
+def write_csv(path: str, rows: int, seed: int = 7):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Type", "Title", "Description", "Status", "Priority", "Impact", "Likelihood",
+                         "Workstream", "Owner", "Due Date", "Tags"])
+        for i in range(rows):
+            writer.writerow([
+                rng.choice(["Risk", "Assumption", "Issue", "Dependency"]),
+                f"Imported item {i} for {rng.choice(['vendor', 'network', 'budget', 'migration'])}",
+                f"Description of item {i}, with a comma and a \"quoted\" phrase" + ("\nsecond line" if i % 10 == 0 else ""),
+                rng.choice(["Open", "In Progress", "Closed"]),
+                rng.choice(["P0", "P1", "P2", "P3"]),
+                rng.choice(["Low", "Medium", "High", "Critical"]),
+                rng.choice(["Low", "Medium", "High"]),
+                f"Workstream {i % 20}",
+                f"owner{i % 50}",
+                f"2027-{i % 12 + 1:02d}-15",
+                "imported;benchmark",
+            ])
+
+async def run_import(base_url: str, csv_path: str, interval: float) -> dict:
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None)) as session:
+        await wait_until_ready(session, base_url)
+        form = aiohttp.FormData()
+        form.add_field("file", open(csv_path, "rb"), filename="raid-log.csv", content_type="text/csv")
+        async with session.post(f"{base_url}/api/upload", data=form) as response:
+            file_id = (await response.json())["file"]["id"]
+
+        stop = asyncio.Event()
+        # The dashboard grows with the register, so probe the constant-time health check instead
+        probe_task = asyncio.create_task(probe(session, base_url, interval, stop, "/api/health"))
+        start = time.perf_counter()
+        async with session.post(f"{base_url}/api/upload/{file_id}/import", json={}) as response:
+            import_id = (await response.json())["import"]["id"]
+        while True:
+            async with session.get(f"{base_url}/api/imports/{import_id}") as response:
+                job = await response.json()
+            if job["status"] not in ("queued", "running"):
+                break
+            await asyncio.sleep(0.25)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        return {"job": job, "elapsed": elapsed, "latencies": await probe_task}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", default="1,0", help="Comma-separated worker counts, 0 for one per core")
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as workdir:
+        csv_path = os.path.join(workdir, "raid-log.csv")
+        write_csv(csv_path, args.rows)
+        print(f"Importing {args.rows} rows ({os.path.getsize(csv_path) / 1e6:.1f} MB) on {os.cpu_count()} cores:")
+
+        baseline = None
+        for workers in (int(w) for w in args.workers.split(",")):
+            port = free_port()
+            env = {
+                **os.environ,
+                "RAID_UPLOAD_DIR": os.path.join(workdir, f"uploads-{workers}"),
+                "RAID_DATA_DIR": os.path.join(workdir, f"data-{workers}"),
+                "IMPORT_WORKERS": str(workers),
+                "AI_HEALTH_PROBE_INTERVAL": "0",
+            }
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+                cwd=BACKEND_DIR, env=env
+            )
+            try:
+                result = asyncio.run(run_import(f"http://127.0.0.1:{port}", csv_path, args.probe_interval))
+            finally:
+                server.terminate()
+                server.wait()
+
+            job, elapsed, latencies = result["job"], result["elapsed"], result["latencies"]
+            ok = job["status"] == "succeeded" and job["rows_imported"] == args.rows
+            failures += not ok
+            baseline = baseline or elapsed
+            label = f"{workers or os.cpu_count()} worker(s)"
+            print(f"  {'✅' if ok else '❌'} {label:<12} {elapsed:7.2f}s  {args.rows / elapsed:9.0f} rows/s  "
+                  f"speedup {baseline / elapsed:4.2f}x  probe p50 {percentile(latencies, 50):6.2f} ms  "
+                  f"p99 {percentile(latencies, 99):6.2f} ms")
+            if not ok:
+                print(f"    {job['status']}: {job['error']} ({job['rows_imported']} imported, {job['rows_failed']} failed)")
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for RAIDMASTER Multi-AI API at realistic register sizes
+For each register size, starts the API in a uvicorn subprocess, seeds it with synthetic
+RAID items through the spreadsheet import, then drives a weighted mix of CRUD, list,
+dashboard, upload and mock-AI requests from many concurrent clients. Reports throughput
+and p50/p95/p99 latency per operation and writes the results as JSON, optionally
+comparing them with an earlier results file.
+
+Usage: python backend/benchmarks/load_bench.py [--sizes 10000,100000,1000000] [--clients 64]
+       [--duration 30] [--output load-results.json] [--compare previous-results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from import_bench import write_csv
+from upload_bench import BACKEND_DIR, free_port, percentile, wait_until_ready
+
+DEFAULT_MIX = "read=30,create=10,update=10,delete=5,list=2,dashboard=15,upload=3,analyze=10,health=15"
+MOCK_PROVIDER_ID = "load-bench-mock"
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Unknown operation {name.strip()!r}, expected one of {', '.join(OPERATIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def synthetic_item(rng: random.Random, n: int) -> dict:
+    return {
+        "type": rng.choice(["Risk", "Assumption", "Issue", "Dependency"]),
+        "title": f"Load test item {n} about {rng.choice(['vendor', 'network', 'budget', 'migration'])}",
+        "description": f"Synthetic description {n}: the {rng.choice(['supplier', 'team', 'platform'])} "
+                       f"may slip by {rng.randint(1, 12)} weeks and affect the release",
+        "status": rng.choice(["Open", "In Progress", "Mitigating"]),
+        "priority": rng.choice(["P0", "P1", "P2", "P3"]),
+        "impact": rng.choice(["Low", "Medium", "High", "Critical"]),
+        "likelihood": rng.choice(["Low", "Medium", "High"]),
+        "workstream": f"Workstream {n % 20}",
+        "owner": f"owner{n % 50}",
+    }
+
+class Workload:
+    """Shared state of one run: the live item ids the clients read, update and delete"""
+    def __init__(self, session: aiohttp.ClientSession, base_url: str, args):
+        self.session = session
+        self.base_url = base_url
+        self.args = args
+        self.ids = []
+        self.counter = 0
+        self.upload_body = os.urandom(args.upload_kb * 1024)
+
+    def pick_id(self, rng: random.Random):
+        return rng.choice(self.ids) if self.ids else None
+
+async def op_read(w: Workload, rng: random.Random):
+    item_id = w.pick_id(rng)
+    return await request(w, "GET", f"/api/raid-items/{item_id}") if item_id else await op_create(w, rng)
+
+async def op_create(w: Workload, rng: random.Random):
+    w.counter += 1
+    status, body = await request(w, "POST", "/api/raid-items", json=synthetic_item(rng, w.counter), parse=True)
+    if status == 200:
+        w.ids.append(body["item"]["id"])
+    return status, body
+
+async def op_update(w: Workload, rng: random.Random):
+    item_id = w.pick_id(rng)
+    if not item_id:
+        return await op_create(w, rng)
+    update = {"status": rng.choice(["Open", "In Progress", "Mitigating"]), "owner": f"owner{rng.randint(0, 49)}"}
+    return await request(w, "PUT", f"/api/raid-items/{item_id}", json=update)
+
+async def op_delete(w: Workload, rng: random.Random):
+    # Keep a working set around so reads and updates have something to hit
+    if len(w.ids) <= w.args.working_set // 2:
+        return await op_create(w, rng)
+    item_id = w.ids.pop(rng.randrange(len(w.ids)))
+    return await request(w, "DELETE", f"/api/raid-items/{item_id}")
+
+async def op_list(w: Workload, rng: random.Random):
+    return await request(w, "GET", "/api/raid-items")
+
+async def op_dashboard(w: Workload, rng: random.Random):
+    return await request(w, "GET", "/api/raid-items/stats/dashboard")
+
+async def op_health(w: Workload, rng: random.Random):
+    return await request(w, "GET", "/api/health")
+
+async def op_upload(w: Workload, rng: random.Random):
+    form = aiohttp.FormData()
+    form.add_field("file", w.upload_body, filename=f"evidence-{rng.randrange(1 << 30)}.bin",
+                   content_type="application/octet-stream")
+    return await request(w, "POST", "/api/upload", data=form)
+
+async def op_analyze(w: Workload, rng: random.Random):
+    payload = {"item": synthetic_item(rng, rng.randrange(1 << 30)), "provider_id": MOCK_PROVIDER_ID, "force": True}
+    return await request(w, "POST", "/api/analyze", json=payload)
+
+OPERATIONS = {
+    "read": op_read, "create": op_create, "update": op_update, "delete": op_delete, "list": op_list,
+    "dashboard": op_dashboard, "health": op_health, "upload": op_upload, "analyze": op_analyze,
+}
+
+async def request(w: Workload, method: str, path: str, parse: bool = False, **kwargs) -> tuple:
+    async with w.session.request(method, f"{w.base_url}{path}", **kwargs) as response:
+        body = await response.json(content_type=None) if parse else await response.read()
+        return response.status, body
+
+async def client(w: Workload, mix: dict, seed: int, deadline: float, samples: dict):
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            status, _ = await OPERATIONS[name](w, rng)
+            ok = status < 400
+        except aiohttp.ClientError:
+            ok = False
+        samples[name].append(((time.perf_counter() - start) * 1000, ok))
+
+async def seed_register(session: aiohttp.ClientSession, base_url: str, csv_path: str) -> dict:
+    form = aiohttp.FormData()
+    form.add_field("file", open(csv_path, "rb"), filename="seed.csv", content_type="text/csv")
+    async with session.post(f"{base_url}/api/upload", data=form) as response:
+        file_id = (await response.json())["file"]["id"]
+    async with session.post(f"{base_url}/api/upload/{file_id}/import", json={}) as response:
+        import_id = (await response.json())["import"]["id"]
+    while True:
+        async with session.get(f"{base_url}/api/imports/{import_id}") as response:
+            job = await response.json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        await asyncio.sleep(0.5)
+
+def summarize(samples: dict, elapsed: float) -> dict:
+    operations = {}
+    for name, results in samples.items():
+        if not results:
+            continue
+        latencies = [latency for latency, _ in results]
+        operations[name] = {
+            "count": len(results),
+            "errors": sum(not ok for _, ok in results),
+            "throughput_rps": round(len(results) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(max(latencies), 2),
+        }
+    all_latencies = [latency for results in samples.values() for latency, _ in results]
+    total = {
+        "count": len(all_latencies),
+        "errors": sum(op["errors"] for op in operations.values()),
+        "throughput_rps": round(len(all_latencies) / elapsed, 2),
+        "p50_ms": round(percentile(all_latencies, 50), 2),
+        "p95_ms": round(percentile(all_latencies, 95), 2),
+        "p99_ms": round(percentile(all_latencies, 99), 2),
+        "max_ms": round(max(all_latencies, default=0), 2),
+    }
+    return {"operations": operations, "total": total}
+
+async def run_size(base_url: str, size: int, csv_path: str, mix: dict, args) -> dict:
+    connector = aiohttp.TCPConnector(limit=args.clients)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=None)) as session:
+        await wait_until_ready(session, base_url)
+        start = time.perf_counter()
+        job = await seed_register(session, base_url, csv_path)
+        seed_seconds = time.perf_counter() - start
+        if job["status"] != "succeeded":
+            raise RuntimeError(f"Seeding failed: {job['status']} {job.get('error')}")
+
+        provider = {"id": MOCK_PROVIDER_ID, "name": "Load bench mock", "provider": "mock", "model": args.mock_model,
+                    "api_key": "mock-key", "status": "active", "options": {"seed": args.seed}}
+        async with session.post(f"{base_url}/api/ai/providers", json=provider) as response:
+            response.raise_for_status()
+
+        workload = Workload(session, base_url, args)
+        rng = random.Random(args.seed)
+        for _ in range(args.working_set):
+            await op_create(workload, rng)
+
+        samples = {name: [] for name in mix}
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(client(workload, mix, args.seed + i, deadline, samples) for i in range(args.clients)))
+        elapsed = time.perf_counter() - start
+        return {"size": size, "seed_seconds": round(seed_seconds, 2), "duration_seconds": round(elapsed, 2),
+                **summarize(samples, elapsed)}
+
+def report(run: dict):
+    print(f"\n{run['size']:,} items (seeded in {run['seed_seconds']:.1f}s), {run['duration_seconds']:.0f}s run:")
+    print(f"  {'operation':<10} {'count':>7} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for name, op in list(run["operations"].items()) + [("TOTAL", run["total"])]:
+        print(f"  {name:<10} {op['count']:>7} {op['errors']:>6} {op['throughput_rps']:>9.1f} {op['p50_ms']:>9.2f} "
+              f"{op['p95_ms']:>9.2f} {op['p99_ms']:>9.2f} {op['max_ms']:>9.2f}")
+
+def compare(results: dict, previous: dict):
+    """Print throughput and p95 change per size and operation against an earlier results file"""
+    previous_runs = {run["size"]: run for run in previous.get("runs", [])}
+    print(f"\nCompared with {previous['meta'].get('git_commit') or 'previous run'}:")
+    for run in results["runs"]:
+        before = previous_runs.get(run["size"])
+        if not before:
+            continue
+        print(f"  {run['size']:,} items")
+        for name, op in list(run["operations"].items()) + [("TOTAL", run["total"])]:
+            old = before["total"] if name == "TOTAL" else before["operations"].get(name)
+            if not old or not old["throughput_rps"] or not old["p95_ms"]:
+                continue
+            rps_change = (op["throughput_rps"] / old["throughput_rps"] - 1) * 100
+            p95_change = (op["p95_ms"] / old["p95_ms"] - 1) * 100
+            print(f"    {name:<10} req/s {rps_change:+7.1f}%   p95 {p95_change:+7.1f}%")
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated register sizes to seed")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load per register size")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated operation=weight pairs")
+    parser.add_argument("--working-set", type=int, default=500, help="Items created up front for reads and writes")
+    parser.add_argument("--upload-kb", type=int, default=256)
+    parser.add_argument("--mock-model", default="mock-fast", help="mock-fast, mock-realistic or mock-flaky")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="load-results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    results = {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "runs": [],
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in (int(s) for s in args.sizes.split(",")):
+            csv_path = os.path.join(workdir, f"seed-{size}.csv")
+            write_csv(csv_path, size, seed=args.seed)
+            port = free_port()
+            env = {
+                **os.environ,
+                "RAID_UPLOAD_DIR": os.path.join(workdir, f"uploads-{size}"),
+                "RAID_DATA_DIR": os.path.join(workdir, f"data-{size}"),
+                "AI_HEALTH_PROBE_INTERVAL": "0",
+            }
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+                cwd=BACKEND_DIR, env=env
+            )
+            try:
+                run = asyncio.run(run_size(f"http://127.0.0.1:{port}", size, csv_path, mix, args))
+            finally:
+                server.terminate()
+                server.wait()
+                os.remove(csv_path)
+            results["runs"].append(run)
+            report(run)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
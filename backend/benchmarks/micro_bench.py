@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks with regression baselines for RAIDMASTER Multi-AI API hot helpers
+Times severity scoring, history entries, prompt building, reply parsing, the RAIDItem
+validation and .dict() round trip and the dashboard loops, then compares the fastest run
+of each (the least noisy statistic) with a stored JSON baseline and exits non-zero when
+any benchmark is slower than the threshold allows. Baselines are machine-specific: save
+one before a change, compare after.
+
+Usage: python backend/benchmarks/micro_bench.py [--filter prompt] [--threshold 15]
+       [--save] [--baseline backend/benchmarks/baselines/micro_bench.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+from server import (  # noqa: E402
+    RAIDItem, RAIDItemCreate, _register_stats, add_history_entry, ai_manager, build_raid_item,
+    calculate_severity_score, get_dashboard_stats
+)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(BENCH_DIR, "fixtures", "malformed_replies.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines", "micro_bench.json")
+REGISTER_SIZE = 10000
+
+def item_payload(rng: random.Random, n: int, description_sentences: int = 2) -> dict:
+    sentences = [f"The {rng.choice(['vendor', 'network team', 'platform'])} may slip delivery by "
+                 f"{rng.randint(1, 12)} weeks, affecting the {rng.choice(['launch', 'migration', 'audit'])}."
+                 for _ in range(description_sentences)]
+    return {
+        "type": rng.choice(["Risk", "Assumption", "Issue", "Dependency"]),
+        "title": f"Benchmark item {n} about vendor delivery",
+        "description": " ".join(sentences),
+        "status": rng.choice(["Open", "In Progress", "Mitigating", "Closed"]),
+        "priority": rng.choice(["P0", "P1", "P2", "P3"]),
+        "impact": rng.choice(["Low", "Medium", "High", "Critical"]),
+        "likelihood": rng.choice(["Low", "Medium", "High"]),
+        "workstream": f"Workstream {n % 20}",
+        "owner": f"owner{n % 50}",
+        "dueDate": f"202{rng.randint(4, 8)}-{rng.randint(1, 12):02d}-15",
+    }
+
+def run_coroutine(coroutine_function):
+    """Run a coroutine that never suspends without the overhead of an event loop"""
+    coroutine = coroutine_function()
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coroutine.close()
+    raise RuntimeError(f"{coroutine_function.__name__} suspended; it cannot be timed synchronously")
+
+# Each setup returns the zero-argument callable to time
+
+def bench_severity_score():
+    pairs = [(impact, likelihood) for impact in ("Low", "Medium", "High", "Critical", "Unknown")
+             for likelihood in ("Low", "Medium", "High")]
+
+    def score_all():
+        for impact, likelihood in pairs:
+            calculate_severity_score(impact, likelihood)
+    return score_all
+
+def bench_add_history_entry():
+    item = RAIDItem(**build_raid_item(RAIDItemCreate(**item_payload(random.Random(1), 1))))
+
+    def add():
+        add_history_entry(item, "Item Updated", "Benchmark", "status changed")
+        if len(item.history) > 1000:
+            del item.history[1:]
+    return add
+
+def bench_build_prompt(analysis_type: str, description_sentences: int):
+    def setup():
+        item = RAIDItem(**item_payload(random.Random(2), 2, description_sentences))
+        return lambda: ai_manager._build_analysis_prompt(item, analysis_type)
+    return setup
+
+def bench_parse_reply(case_names: tuple):
+    def setup():
+        with open(CORPUS_PATH, encoding="utf-8") as f:
+            replies = [case["reply"] for case in json.load(f) if case["name"] in case_names]
+
+        def parse():
+            for reply in replies:
+                ai_manager._parse_ai_response(reply, "analysis")
+        return parse
+    return setup
+
+def bench_item_validate():
+    stored = build_raid_item(RAIDItemCreate(**item_payload(random.Random(3), 3)))
+    return lambda: RAIDItem(**stored)
+
+def bench_item_dict():
+    item = RAIDItem(**build_raid_item(RAIDItemCreate(**item_payload(random.Random(4), 4))))
+    return item.dict
+
+def bench_item_round_trip():
+    stored = build_raid_item(RAIDItemCreate(**item_payload(random.Random(5), 5)))
+    return lambda: RAIDItem(**stored).dict()
+
+def seeded_register() -> list:
+    rng = random.Random(6)
+    return [build_raid_item(RAIDItemCreate(**item_payload(rng, n))) for n in range(REGISTER_SIZE)]
+
+def bench_dashboard_stats():
+    server.raid_items_db[:] = seeded_register()
+    return lambda: run_coroutine(get_dashboard_stats)
+
+def bench_register_stats():
+    items = seeded_register()
+    return lambda: _register_stats(items)
+
+BENCHMARKS = {
+    "calculate_severity_score_15_pairs": bench_severity_score,
+    "add_history_entry": bench_add_history_entry,
+    "build_analysis_prompt": bench_build_prompt("analysis", 2),
+    "build_validation_prompt": bench_build_prompt("validation", 2),
+    "build_analysis_prompt_long_description": bench_build_prompt("analysis", 400),
+    "parse_ai_response_clean": bench_parse_reply(("plain_json", "json_code_fence")),
+    "parse_ai_response_messy": bench_parse_reply(("trailing_prose_with_braces", "two_objects_answer_first",
+                                                  "trailing_commas", "truncated_stream")),
+    "raid_item_validate": bench_item_validate,
+    "raid_item_dict": bench_item_dict,
+    "raid_item_validate_dict_round_trip": bench_item_round_trip,
+    f"dashboard_stats_{REGISTER_SIZE}_items": bench_dashboard_stats,
+    f"register_stats_{REGISTER_SIZE}_items": bench_register_stats,
+}
+
+def run_benchmarks(names: list, repeat: int, min_time: float) -> dict:
+    """Minimum and median µs per call over `repeat` runs of at least `min_time` seconds.
+
+    Runs are interleaved round-robin across benchmarks, so a burst of noise on a shared
+    machine slows one run of every benchmark instead of all runs of a few.
+    """
+    timers = {}
+    for name in names:
+        timer = timeit.Timer(BENCHMARKS[name]())
+        number, elapsed = timer.autorange()
+        timers[name] = (timer, max(1, int(number * min_time / max(elapsed, 1e-9))))
+
+    runs = {name: [] for name in names}
+    for _ in range(repeat):
+        for name, (timer, number) in timers.items():
+            runs[name].append(timer.timeit(number) / number * 1e6)
+
+    return {
+        name: {"min_us": round(min(times), 4), "median_us": round(statistics.median(times), 4),
+               "stdev_us": round(statistics.stdev(times), 4) if len(times) > 1 else 0.0,
+               "number": timers[name][1]}
+        for name, times in runs.items()
+    }
+
+def compare(results: dict, baseline: dict, threshold: float) -> int:
+    print(f"\nCompared with baseline from {baseline['meta'].get('timestamp', '?')} "
+          f"({baseline['meta'].get('python', '?')}, regression threshold {threshold:.0f}%):")
+    regressions = 0
+    for name, result in results.items():
+        before = baseline["benchmarks"].get(name)
+        if not before:
+            print(f"  {'NEW':<6} {name}")
+            continue
+        change = (result["min_us"] / before["min_us"] - 1) * 100
+        if change > threshold:
+            status = "❌ SLOWER"
+            regressions += 1
+        elif change < -threshold:
+            status = "✅ FASTER"
+        else:
+            status = "   same"
+        print(f"  {status:<9} {name:<42} {before['min_us']:>11.2f} → {result['min_us']:>11.2f} µs "
+              f"({change:+6.1f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="Seconds per timed run")
+    parser.add_argument("--threshold", type=float, default=15, help="Percent slowdown reported as a regression")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks([name for name in BENCHMARKS if args.filter in name], args.repeat, args.min_time)
+    print("Microbenchmarks (µs per call, fastest and median run):")
+    for name, result in results.items():
+        print(f"  {name:<42} {result['min_us']:>11.2f}   median {result['median_us']:>11.2f}   "
+              f"±{result['stdev_us']:.2f}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f).get("benchmarks", {})
+        meta = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                "platform": platform.platform(), "cpu_count": os.cpu_count()}
+        with open(args.baseline, "w") as f:
+            json.dump({"meta": meta, "benchmarks": {**baseline, **results}}, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
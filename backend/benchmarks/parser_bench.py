@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Structured-output parser checks and microbenchmark for RAIDMASTER Multi-AI API
+Runs the fuzz corpus of real-world malformed LLM replies through parse_ai_reply, whole
+and in streamed chunks, mutates it randomly to make sure the parser never raises, and
+times it against the previous find('{')/rfind('}') + json.loads approach.
+
+Usage: python backend/benchmarks/parser_bench.py [--iterations 2000] [--fuzz-cases 5000]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import JSONObjectExtractor, ParsedAIResponse, parse_ai_reply  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "malformed_replies.json")
+CHUNK_SIZES = (1, 7, 64)
+
+def legacy_parse(response: str):
+    """The parser this replaced, kept for timing comparison"""
+    try:
+        start = response.find('{')
+        end = response.rfind('}') + 1
+        if start >= 0 and end > start:
+            return json.loads(response[start:end])
+        return None
+    except Exception:
+        return None
+
+def parse_chunked(reply: str, chunk_size: int) -> ParsedAIResponse:
+    extractor = JSONObjectExtractor()
+    for i in range(0, len(reply), chunk_size):
+        extractor.feed(reply[i:i + chunk_size])
+    return parse_ai_reply(reply, extractor)
+
+def check_expectations(parsed: ParsedAIResponse, expect: dict) -> list:
+    errors = []
+    for key, expected in expect.items():
+        actual = len(parsed.flags) if key == "flag_count" else getattr(parsed, key)
+        if isinstance(expected, float) and isinstance(actual, float):
+            matches = abs(actual - expected) < 1e-9
+        else:
+            matches = actual == expected
+        if not matches:
+            errors.append(f"{key}: expected {expected!r}, got {actual!r}")
+    return errors
+
+def run_corpus(corpus: list) -> int:
+    failures = 0
+    for case in corpus:
+        errors = check_expectations(parse_ai_reply(case["reply"]), case["expect"])
+        for chunk_size in CHUNK_SIZES:
+            errors += [f"chunk={chunk_size} {e}" for e in
+                       check_expectations(parse_chunked(case["reply"], chunk_size), case["expect"])]
+        status = "✅ PASS" if not errors else "❌ FAIL"
+        print(f"{status} {case['name']}")
+        for error in errors:
+            print(f"    {error}")
+        failures += bool(errors)
+    return failures
+
+def mutate(reply: str, rng: random.Random) -> str:
+    operations = [
+        lambda s, i: s[:i],                              # truncate
+        lambda s, i: s[:i] + rng.choice('{}"\\,:[]') + s[i:],  # inject a structural character
+        lambda s, i: s[:i] + s[i + 1:],                  # drop a character
+        lambda s, i: s + s[i:],                          # duplicate a tail
+        lambda s, i: "```json\n" + s + "\n```",          # fence
+    ]
+    for _ in range(rng.randint(1, 4)):
+        reply = rng.choice(operations)(reply, rng.randint(0, len(reply)))
+    return reply
+
+def run_fuzz(corpus: list, cases: int, seed: int) -> int:
+    rng = random.Random(seed)
+    failures = 0
+    for _ in range(cases):
+        reply = mutate(rng.choice(corpus)["reply"], rng)
+        try:
+            for parsed in (parse_ai_reply(reply), parse_chunked(reply, rng.randint(1, 32))):
+                assert parsed.suggestedPriority in ("P0", "P1", "P2", "P3")
+                assert 0.0 <= parsed.confidence <= 1.0
+                assert all(isinstance(flag, dict) for flag in parsed.flags)
+        except Exception as e:
+            failures += 1
+            if failures <= 5:
+                print(f"❌ FUZZ {type(e).__name__}: {e} for {reply[:80]!r}")
+    print(f"{'✅' if not failures else '❌'} Fuzzed {cases} mutated replies, {failures} failures")
+    return failures
+
+def time_per_call(fn, replies: list, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for reply in replies:
+            fn(reply)
+    return (time.perf_counter() - start) / (iterations * len(replies)) * 1e6
+
+def run_benchmark(corpus: list, iterations: int):
+    replies = [case["reply"] for case in corpus]
+    long_reply = "Let me think about this carefully. " * 200 + replies[0]
+
+    print("\nParser microbenchmark (µs per reply):")
+    rows = [
+        ("legacy find/rfind", lambda r: legacy_parse(r)),
+        ("parse_ai_reply", lambda r: parse_ai_reply(r)),
+        ("parse_ai_reply chunked(64)", lambda r: parse_chunked(r, 64)),
+    ]
+    for name, fn in rows:
+        corpus_us = time_per_call(fn, replies, iterations)
+        long_us = time_per_call(fn, [long_reply], iterations)
+        print(f"  {name:<28} corpus {corpus_us:8.2f}   long prose reply {long_us:8.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--fuzz-cases", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    failures = run_corpus(corpus)
+    failures += run_fuzz(corpus, args.fuzz_cases, args.seed)
+    run_benchmark(corpus, args.iterations)
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
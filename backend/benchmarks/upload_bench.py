@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Upload responsiveness benchmark for RAIDMASTER Multi-AI API
+Starts the API in a uvicorn subprocess, measures the latency of a cheap endpoint at a
+steady rate, then repeats the measurement while several large uploads stream in
+concurrently. With uploads written off the event loop the two latency profiles should
+match. Finally checks that an upload over the size limit is rejected with 413.
+
+Usage: python backend/benchmarks/upload_bench.py [--uploads 4] [--size-mb 500]
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BLOCK = os.urandom(1024 * 1024)
+
+class SyntheticFile(io.RawIOBase):
+    """A readable stream of `size` bytes generated on the fly, so the client holds no file"""
+    def __init__(self, size: int):
+        self.remaining = size
+        self.offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = min(len(buffer), self.remaining, len(BLOCK) - self.offset)
+        buffer[:count] = BLOCK[self.offset:self.offset + count]
+        self.offset = (self.offset + count) % len(BLOCK)
+        self.remaining -= count
+        return count
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def wait_until_ready(session: aiohttp.ClientSession, base_url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            async with session.get(f"{base_url}/api/raid-items") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+async def probe(session: aiohttp.ClientSession, base_url: str, interval: float, stop: asyncio.Event,
+                path: str = "/api/raid-items/stats/dashboard") -> list:
+    """Request a cheap endpoint every `interval` seconds and return latencies in ms"""
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        async with session.get(f"{base_url}{path}") as response:
+            await response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+async def upload(session: aiohttp.ClientSession, base_url: str, size: int, name: str) -> tuple:
+    form = aiohttp.FormData()
+    form.add_field("file", SyntheticFile(size), filename=name, content_type="application/octet-stream")
+    start = time.perf_counter()
+    async with session.post(f"{base_url}/api/upload", data=form) as response:
+        body = await response.json(content_type=None)
+        return response.status, body, time.perf_counter() - start
+
+async def measure(session, base_url, interval, seconds=None, workload=None) -> tuple:
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(session, base_url, interval, stop))
+    results = None
+    if workload:
+        results = await workload
+    else:
+        await asyncio.sleep(seconds)
+    stop.set()
+    return await probe_task, results
+
+def report(label: str, latencies: list):
+    print(f"  {label:<22} n={len(latencies):<5} p50 {percentile(latencies, 50):7.2f} ms   "
+          f"p95 {percentile(latencies, 95):7.2f} ms   p99 {percentile(latencies, 99):7.2f} ms   "
+          f"max {max(latencies, default=0):7.2f} ms")
+
+async def run(args, base_url: str) -> int:
+    size = args.size_mb * 1024 * 1024
+    timeout = aiohttp.ClientTimeout(total=None)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        await wait_until_ready(session, base_url)
+
+        baseline, _ = await measure(session, base_url, args.probe_interval, seconds=args.baseline_seconds)
+        uploads = asyncio.gather(*(upload(session, base_url, size, f"bench-{i}.bin") for i in range(args.uploads)))
+        during, results = await measure(session, base_url, args.probe_interval, workload=uploads)
+
+        print(f"\nProbe latency, {args.uploads} concurrent uploads of {args.size_mb} MB:")
+        report("idle", baseline)
+        report("during uploads", during)
+
+        failures = 0
+        for status, body, elapsed in results:
+            ok = status == 200 and body["file"]["size"] == size
+            failures += not ok
+            print(f"  {'✅' if ok else '❌'} upload {status} in {elapsed:6.2f}s "
+                  f"({args.size_mb / elapsed:7.1f} MB/s)")
+
+        status, _, elapsed = await upload(session, base_url, size + 1024 * 1024, "too-large.bin")
+        ok = status == 413
+        failures += not ok
+        print(f"  {'✅' if ok else '❌'} oversized upload rejected with {status} after {elapsed:.2f}s")
+        return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=4)
+    parser.add_argument("--size-mb", type=int, default=500)
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    parser.add_argument("--baseline-seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {
+            **os.environ,
+            "RAID_UPLOAD_DIR": os.path.join(workdir, "uploads"),
+            "RAID_DATA_DIR": os.path.join(workdir, "data"),
+            "UPLOAD_MAX_BYTES": str(args.size_mb * 1024 * 1024),
+            "AI_HEALTH_PROBE_INTERVAL": "0",
+        }
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env
+        )
+        try:
+            failures = asyncio.run(run(args, f"http://127.0.0.1:{port}"))
+        finally:
+            server.terminate()
+            server.wait()
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
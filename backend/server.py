@@ -2,15 +2,20 @@ import os
 import json
 import asyncio
 import uuid
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import hashlib
+import re
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Set
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 import aiohttp
 import time
+import random
+from collections import OrderedDict, deque
 
 # Load environment variables
 load_dotenv()
@@ -29,7 +34,501 @@ app.add_middleware(
 # In-memory storage (replace with database in production)
 raid_items_db = []
 ai_providers_db = []
-upload_files_db = []
+
+# Directory for state that must survive restarts
+DATA_DIR = os.getenv("RAID_DATA_DIR", "/app/data")
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+import bisect
+from collections import Counter
+from operator import itemgetter
+from fastapi.responses import PlainTextResponse
+
+# Seconds, from a cached lookup up to a slow LLM call
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Metric:
+    """A named metric with one value per combination of label values.
+
+    Label values are passed as a tuple in the order of `labels`, so recording is a
+    single dict update with no allocation beyond the first sample.
+    """
+    type = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values: Dict[tuple, Any] = {}
+
+    def samples(self):
+        """Yield (suffix, label names, label values, value) for the exposition format"""
+        for label_values, value in self.values.items():
+            yield "", self.labels, label_values, value
+
+class CounterMetric(Metric):
+    type = "counter"
+
+    def inc(self, label_values: tuple = (), amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def set(self, label_values: tuple, value: float):
+        """Mirror a monotonic count that is kept elsewhere"""
+        self.values[label_values] = value
+
+class GaugeMetric(Metric):
+    type = "gauge"
+
+    def set(self, label_values: tuple, value: float):
+        self.values[label_values] = value
+
+    def inc(self, label_values: tuple = (), amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def dec(self, label_values: tuple = (), amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) - amount
+
+class HistogramMetric(Metric):
+    """Fixed-bucket histogram; each value is [per-bucket counts incl. +Inf, sum, count]"""
+    type = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+
+    def observe(self, label_values: tuple, value: float):
+        child = self.values.get(label_values)
+        if child is None:
+            child = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        child[0][bisect.bisect_left(self.buckets, value)] += 1
+        child[1] += value
+        child[2] += 1
+
+    def samples(self):
+        bucket_labels = self.labels + ("le",)
+        bounds = [repr(float(b)) for b in self.buckets] + ["+Inf"]
+        for label_values, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                yield "_bucket", bucket_labels, label_values + (bound,), cumulative
+            yield "_sum", self.labels, label_values, total
+            yield "_count", self.labels, label_values, count
+
+def _format_metric_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+class MetricsRegistry:
+    """Metrics rendered in the Prometheus text exposition format.
+
+    Hot paths only update registered metrics in place. Everything that can be read off
+    existing state (item counts, queue depth, cache counters) is refreshed by collectors
+    when the endpoint is scraped, so it costs nothing per request.
+    """
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> CounterMetric:
+        return self.register(CounterMetric(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: tuple = ()) -> GaugeMetric:
+        return self.register(GaugeMetric(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> HistogramMetric:
+        return self.register(HistogramMetric(name, help_text, labels, buckets))
+
+    def collector(self, collect):
+        """Register a function (or coroutine function) that refreshes metrics from
+        application state before a scrape"""
+        self.collectors.append(collect)
+        return collect
+
+    async def render(self) -> str:
+        for collect in self.collectors:
+            try:
+                result = collect()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                METRICS_COLLECTOR_ERRORS.inc((collect.__name__,))
+
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, names, values, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_metric_labels(names, values)} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+METRICS_COLLECTOR_ERRORS = metrics.counter(
+    "metrics_collector_errors_total", "Scrape-time collectors that raised", ("collector",))
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"))
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "HTTP requests by route template and status code", ("method", "route", "status"))
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests currently being served")
+EVENT_LOOP_LAG = metrics.histogram(
+    "event_loop_lag_seconds", "How late a periodic timer fired, i.e. time the event loop was blocked",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+EVENT_LOOP_LAG_LAST = metrics.gauge("event_loop_lag_last_seconds", "Most recent event loop lag measurement")
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency per route template and requests in flight.
+
+    The route is read from the scope after the router has matched it, so metrics are
+    labelled by template (/api/raid-items/{item_id}) rather than by raw path. Streamed
+    responses are timed until their last chunk.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            label_values = (scope["method"], route.path if route is not None else "unmatched")
+            HTTP_REQUEST_SECONDS.observe(label_values, elapsed)
+            HTTP_REQUESTS.inc(label_values + (status[0],))
+
+app.add_middleware(MetricsMiddleware)
+
+class EventLoopLagMonitor:
+    """Measure how late a timer fires every METRICS_LOOP_LAG_INTERVAL seconds"""
+    def __init__(self):
+        self.interval = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0 and self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            EVENT_LOOP_LAG.observe((), lag)
+            EVENT_LOOP_LAG_LAST.set((), lag)
+
+event_loop_monitor = EventLoopLagMonitor()
+
+# ============================================================================
+# TRACING
+# ============================================================================
+
+import contextvars
+import logging
+from contextlib import contextmanager
+
+TRACE_SPANS = metrics.counter("trace_spans_total", "Finished trace spans by export result", ("result",))
+
+class Span:
+    """A timed operation within a trace; only sampled spans are recorded and exported"""
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes",
+                 "error", "sampled")
+
+    def __init__(self, trace_id: str, parent_id: Optional[str], name: str, sampled: bool, kind: int = 1):
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind  # OTLP SpanKind: 1 internal, 2 server, 3 client
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes: Dict[str, Any] = {}
+        self.error: Optional[str] = None
+        self.sampled = sampled
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"[:300]
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+class _NoopSpan:
+    """Stands in for spans of unsampled traces so instrumented code needs no checks"""
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+class Tracer:
+    """Head-sampled tracing with an OTLP/JSON exporter.
+
+    Every HTTP request gets a trace id, returned in X-Trace-Id and traceparent response
+    headers and added to access log lines. A TRACE_SAMPLE_RATE fraction of traces record
+    spans; an incoming traceparent's sampled flag is only followed with TRACE_TRUST_PARENT,
+    since any client can set it. Finished spans are batched and appended to
+    TRACE_EXPORT_PATH as one OTLP ExportTraceServiceRequest JSON object per line, the
+    format the OpenTelemetry collector's file exporter writes and its otlpjsonfile
+    receiver reads, rotating at TRACE_EXPORT_MAX_MB, and optionally posted to an
+    OTLP/HTTP collector at TRACE_OTLP_ENDPOINT. Unsampled spans cost one context
+    variable lookup.
+    """
+    def __init__(self):
+        self.sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+        self.trust_parent = os.getenv("TRACE_TRUST_PARENT", "false").lower() == "true"
+        self.export_path = os.getenv("TRACE_EXPORT_PATH", os.path.join(DATA_DIR, "traces.otlp.jsonl"))
+        self.export_max_bytes = int(float(os.getenv("TRACE_EXPORT_MAX_MB", "100")) * 1024 * 1024)
+        self.export_backups = int(os.getenv("TRACE_EXPORT_BACKUPS", "3"))
+        self.otlp_endpoint = os.getenv("TRACE_OTLP_ENDPOINT", "")
+        self.flush_interval = float(os.getenv("TRACE_FLUSH_INTERVAL", "2"))
+        self.max_queue = int(os.getenv("TRACE_MAX_QUEUE", "20000"))
+        self.finished: List[Span] = []
+        self.exporter_task: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger("raidmaster.tracing")
+
+    def start_request_span(self, name: str, traceparent: Optional[str]) -> Span:
+        """Root span of a request, continuing the caller's trace when it sent a traceparent"""
+        match = _TRACEPARENT.match(traceparent or "")
+        if match:
+            trace_id, parent_id, flags = match.groups()
+        else:
+            trace_id, parent_id, flags = f"{random.getrandbits(128):032x}", None, None
+        if flags is not None and self.trust_parent:
+            sampled = int(flags, 16) & 1 == 1
+        else:
+            sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        return Span(trace_id, parent_id, name, sampled, kind=2)
+
+    @contextmanager
+    def span(self, name: str, kind: int = 1, **attributes):
+        """Record a child span of the current span when the trace is sampled"""
+        parent = _current_span.get()
+        if parent is None or not parent.sampled:
+            yield NOOP_SPAN
+            return
+
+        span = Span(parent.trace_id, parent.span_id, name, True, kind)
+        span.attributes.update(attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span)
+
+    def finish(self, span: Span):
+        span.end_ns = time.time_ns()
+        if len(self.finished) >= self.max_queue:
+            TRACE_SPANS.inc(("dropped",))
+            return
+        self.finished.append(span)
+
+    def start(self):
+        if self.exporter_task is None:
+            self.exporter_task = asyncio.create_task(self._exporter())
+
+    async def stop(self):
+        if self.exporter_task:
+            self.exporter_task.cancel()
+            await asyncio.gather(self.exporter_task, return_exceptions=True)
+            self.exporter_task = None
+        await self.flush()
+
+    async def _exporter(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        if not self.finished:
+            return
+        spans, self.finished = self.finished, []
+        payload = self.otlp_payload(spans)
+        try:
+            await asyncio.to_thread(self._append, json.dumps(payload, separators=(",", ":")))
+            if self.otlp_endpoint:
+                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+                    async with session.post(self.otlp_endpoint, json=payload) as response:
+                        response.raise_for_status()
+            TRACE_SPANS.inc(("exported",), len(spans))
+        except Exception as e:
+            TRACE_SPANS.inc(("failed",), len(spans))
+            self.logger.warning("Exporting %d spans failed: %s", len(spans), e)
+
+    def _append(self, line: str):
+        os.makedirs(os.path.dirname(self.export_path) or ".", exist_ok=True)
+        try:
+            size = os.path.getsize(self.export_path)
+        except OSError:
+            size = 0
+        if size and size + len(line) + 1 > self.export_max_bytes:
+            self._rotate()
+        with open(self.export_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _rotate(self):
+        """Shift path -> path.1 -> ... -> path.N, dropping the oldest, so disk use stays bounded"""
+        if self.export_backups <= 0:
+            os.remove(self.export_path)
+            return
+        for index in range(self.export_backups - 1, 0, -1):
+            source = f"{self.export_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.export_path}.{index + 1}")
+        os.replace(self.export_path, f"{self.export_path}.1")
+
+    @staticmethod
+    def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": "raidmaster-api",
+                                                         "service.version": app.version})},
+            "scopeSpans": [{
+                "scope": {"name": "raidmaster.server"},
+                "spans": [{
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                    "name": span.name,
+                    "kind": span.kind,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": _otlp_attributes(span.attributes),
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+                } for span in spans]
+            }]
+        }]}
+
+tracer = Tracer()
+
+class TracingMiddleware:
+    """Open the root span of each request and return its trace id in the response headers"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"traceparent"),
+                           None)
+        span = tracer.start_request_span(f"{scope['method']} {scope['path']}", traceparent)
+        token = _current_span.set(span)
+        status = [500]
+
+        async def send_with_trace_headers(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-trace-id", span.trace_id.encode()),
+                                                  (b"traceparent", span.traceparent.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace_headers)
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            if span.sampled:
+                route = scope.get("route")
+                if route is not None:
+                    span.name = f"{scope['method']} {route.path}"
+                    span.attributes["http.route"] = route.path
+                span.attributes.update({"http.method": scope["method"], "http.target": scope["path"],
+                                        "http.status_code": status[0]})
+                if status[0] >= 500 and not span.error:
+                    span.error = f"HTTP {status[0]}"
+                tracer.finish(span)
+
+app.add_middleware(TracingMiddleware)
+
+_default_log_record_factory = logging.getLogRecordFactory()
+
+def _log_record_with_trace(*args, **kwargs):
+    """Give every log record the trace_id and span_id of the request that logged it"""
+    record = _default_log_record_factory(*args, **kwargs)
+    span = _current_span.get()
+    record.trace_id = span.trace_id if span else "-"
+    record.span_id = span.span_id if span else "-"
+    return record
+
+logging.setLogRecordFactory(_log_record_with_trace)
+
+class AccessLogTraceFilter(logging.Filter):
+    """Append the trace id to uvicorn access log lines"""
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "trace_id", "-") != "-" and isinstance(record.args, tuple):
+            record.msg = f"{record.msg} trace_id=%s"
+            record.args = (*record.args, record.trace_id)
+        return True
+
+logging.getLogger("uvicorn.access").addFilter(AccessLogTraceFilter())
+
+@app.on_event("startup")
+async def start_tracing():
+    tracer.start()
+
+@app.on_event("shutdown")
+async def stop_tracing():
+    await tracer.stop()
 
 # Models
 class RAIDItem(BaseModel):
@@ -88,18 +587,26 @@ class RAIDItemUpdate(BaseModel):
 class AIProvider(BaseModel):
     id: str
     name: str
-    provider: str  # "openai", "anthropic", "gemini"
+    provider: str  # "openai", "anthropic", "gemini", "mock"
     model: str
     api_key: str
     enabled: bool = True
     created_at: Optional[str] = None
     last_validated: Optional[str] = None
     status: Optional[str] = "unknown"  # "active", "invalid", "error", "unknown"
+    options: Optional[Dict[str, Any]] = None  # Provider-specific settings, e.g. mock latency and error rates
 
 class AIAnalysisRequest(BaseModel):
     item: RAIDItem
     analysisType: str = "analysis"  # "analysis" or "validation"
     provider_id: Optional[str] = None  # If None, use default/best available
+    hedge: Optional[bool] = None  # If None, use AI_HEDGE_ENABLED
+    force: bool = False  # Re-run even if a stored analysis matches the item
+
+class AIMultiAnalysisRequest(AIAnalysisRequest):
+    max_providers: int = 3
+    provider_timeout: Optional[float] = None  # Seconds per provider, default AI_PROVIDER_TIMEOUT
+    quorum: Optional[int] = None  # Stop once this many providers agree on suggestedPriority
 
 class AIValidationRequest(BaseModel):
     provider: AIProvider
@@ -121,10 +628,449 @@ class AIAnalysisResponse(BaseModel):
     provider_used: str
     response_time: float
 
+def _percentile(samples, percentile: float) -> Optional[float]:
+    """Nearest-rank percentile of a sample collection, None when empty"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for prompts and replies (about four characters per token)"""
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+# Sentences with these carry the substance of a RAID description and are kept first
+_KEY_CONTENT_PATTERN = re.compile(
+    r"\d|risk|impact|delay|cost|budget|deadline|block|depend|fail|critical|mitigat|owner|date",
+    re.IGNORECASE
+)
+
+def compact_text(text: str, max_tokens: int) -> str:
+    """Trim text to roughly max_tokens, keeping the opening sentence and the most
+    informative others in their original order"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    budget = max_tokens * 4
+    # Opening sentence first, then sentences with key content, then the rest by position
+    ranked = sorted(range(len(sentences)),
+                    key=lambda i: (i != 0, not _KEY_CONTENT_PATTERN.search(sentences[i]), i))
+    
+    kept = set()
+    kept_text = set()
+    used = 0
+    for i in ranked:
+        length = len(sentences[i]) + 1
+        if used + length > budget or sentences[i] in kept_text:
+            continue
+        kept.add(i)
+        kept_text.add(sentences[i])
+        used += length
+    
+    if not kept:
+        return text[:budget].rstrip() + " [...]"
+    
+    omitted = len(sentences) - len(kept)
+    return " ".join(sentences[i] for i in sorted(kept)) + f" [... {omitted} sentence(s) omitted]"
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    """Extract a retry-after delay from a provider error, if it was rate limited"""
+    retry_after = getattr(error, "retry_after", None)
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if retry_after is None and headers is not None:
+        retry_after = headers.get("retry-after")
+    if retry_after is None:
+        match = re.search(r"retry[-_ ]after\D{0,5}(\d+(?:\.\d+)?)", str(error), re.IGNORECASE)
+        retry_after = match.group(1) if match else None
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            return None
+    
+    message = str(error).lower()
+    if "429" in message or "rate limit" in message or "rate_limit" in message:
+        return float(os.getenv("AI_RATE_LIMIT_DEFAULT_BACKOFF", "30"))
+    return None
+
+AI_CALL_SECONDS = metrics.histogram(
+    "ai_call_duration_seconds", "Upstream LLM call latency by provider, model, call kind and outcome",
+    ("provider", "model", "kind", "outcome"))
+AI_CALL_TIMEOUTS = metrics.counter(
+    "ai_call_timeouts_total", "LLM calls abandoned at their per-provider deadline", ("provider", "model"))
+CACHE_REQUESTS = metrics.counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result"))
+
+def _call_outcome(error: BaseException) -> str:
+    """Classify a failed provider call for metrics"""
+    if isinstance(error, asyncio.CancelledError):
+        return "cancelled"
+    if isinstance(error, TimeoutError) or "timed out" in str(error).lower():
+        return "timeout"
+    if _retry_after_seconds(error) is not None:
+        return "rate_limited"
+    return "error"
+
+VALID_TYPES = ("Risk", "Assumption", "Issue", "Dependency")
+VALID_STATUSES = ("Proposed", "Open", "In Progress", "Mitigating", "Resolved", "Closed", "Archived")
+VALID_PRIORITIES = ("P0", "P1", "P2", "P3")
+VALID_IMPACTS = ("Low", "Medium", "High", "Critical")
+VALID_LIKELIHOODS = ("Low", "Medium", "High")
+CLOSED_STATUSES = ("Resolved", "Closed", "Archived")
+
+class ParsedAIResponse(BaseModel):
+    analysis: str
+    suggestedPriority: str
+    suggestedStatus: Optional[str] = None
+    confidence: float
+    flags: List[Dict[str, Any]] = []
+    parse_status: str = "ok"  # "ok", "repaired", "fallback", "error"
+
+class JSONObjectExtractor:
+    """Find the first balanced JSON object with the expected keys in a reply.
+    
+    Text can be fed in chunks as it streams in; brace depth and string/escape state
+    carry across feed() calls, so the reply is scanned once however it is split.
+    Candidates that are not valid JSON (prose like "{see above}") or lack every
+    expected key (a wrapper or an example) are skipped and scanning resumes inside them.
+    """
+    EXPECTED_KEYS = ("analysis", "suggestedPriority", "suggestedStatus", "confidence", "flags")
+    MAX_CANDIDATES = 64
+    _OUTSIDE_STRING = re.compile(r'[{}"]')
+    _INSIDE_STRING = re.compile(r'["\\]')
+    _TRAILING_COMMA = re.compile(r",\s*([}\]])")
+    _DECODER = json.JSONDecoder()
+    
+    def __init__(self, expected_keys: Optional[tuple] = None):
+        self.expected_keys = expected_keys or self.EXPECTED_KEYS
+        self.text = ""
+        self.pos = 0
+        self.start = -1
+        self.depth = 0
+        self.in_string = False
+        self.candidates = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.repaired = False
+        self.error: Optional[str] = None
+    
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Scan another chunk, returning the object once it is complete"""
+        if self.result is not None or self.candidates >= self.MAX_CANDIDATES:
+            return self.result
+        
+        self.text += chunk
+        text = self.text
+        i = self.pos
+        
+        while True:
+            if self.start < 0:
+                i = text.find("{", i)
+                if i < 0:
+                    i = len(text)
+                    break
+                
+                # Fast path: a complete, valid object decodes in one C-level call
+                try:
+                    data, end = self._DECODER.raw_decode(text, i)
+                except ValueError:
+                    data = None
+                if isinstance(data, dict) and any(key in data for key in self.expected_keys):
+                    self.result = data
+                    self.pos = end
+                    return data
+                if data is not None:
+                    # Valid JSON without the expected keys, look for the answer inside it
+                    i += 1
+                    continue
+                
+                self.start, self.depth, self.in_string = i, 1, False
+                i += 1
+                continue
+            
+            match = (self._INSIDE_STRING if self.in_string else self._OUTSIDE_STRING).search(text, i)
+            if match is None:
+                i = len(text)
+                break
+            
+            char = match.group()
+            i = match.end()
+            if self.in_string:
+                if char == "\\":
+                    if i >= len(text):
+                        # Escape split across chunks; resume at the backslash
+                        i -= 1
+                        break
+                    i += 1
+                else:
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    data = self._load(text[self.start:i])
+                    if data is not None:
+                        self.result = data
+                        self.pos = i
+                        return data
+                    
+                    self.candidates += 1
+                    if self.candidates >= self.MAX_CANDIDATES:
+                        break
+                    i = self.start + 1
+                    self.start = -1
+        
+        # Drop text that can no longer be part of a candidate so streamed input stays small
+        cut = self.start if self.start >= 0 else i
+        if cut > 0:
+            self.text = text[cut:]
+            self.start = 0 if self.start >= 0 else -1
+            i -= cut
+        self.pos = i
+        return None
+    
+    def _load(self, candidate: str) -> Optional[Dict[str, Any]]:
+        try:
+            data = json.loads(candidate)
+        except ValueError as e:
+            # LLMs often leave a trailing comma before a closing bracket
+            repaired = self._TRAILING_COMMA.sub(r"\1", candidate)
+            try:
+                data = json.loads(repaired) if repaired != candidate else None
+            except ValueError:
+                data = None
+            if data is None:
+                self.error = str(e)
+                return None
+            self.repaired = True
+        
+        if isinstance(data, dict) and any(key in data for key in self.expected_keys):
+            return data
+        return None
+
+def parse_ai_reply(response: str, extractor: Optional[JSONObjectExtractor] = None) -> ParsedAIResponse:
+    """Parse an LLM reply into a validated ParsedAIResponse.
+    
+    Pass the extractor a streamed reply was fed into to avoid scanning it again.
+    """
+    if extractor is None:
+        extractor = JSONObjectExtractor()
+        extractor.feed(response)
+    
+    data = extractor.result
+    if data is None:
+        if extractor.start >= 0 or extractor.error:
+            error = extractor.error or "Incomplete JSON object in reply"
+            return ParsedAIResponse(
+                analysis=f"Error parsing response: {error}",
+                suggestedPriority="P2",
+                confidence=0.0,
+                flags=[{"code": "PARSE_ERROR", "message": error, "severity": "medium"}],
+                parse_status="error"
+            )
+        # Fallback parsing for replies without JSON
+        return ParsedAIResponse(
+            analysis=response[:200] + "..." if len(response) > 200 else response,
+            suggestedPriority="P2",
+            confidence=0.5,
+            parse_status="fallback"
+        )
+    
+    priority = str(data.get("suggestedPriority") or "P2").strip().upper()
+    if priority not in VALID_PRIORITIES:
+        priority = "P2"
+    
+    status = data.get("suggestedStatus")
+    status = next((s for s in VALID_STATUSES if isinstance(status, str) and s.lower() == status.strip().lower()), None)
+    
+    try:
+        confidence = float(str(data.get("confidence", 0.75)).strip().rstrip("%"))
+    except ValueError:
+        confidence = 0.75
+    if 1 < confidence <= 100:
+        confidence /= 100  # Reported as a percentage
+    confidence = min(1.0, max(0.0, confidence))
+    
+    # flags should be a list; a bare string is one note, and anything else is dropped
+    raw_flags = data.get("flags") or []
+    repaired = extractor.repaired
+    if isinstance(raw_flags, str):
+        raw_flags = [raw_flags]
+    elif not isinstance(raw_flags, list):
+        raw_flags = []
+        repaired = True
+    
+    flags = []
+    for flag in raw_flags:
+        if isinstance(flag, str):
+            flag = {"code": "NOTE", "message": flag}
+        if not isinstance(flag, dict):
+            continue
+        severity = str(flag.get("severity", "medium")).lower()
+        flags.append({
+            **flag,
+            "code": str(flag.get("code") or "NOTE"),
+            "message": str(flag.get("message", "")),
+            "severity": severity if severity in ("low", "medium", "high") else "medium"
+        })
+    
+    analysis = data.get("analysis")
+    return ParsedAIResponse(
+        analysis=analysis if isinstance(analysis, str) and analysis else "Analysis completed",
+        suggestedPriority=priority,
+        suggestedStatus=status,
+        confidence=confidence,
+        flags=flags,
+        parse_status="repaired" if repaired else "ok"
+    )
+
+class MockLlmChat:
+    """Offline stand-in for LlmChat used by providers of type "mock".
+    
+    Replies are schema-valid JSON derived from the prompt, with latency drawn from a
+    configurable distribution and injected errors, rate limits and hangs. A seeded
+    random generator per provider keeps runs reproducible.
+    """
+    PRESETS = {
+        "mock-fast": {"latency_ms": 20, "distribution": "fixed"},
+        "mock-realistic": {"latency_ms": 1500, "distribution": "lognormal", "sigma": 0.5,
+                           "stream_chunk_chars": 12, "stream_chunk_delay_ms": 15},
+        "mock-flaky": {"latency_ms": 1500, "distribution": "lognormal", "sigma": 0.8,
+                       "error_rate": 0.1, "rate_limit_rate": 0.05, "timeout_rate": 0.05},
+    }
+    DEFAULTS = {
+        "latency_ms": 200, "distribution": "fixed", "sigma": 0.5, "error_rate": 0.0,
+        "rate_limit_rate": 0.0, "timeout_rate": 0.0, "timeout_seconds": 120,
+        "retry_after_seconds": 2, "stream_chunk_chars": 16, "stream_chunk_delay_ms": 0, "seed": None
+    }
+    EXTRACTION_KEYWORDS = (
+        ("Dependency", ("depends on", "dependent", "waiting on", "dependency")),
+        ("Assumption", ("assume", "assumption", "expected to")),
+        ("Issue", ("issue", "blocked", "failing", "problem")),
+        ("Risk", ("risk", "may ", "might ", "could ")),
+    )
+    _random_by_provider: Dict[str, random.Random] = {}
+    
+    def __init__(self, provider: AIProvider, system_message: str):
+        self.provider = provider
+        self.system_message = system_message
+        self.options = {**self.DEFAULTS, **self.PRESETS.get(provider.model, {}), **(provider.options or {})}
+        rng_key = f"{provider.id}:{self.options['seed']}"
+        if rng_key not in self._random_by_provider:
+            self._random_by_provider[rng_key] = random.Random(self.options["seed"])
+        self.random = self._random_by_provider[rng_key]
+    
+    async def send_message(self, message: UserMessage) -> str:
+        await self._simulate_call()
+        return self._reply(message.text)
+    
+    async def stream_message(self, message: UserMessage):
+        await self._simulate_call()
+        reply = self._reply(message.text)
+        size = max(1, int(self.options["stream_chunk_chars"]))
+        delay = self.options["stream_chunk_delay_ms"] / 1000
+        for i in range(0, len(reply), size):
+            if delay and i:
+                await asyncio.sleep(delay)
+            yield reply[i:i + size]
+    
+    async def _simulate_call(self):
+        options = self.options
+        roll = self.random.random()
+        latency = self._latency_seconds()
+        if roll < options["timeout_rate"]:
+            await asyncio.sleep(options["timeout_seconds"])
+            raise TimeoutError("Mock provider timed out")
+        roll -= options["timeout_rate"]
+        await asyncio.sleep(latency)
+        if roll < options["rate_limit_rate"]:
+            raise RuntimeError(f"429 Rate limit exceeded. Retry-After: {options['retry_after_seconds']}")
+        roll -= options["rate_limit_rate"]
+        if roll < options["error_rate"]:
+            raise RuntimeError("Mock provider error 500: internal server error")
+    
+    def _latency_seconds(self) -> float:
+        median = self.options["latency_ms"] / 1000
+        distribution = self.options["distribution"]
+        if distribution == "uniform":
+            return self.random.uniform(0, 2 * median)
+        if distribution == "exponential":
+            return self.random.expovariate(1 / median) if median > 0 else 0.0
+        if distribution == "lognormal":
+            return median * self.random.lognormvariate(0, self.options["sigma"])
+        return median
+    
+    def _reply(self, prompt: str) -> str:
+        if "API connection successful" in prompt:
+            return "API connection successful"
+        if prompt == "OK?":
+            return "OK"
+        
+        if "Extract RAID items" in prompt:
+            return self._extraction_reply(prompt)
+        
+        fields = dict(re.findall(r"^- ([A-Za-z ]+): (.*)$", prompt, re.MULTILINE))
+        impact, likelihood = fields.get("Impact", "Medium"), fields.get("Likelihood", "Medium")
+        priority = RAIDRuleEngine.PRIORITY_BY_SCORE[calculate_severity_score(impact, likelihood)]
+        reply = {
+            "analysis": f"Mock analysis: {impact} impact and {likelihood} likelihood suggest {priority}.",
+            "suggestedPriority": priority,
+            "confidence": round(self.random.uniform(0.6, 0.95), 2),
+            "flags": []
+        }
+        if "validate this RAID item" not in prompt:
+            reply["suggestedStatus"] = fields.get("Current Status", "Open")
+        if fields.get("Current Priority") and fields["Current Priority"] != priority:
+            reply["flags"].append({"code": "PRIORITY_MISMATCH", "severity": "medium", "field": "priority",
+                                   "message": f"Priority {fields['Current Priority']} looks off, expected {priority}"})
+        return f"```json\n{json.dumps(reply)}\n```"
+    
+    def _extraction_reply(self, prompt: str) -> str:
+        """Turn sentences with RAID keywords in the excerpt into candidate items"""
+        excerpt = prompt.split('"""')[1] if prompt.count('"""') >= 2 else prompt
+        items = []
+        for sentence in re.split(r"(?<=[.!?])\s+|\n+", excerpt):
+            lowered = sentence.lower()
+            item_type = next((t for t, words in self.EXTRACTION_KEYWORDS if any(w in lowered for w in words)), None)
+            if item_type and len(sentence.split()) >= 4:
+                items.append({"type": item_type, "title": sentence.strip()[:80], "description": sentence.strip(),
+                              "impact": self.random.choice(VALID_IMPACTS), "likelihood": "Medium"})
+        return json.dumps({"items": items})
+
 # AI Provider Management
 class MultiAIManager:
     def __init__(self):
         self.providers: Dict[str, AIProvider] = {}
+        # Recent successful response times per provider, used for hedging
+        self.latency_samples: Dict[str, deque] = {}
+        self.ttfb_samples: Dict[str, deque] = {}
+        self.hedge_enabled = os.getenv("AI_HEDGE_ENABLED", "false").lower() == "true"
+        self.hedge_budget = float(os.getenv("AI_HEDGE_BUDGET", "0.1"))
+        self.hedge_min_samples = int(os.getenv("AI_HEDGE_MIN_SAMPLES", "20"))
+        self.hedge_default_delay = float(os.getenv("AI_HEDGE_DEFAULT_DELAY", "8.0"))
+        self.hedge_stats = {"requests": 0, "hedged": 0, "hedge_wins": 0}
+        self.provider_timeout = float(os.getenv("AI_PROVIDER_TIMEOUT", "30"))
+        # Identical in-flight analysis requests, keyed by provider/type/prompt hash
+        self.in_flight: Dict[str, Dict[str, Any]] = {}
+        self.coalesce_enabled = os.getenv("AI_COALESCE_ENABLED", "true").lower() == "true"
+        self.coalesce_stats = {"upstream_calls": 0, "coalesced": 0}
+        # Cached validation results as (checked_at, response) per provider
+        self.validation_cache: Dict[str, tuple] = {}
+        self.validation_ttl = float(os.getenv("AI_VALIDATION_TTL", "300"))
+        self.validation_concurrency = int(os.getenv("AI_VALIDATION_CONCURRENCY", "4"))
+        self.health_probe_interval = float(os.getenv("AI_HEALTH_PROBE_INTERVAL", "300"))
+        self.prober_task: Optional[asyncio.Task] = None
+        self.reanalyze_on_update = os.getenv("AI_REANALYZE_ON_UPDATE", "true").lower() == "true"
+        # Providers told us to back off until these times (from retry-after)
+        self.backoff_until: Dict[str, float] = {}
+        # Estimated token usage per provider and model
+        self.token_usage: Dict[str, Dict[str, Any]] = {}
+        self.prompt_title_tokens = int(os.getenv("AI_PROMPT_TITLE_TOKENS", "60"))
+        self.prompt_description_tokens = int(os.getenv("AI_PROMPT_DESCRIPTION_TOKENS", "600"))
         self.load_default_providers()
     
     def load_default_providers(self):
@@ -164,26 +1110,57 @@ class MultiAIManager:
             
             for provider in default_providers:
                 self.providers[provider.id] = provider
+        
+        # Offline mock provider for load and latency testing without a live key
+        mock_model = os.getenv("AI_MOCK_PROVIDER")
+        if mock_model:
+            self.providers["mock"] = AIProvider(
+                id="mock",
+                name="Mock LLM",
+                provider="mock",
+                model=mock_model if mock_model in MockLlmChat.PRESETS else "mock-fast",
+                api_key="mock-key",
+                enabled=True,
+                status="unknown"
+            )
+    
+    async def validate_provider(self, provider: AIProvider, probe: bool = False) -> AIValidationResponse:
+        """Validate an AI provider's API key and model.
+        
+        A probe is the cheapest possible check for background health monitoring:
+        a minimal prompt where any non-empty reply counts as healthy.
+        """
+        with tracer.span("ai.validate", kind=3, provider=provider.id, model=provider.model, probe=probe) as span:
+            result = await self._validate_provider(provider, probe)
+            span.set_attribute("ai.validation_status", result.status)
+            return result
     
-    async def validate_provider(self, provider: AIProvider) -> AIValidationResponse:
-        """Validate an AI provider's API key and model"""
+    async def _validate_provider(self, provider: AIProvider, probe: bool) -> AIValidationResponse:
         start_time = time.time()
         
         try:
             # Create LLM chat instance
-            chat = LlmChat(
-                api_key=provider.api_key,
-                session_id=f"validation-{provider.id}-{int(time.time())}",
-                system_message="You are a helpful AI assistant for API validation."
-            ).with_model(provider.provider, provider.model)
+            chat = self._create_chat(
+                provider,
+                f"validation-{provider.id}-{int(time.time())}",
+                "Reply with one word." if probe else "You are a helpful AI assistant for API validation."
+            )
             
-            # Test with a simple message
-            test_message = UserMessage(text="Please respond with exactly: 'API connection successful'")
-            response = await chat.send_message(test_message)
+            if probe:
+                prompt = "OK?"
+                response = await chat.send_message(UserMessage(text=prompt))
+                healthy = bool(response and response.strip())
+            else:
+                # Test with a simple message
+                prompt = "Please respond with exactly: 'API connection successful'"
+                response = await chat.send_message(UserMessage(text=prompt))
+                healthy = "API connection successful" in response or "successful" in response.lower()
+            self.record_usage(provider, prompt, response or "")
             
             response_time = time.time() - start_time
+            self.record_call(provider, "probe" if probe else "validate", "success", response_time)
             
-            if "API connection successful" in response or "successful" in response.lower():
+            if healthy:
                 # Update provider status
                 provider.status = "active"
                 provider.last_validated = time.strftime('%Y-%m-%d %H:%M:%S')
@@ -209,6 +1186,7 @@ class MultiAIManager:
                 )
                 
         except Exception as e:
+            self.record_call(provider, "probe" if probe else "validate", _call_outcome(e), time.time() - start_time)
             provider.status = "invalid"
             error_msg = str(e)
             
@@ -230,55 +1208,232 @@ class MultiAIManager:
                 response_time=round(time.time() - start_time, 2)
             )
     
+    async def validate_cached(self, provider: AIProvider, force: bool = False, probe: bool = False) -> AIValidationResponse:
+        """Validate a provider, reusing a cached result younger than AI_VALIDATION_TTL"""
+        cached = self.validation_cache.get(provider.id)
+        if cached and not force and time.time() - cached[0] < self.validation_ttl:
+            CACHE_REQUESTS.inc(("provider_validation", "hit"))
+            return cached[1]
+        
+        CACHE_REQUESTS.inc(("provider_validation", "miss"))
+        result = await self.validate_provider(provider, probe=probe)
+        self.validation_cache[provider.id] = (time.time(), result)
+        return result
+    
+    async def validate_providers(self, providers: List[AIProvider], force: bool = False,
+                                 probe: bool = False) -> Dict[str, AIValidationResponse]:
+        """Validate providers in parallel, at most AI_VALIDATION_CONCURRENCY at a time"""
+        semaphore = asyncio.Semaphore(self.validation_concurrency)
+        
+        async def validate(provider: AIProvider):
+            async with semaphore:
+                return provider.id, await self.validate_cached(provider, force=force, probe=probe)
+        
+        return dict(await asyncio.gather(*(validate(p) for p in providers)))
+    
+    def start_health_prober(self):
+        """Start probing enabled providers in the background"""
+        if self.health_probe_interval > 0 and self.prober_task is None:
+            self.prober_task = asyncio.create_task(self._run_health_prober())
+    
+    async def stop_health_prober(self):
+        if self.prober_task:
+            self.prober_task.cancel()
+            await asyncio.gather(self.prober_task, return_exceptions=True)
+            self.prober_task = None
+    
+    async def _run_health_prober(self):
+        while True:
+            enabled_providers = [p for p in self.providers.values() if p.enabled]
+            await self.validate_providers(enabled_providers, probe=True)
+            await asyncio.sleep(self.health_probe_interval)
+    
+    def _create_chat(self, provider: AIProvider, session_id: str, system_message: str):
+        """Create LLM chat instance for a provider"""
+        if provider.provider == "mock":
+            return MockLlmChat(provider, system_message)
+        return LlmChat(
+            api_key=provider.api_key,
+            session_id=session_id,
+            system_message=system_message
+        ).with_model(provider.provider, provider.model)
+    
     async def analyze_with_provider(self, item: RAIDItem, provider: AIProvider, analysis_type: str = "analysis") -> AIAnalysisResponse:
-        """Analyze RAID item using specific provider"""
+        """Analyze RAID item using specific provider.
+        
+        Concurrent calls with the same prompt, provider and analysis type share one
+        upstream request; the request is only cancelled once every waiter has gone.
+        """
+        with tracer.span("ai.prompt.build", analysis_type=analysis_type) as span:
+            prompt = self._build_analysis_prompt(item, analysis_type)
+            span.set_attribute("ai.prompt_tokens", estimate_tokens(prompt))
+        if not self.coalesce_enabled:
+            return await self._analyze_with_provider(item, provider, analysis_type, prompt)
+        
+        key = hashlib.sha256(f"{provider.id}\0{analysis_type}\0{prompt}".encode()).hexdigest()
+        flight = self.in_flight.get(key)
+        if flight is None:
+            task = asyncio.create_task(self._analyze_with_provider(item, provider, analysis_type, prompt))
+            flight = self.in_flight[key] = {"task": task, "waiters": 0}
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+            self.coalesce_stats["upstream_calls"] += 1
+        else:
+            self.coalesce_stats["coalesced"] += 1
+        
+        flight["waiters"] += 1
+        try:
+            # The upstream call's spans belong to the trace of the request that started it
+            with tracer.span("ai.wait_for_upstream", provider=provider.id, coalesced=flight["waiters"] > 1):
+                return await asyncio.shield(flight["task"])
+        except asyncio.CancelledError:
+            if flight["waiters"] == 1:
+                flight["task"].cancel()
+            raise
+        finally:
+            flight["waiters"] -= 1
+    
+    async def _analyze_with_provider(self, item: RAIDItem, provider: AIProvider, analysis_type: str, prompt: str) -> AIAnalysisResponse:
         start_time = time.time()
         
         try:
             # Create LLM chat instance
-            chat = LlmChat(
-                api_key=provider.api_key,
-                session_id=f"raid-analysis-{item.id}-{int(time.time())}",
-                system_message=self._get_system_message(analysis_type)
-            ).with_model(provider.provider, provider.model)
-            
-            # Build analysis prompt
-            prompt = self._build_analysis_prompt(item, analysis_type)
+            chat = self._create_chat(
+                provider,
+                f"raid-analysis-{item.id}-{int(time.time())}",
+                self._get_system_message(analysis_type)
+            )
             
             # Send message
             user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
+            with tracer.span("ai.upstream_call", kind=3, provider=provider.id, model=provider.model) as span:
+                response = await chat.send_message(user_message)
+                span.set_attribute("ai.completion_tokens", estimate_tokens(response))
             
             response_time = time.time() - start_time
+            self.record_latency(provider.id, response_time)
+            self.record_call(provider, analysis_type, "success", response_time)
+            self.record_usage(provider, self._get_system_message(analysis_type) + prompt, response)
             
             # Parse response
-            analysis_result = self._parse_ai_response(response, analysis_type)
+            with tracer.span("ai.parse") as span:
+                analysis_result = self._parse_ai_response(response, analysis_type)
+                span.set_attribute("ai.parse_status", analysis_result.parse_status)
             
-            return AIAnalysisResponse(
-                analysis=analysis_result.analysis,
-                suggestedPriority=analysis_result.suggestedPriority,
-                suggestedStatus=analysis_result.suggestedStatus,
-                confidence=analysis_result.confidence,
-                flags=analysis_result.flags,
-                provider_used=f"{provider.name} ({provider.model})",
-                response_time=round(response_time, 2)
-            )
+            return self._build_analysis_response(analysis_result, provider, response_time)
             
+        except asyncio.CancelledError as e:
+            self.record_call(provider, analysis_type, _call_outcome(e), time.time() - start_time)
+            raise
         except Exception as e:
             # Return fallback response on error
-            return AIAnalysisResponse(
-                analysis=f"Analysis failed with {provider.name}: {str(e)[:100]}",
-                suggestedPriority=item.priority,
-                suggestedStatus=item.status,
-                confidence=0.0,
-                flags=[{
-                    "code": "PROVIDER_ERROR",
-                    "message": f"Error using {provider.name}: {str(e)[:50]}",
-                    "severity": "high"
-                }],
-                provider_used=f"{provider.name} (Error)",
-                response_time=round(time.time() - start_time, 2)
+            self.record_call(provider, analysis_type, _call_outcome(e), time.time() - start_time)
+            self.note_rate_limit(provider.id, e)
+            return self._build_error_response(item, provider, e, start_time)
+    
+    async def complete(self, provider: AIProvider, system_message: str, prompt: str, session_id: str) -> str:
+        """Send a one-off prompt to a provider, recording latency and token usage"""
+        start_time = time.time()
+        chat = self._create_chat(provider, f"{session_id}-{int(start_time)}", system_message)
+        try:
+            response = await chat.send_message(UserMessage(text=prompt))
+        except (Exception, asyncio.CancelledError) as e:
+            self.record_call(provider, "complete", _call_outcome(e), time.time() - start_time)
+            self.note_rate_limit(provider.id, e)
+            raise
+        
+        self.record_latency(provider.id, time.time() - start_time)
+        self.record_call(provider, "complete", "success", time.time() - start_time)
+        self.record_usage(provider, system_message + prompt, response)
+        return response
+    
+    async def stream_analysis(self, item: RAIDItem, provider: AIProvider, analysis_type: str = "analysis"):
+        """Yield ("token", text) as the reply arrives, then ("result", AIAnalysisResponse)"""
+        start_time = time.time()
+        chunks = []
+        
+        try:
+            chat = self._create_chat(
+                provider,
+                f"raid-analysis-{item.id}-{int(time.time())}",
+                self._get_system_message(analysis_type)
             )
+            prompt = self._build_analysis_prompt(item, analysis_type)
+            user_message = UserMessage(text=prompt)
+            extractor = JSONObjectExtractor()
+            
+            async for chunk in self._stream_message(chat, user_message):
+                if not chunks:
+                    self.record_ttfb(provider.id, time.time() - start_time)
+                chunks.append(chunk)
+                extractor.feed(chunk)
+                yield "token", chunk
+            
+            response = "".join(chunks)
+            response_time = time.time() - start_time
+            self.record_latency(provider.id, response_time)
+            self.record_call(provider, f"{analysis_type}_stream", "success", response_time)
+            self.record_usage(provider, self._get_system_message(analysis_type) + prompt, response)
+            
+            analysis_result = self._parse_ai_response(response, analysis_type, extractor)
+            yield "result", self._build_analysis_response(analysis_result, provider, response_time)
+            
+        except asyncio.CancelledError as e:
+            self.record_call(provider, f"{analysis_type}_stream", _call_outcome(e), time.time() - start_time)
+            raise
+        except Exception as e:
+            self.record_call(provider, f"{analysis_type}_stream", _call_outcome(e), time.time() - start_time)
+            self.note_rate_limit(provider.id, e)
+            yield "result", self._build_error_response(item, provider, e, start_time)
+    
+    async def _stream_message(self, chat, message: UserMessage):
+        """Yield reply text chunks, as a single chunk when the chat client cannot stream"""
+        stream_message = getattr(chat, "stream_message", None)
+        if stream_message is None:
+            yield await chat.send_message(message)
+            return
+        
+        async for chunk in stream_message(message):
+            if chunk:
+                yield chunk
+    
+    def note_rate_limit(self, provider_id: str, error: Exception) -> Optional[float]:
+        """Record the retry-after from a rate limit error so schedulers hold off the provider"""
+        retry_after = _retry_after_seconds(error)
+        if retry_after:
+            self.backoff_until[provider_id] = max(self.backoff_until.get(provider_id, 0), time.time() + retry_after)
+        return retry_after
+    
+    async def wait_for_backoff(self, provider_id: str):
+        """Sleep until the provider's retry-after has passed"""
+        delay = self.backoff_until.get(provider_id, 0) - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def _build_analysis_response(self, analysis_result, provider: AIProvider, response_time: float) -> AIAnalysisResponse:
+        return AIAnalysisResponse(
+            analysis=analysis_result.analysis,
+            suggestedPriority=analysis_result.suggestedPriority,
+            suggestedStatus=analysis_result.suggestedStatus,
+            confidence=analysis_result.confidence,
+            flags=analysis_result.flags,
+            provider_used=f"{provider.name} ({provider.model})",
+            response_time=round(response_time, 2)
+        )
+    
+    def _build_error_response(self, item: RAIDItem, provider: AIProvider, error: Exception, start_time: float) -> AIAnalysisResponse:
+        return AIAnalysisResponse(
+            analysis=f"Analysis failed with {provider.name}: {str(error)[:100]}",
+            suggestedPriority=item.priority,
+            suggestedStatus=item.status,
+            confidence=0.0,
+            flags=[{
+                "code": "PROVIDER_ERROR",
+                "message": f"Error using {provider.name}: {str(error)[:50]}",
+                "severity": "high"
+            }],
+            provider_used=f"{provider.name} (Error)",
+            response_time=round(time.time() - start_time, 2)
+        )
     
     async def get_best_provider(self) -> Optional[AIProvider]:
         """Get the best available provider (active and fastest)"""
@@ -289,6 +1444,156 @@ class MultiAIManager:
         # Return first active provider (could be enhanced with performance metrics)
         return active_providers[0]
     
+    def record_latency(self, provider_id: str, response_time: float):
+        """Record a successful total response time for a provider"""
+        samples = self.latency_samples.setdefault(provider_id, deque(maxlen=200))
+        samples.append(response_time)
+    
+    def record_call(self, provider: AIProvider, kind: str, outcome: str, seconds: float):
+        """Record an upstream call in the latency histogram by provider, model, kind and outcome"""
+        AI_CALL_SECONDS.observe((provider.id, provider.model, kind, outcome), seconds)
+    
+    def record_ttfb(self, provider_id: str, ttfb: float):
+        """Record time to first streamed chunk for a provider"""
+        samples = self.ttfb_samples.setdefault(provider_id, deque(maxlen=200))
+        samples.append(ttfb)
+    
+    def record_usage(self, provider: AIProvider, prompt: str, response: str):
+        """Record estimated prompt and completion tokens for a provider and model"""
+        key = f"{provider.id}:{provider.model}"
+        usage = self.token_usage.get(key)
+        if usage is None:
+            usage = self.token_usage[key] = {
+                "provider_id": provider.id,
+                "provider": provider.provider,
+                "model": provider.model,
+                "calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "max_prompt_tokens": 0
+            }
+        prompt_tokens = estimate_tokens(prompt)
+        usage["calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["completion_tokens"] += estimate_tokens(response)
+        usage["max_prompt_tokens"] = max(usage["max_prompt_tokens"], prompt_tokens)
+    
+    def get_latency_percentile(self, provider_id: str, percentile: float) -> Optional[float]:
+        """Get observed response time percentile for a provider, None without enough samples"""
+        samples = self.latency_samples.get(provider_id)
+        if not samples or len(samples) < self.hedge_min_samples:
+            return None
+        return _percentile(samples, percentile)
+    
+    def get_latency_summary(self) -> Dict[str, Any]:
+        """Get total latency and time-to-first-byte percentiles per provider"""
+        summary = {}
+        for provider_id in set(self.latency_samples) | set(self.ttfb_samples):
+            summary[provider_id] = {}
+            for name, samples in (("total", self.latency_samples.get(provider_id)),
+                                  ("ttfb", self.ttfb_samples.get(provider_id))):
+                summary[provider_id][name] = {
+                    "count": len(samples) if samples else 0,
+                    "p50": _percentile(samples, 50),
+                    "p95": _percentile(samples, 95),
+                    "p99": _percentile(samples, 99)
+                }
+        return summary
+    
+    def get_hedge_delay(self, provider_id: str) -> float:
+        """Time to wait for the primary provider before sending a hedge request"""
+        p95 = self.get_latency_percentile(provider_id, 95)
+        return p95 if p95 is not None else self.hedge_default_delay
+    
+    def get_hedge_provider(self, primary: AIProvider) -> Optional[AIProvider]:
+        """Get the fastest other active provider to race against the primary"""
+        candidates = [p for p in self.providers.values()
+                      if p.enabled and p.status == "active" and p.id != primary.id]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda p: self.get_hedge_delay(p.id))
+    
+    def _hedge_budget_available(self) -> bool:
+        """Check that hedging one more request stays within the configured fraction"""
+        return self.hedge_stats["hedged"] + 1 <= self.hedge_budget * self.hedge_stats["requests"]
+    
+    @staticmethod
+    def is_successful_analysis(result: AIAnalysisResponse) -> bool:
+        return not any(flag.get("code") in ("PROVIDER_ERROR", "PARSE_ERROR") for flag in result.flags)
+    
+    async def analyze_hedged(self, item: RAIDItem, provider: AIProvider, analysis_type: str = "analysis") -> AIAnalysisResponse:
+        """Analyze RAID item, racing a second provider if the first is slower than its p95"""
+        self.hedge_stats["requests"] += 1
+        primary_task = asyncio.create_task(self.analyze_with_provider(item, provider, analysis_type))
+        pending = {primary_task}
+        
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.get_hedge_delay(provider.id))
+            if primary_task in done:
+                return primary_task.result()
+            
+            backup = self.get_hedge_provider(provider)
+            if backup is None or not self._hedge_budget_available():
+                return await primary_task
+            
+            self.hedge_stats["hedged"] += 1
+            backup_task = asyncio.create_task(self.analyze_with_provider(item, backup, analysis_type))
+            pending = {primary_task, backup_task}
+            
+            # First good answer wins; fall back to the primary's error if both fail
+            failed = {}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if self.is_successful_analysis(result):
+                        if task is backup_task:
+                            self.hedge_stats["hedge_wins"] += 1
+                        return result
+                    failed[task] = result
+            return failed.get(primary_task) or failed[backup_task]
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def iter_multi_analysis(self, item: RAIDItem, providers: List[AIProvider], analysis_type: str = "analysis",
+                                  provider_timeout: Optional[float] = None, quorum: Optional[int] = None):
+        """Yield (provider, result) as each provider finishes, result is None on timeout.
+        
+        Stops early once `quorum` successful results agree on suggestedPriority and
+        cancels the calls that are still running.
+        """
+        timeout = provider_timeout or self.provider_timeout
+        tasks = {
+            asyncio.create_task(asyncio.wait_for(self.analyze_with_provider(item, provider, analysis_type), timeout)): provider
+            for provider in providers
+        }
+        pending = set(tasks)
+        priority_votes: Dict[str, int] = {}
+        
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = tasks[task]
+                    try:
+                        result = task.result()
+                    except asyncio.TimeoutError:
+                        AI_CALL_TIMEOUTS.inc((provider.id, provider.model))
+                        yield provider, None
+                        continue
+                    
+                    yield provider, result
+                    
+                    if quorum and self.is_successful_analysis(result):
+                        votes = priority_votes.get(result.suggestedPriority, 0) + 1
+                        priority_votes[result.suggestedPriority] = votes
+                        if votes >= quorum:
+                            return
+        finally:
+            for task in pending:
+                task.cancel()
+    
     def _get_system_message(self, analysis_type: str) -> str:
         """Get system message based on analysis type"""
         if analysis_type == "validation":
@@ -301,12 +1606,14 @@ class MultiAIManager:
             Consider impact, likelihood, and business context in your analysis."""
     
     def _build_analysis_prompt(self, item: RAIDItem, analysis_type: str) -> str:
-        """Build analysis prompt"""
+        """Build analysis prompt, compacting long free-text fields to the token budget"""
+        title = compact_text(item.title, self.prompt_title_tokens)
+        description = compact_text(item.description, self.prompt_description_tokens)
         item_context = f"""
 RAID Item Analysis:
 - Type: {item.type}
-- Title: {item.title}
-- Description: {item.description}
+- Title: {title}
+- Description: {description}
 - Current Status: {item.status}
 - Current Priority: {item.priority}
 - Impact: {item.impact}
@@ -355,48 +1662,10 @@ Respond in JSON format:
     ]
 }}"""
     
-    def _parse_ai_response(self, response: str, analysis_type: str):
+    def _parse_ai_response(self, response: str, analysis_type: str,
+                           extractor: Optional[JSONObjectExtractor] = None) -> ParsedAIResponse:
         """Parse AI response into structured format"""
-        try:
-            # Extract JSON from response
-            start = response.find('{')
-            end = response.rfind('}') + 1
-            
-            if start >= 0 and end > start:
-                json_str = response[start:end]
-                data = json.loads(json_str)
-                
-                class ParsedResponse:
-                    def __init__(self, data):
-                        self.analysis = data.get("analysis", "Analysis completed")
-                        self.suggestedPriority = data.get("suggestedPriority", "P2")
-                        self.suggestedStatus = data.get("suggestedStatus")
-                        self.confidence = float(data.get("confidence", 0.75))
-                        self.flags = data.get("flags", [])
-                
-                return ParsedResponse(data)
-            else:
-                # Fallback parsing
-                class FallbackResponse:
-                    def __init__(self, response_text):
-                        self.analysis = response_text[:200] + "..." if len(response_text) > 200 else response_text
-                        self.suggestedPriority = "P2"
-                        self.suggestedStatus = None
-                        self.confidence = 0.5
-                        self.flags = []
-                
-                return FallbackResponse(response)
-                
-        except Exception as e:
-            class ErrorResponse:
-                def __init__(self, error):
-                    self.analysis = f"Error parsing response: {str(error)}"
-                    self.suggestedPriority = "P2"
-                    self.suggestedStatus = None
-                    self.confidence = 0.0
-                    self.flags = [{"code": "PARSE_ERROR", "message": str(error), "severity": "medium"}]
-            
-            return ErrorResponse(e)
+        return parse_ai_reply(response, extractor)
 
 # Initialize AI Manager
 ai_manager = MultiAIManager()
@@ -404,12 +1673,24 @@ ai_manager = MultiAIManager()
 # API Endpoints
 @app.get("/api/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint, reporting cached provider status without validating"""
+    now = time.time()
+    provider_status = {}
+    for provider in ai_manager.providers.values():
+        cached = ai_manager.validation_cache.get(provider.id)
+        provider_status[provider.id] = {
+            "status": provider.status,
+            "enabled": provider.enabled,
+            "last_validated": provider.last_validated,
+            "checked_seconds_ago": round(now - cached[0], 1) if cached else None
+        }
+    
     return {
         "status": "healthy", 
         "service": "RAIDMASTER Multi-AI API",
         "providers_count": len(ai_manager.providers),
-        "active_providers": len([p for p in ai_manager.providers.values() if p.status == "active"])
+        "active_providers": len([p for p in ai_manager.providers.values() if p.status == "active"]),
+        "providers": provider_status
     }
 
 @app.get("/api/ai/providers")
@@ -428,7 +1709,8 @@ async def get_providers():
             "enabled": provider.enabled,
             "status": provider.status,
             "last_validated": provider.last_validated,
-            "created_at": provider.created_at
+            "created_at": provider.created_at,
+            "options": provider.options
         })
     
     return {"providers": providers_list}
@@ -461,6 +1743,7 @@ async def update_provider(provider_id: str, updated_provider: AIProvider):
     
     # Update provider
     ai_manager.providers[provider_id] = updated_provider
+    ai_manager.validation_cache.pop(provider_id, None)
     
     return {"message": "Provider updated successfully"}
 
@@ -471,6 +1754,7 @@ async def delete_provider(provider_id: str):
         raise HTTPException(status_code=404, detail="Provider not found")
     
     del ai_manager.providers[provider_id]
+    ai_manager.validation_cache.pop(provider_id, None)
     return {"message": "Provider deleted successfully"}
 
 @app.post("/api/ai/providers/{provider_id}/validate")
@@ -480,72 +1764,237 @@ async def validate_provider(provider_id: str):
         raise HTTPException(status_code=404, detail="Provider not found")
     
     provider = ai_manager.providers[provider_id]
-    validation_result = await ai_manager.validate_provider(provider)
+    validation_result = await ai_manager.validate_cached(provider, force=True)
     
     return validation_result
 
 @app.post("/api/ai/providers/validate-all")
-async def validate_all_providers(background_tasks: BackgroundTasks):
-    """Validate all enabled providers in background"""
+async def validate_all_providers(force: bool = False):
+    """Validate all enabled providers in parallel, reusing fresh cached results unless forced"""
     enabled_providers = [p for p in ai_manager.providers.values() if p.enabled]
-    
-    async def validate_all():
-        for provider in enabled_providers:
-            await ai_manager.validate_provider(provider)
-    
-    background_tasks.add_task(validate_all)
+    results = await ai_manager.validate_providers(enabled_providers, force=force)
     
     return {
-        "message": f"Validation started for {len(enabled_providers)} providers",
-        "providers_count": len(enabled_providers)
+        "message": f"Validated {len(enabled_providers)} providers",
+        "providers_count": len(enabled_providers),
+        "results": [{"provider_id": provider_id, **result.dict()} for provider_id, result in results.items()]
     }
 
 @app.post("/api/analyze", response_model=AIAnalysisResponse)
 async def analyze_item(request: AIAnalysisRequest):
     """Analyze RAID item with AI"""
+    start_time = time.time()
     try:
-        # Use specific provider or get best available
-        if request.provider_id:
-            if request.provider_id not in ai_manager.providers:
-                raise HTTPException(status_code=404, detail="Provider not found")
-            provider = ai_manager.providers[request.provider_id]
+        # Reuse the stored analysis when the fields that feed the prompt are unchanged
+        if not request.force:
+            with tracer.span("analysis.stored_lookup") as span:
+                cached = get_stored_analysis(request.item, request.analysisType)
+                span.set_attribute("cache.hit", cached is not None)
+            if cached:
+                return cached
+        
+        # Deterministic rules answer clear-cut validations without an LLM call
+        with tracer.span("analysis.rules") as span:
+            rule_result = rule_engine.precheck(request.item, request.analysisType)
+            span.set_attribute("rules.confident", bool(rule_result and rule_result["confident"]))
+        if rule_result and rule_result["confident"]:
+            result = rule_engine.build_response(request.item, rule_result, start_time)
+            store_analysis_result(request.item.dict(), result, request.analysisType)
+            return result
+        
+        # Use specific provider or get best available
+        with tracer.span("ai.provider.select", requested=request.provider_id or "") as span:
+            if request.provider_id:
+                if request.provider_id not in ai_manager.providers:
+                    raise HTTPException(status_code=404, detail="Provider not found")
+                provider = ai_manager.providers[request.provider_id]
+            else:
+                provider = await ai_manager.get_best_provider()
+                if not provider:
+                    raise HTTPException(status_code=503, detail="No active AI providers available")
+            span.set_attribute("provider", provider.id)
+        
+        # Perform analysis, optionally hedged against a second provider
+        hedge = ai_manager.hedge_enabled if request.hedge is None else request.hedge
+        if hedge:
+            result = await ai_manager.analyze_hedged(request.item, provider, request.analysisType)
         else:
-            provider = await ai_manager.get_best_provider()
-            if not provider:
-                raise HTTPException(status_code=503, detail="No active AI providers available")
+            result = await ai_manager.analyze_with_provider(request.item, provider, request.analysisType)
         
-        # Perform analysis
-        result = await ai_manager.analyze_with_provider(request.item, provider, request.analysisType)
+        if rule_result:
+            result = result.copy(update={"flags": rule_engine.merge_flags(rule_result["flags"], result.flags)})
+        with tracer.span("storage.store_analysis"):
+            store_analysis_result(request.item.dict(), result, request.analysisType)
         return result
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/analyze/multi")
-async def analyze_multi_provider(request: AIAnalysisRequest):
-    """Analyze item using multiple providers for comparison"""
+async def _get_request_provider(provider_id: Optional[str]) -> AIProvider:
+    """Get the requested provider, or the best available one"""
+    if provider_id:
+        if provider_id not in ai_manager.providers:
+            raise HTTPException(status_code=404, detail="Provider not found")
+        return ai_manager.providers[provider_id]
+    
+    provider = await ai_manager.get_best_provider()
+    if not provider:
+        raise HTTPException(status_code=503, detail="No active AI providers available")
+    return provider
+
+def _get_multi_providers(request: AIMultiAnalysisRequest) -> List[AIProvider]:
+    """Get the active providers to use for a multi-provider analysis"""
     active_providers = [p for p in ai_manager.providers.values() if p.enabled and p.status == "active"]
     
     if not active_providers:
         raise HTTPException(status_code=503, detail="No active providers available")
     
-    # Analyze with up to 3 providers concurrently
-    tasks = []
-    for provider in active_providers[:3]:
-        task = ai_manager.analyze_with_provider(request.item, provider, request.analysisType)
-        tasks.append(task)
+    return active_providers[:max(1, request.max_providers)]
+
+def _build_consensus(results: List[AIAnalysisResponse]) -> Dict[str, Any]:
+    """Build consensus across multiple provider results"""
+    priorities = [r.suggestedPriority for r in results]
+    return {
+        "average_confidence": sum(r.confidence for r in results) / len(results) if results else 0,
+        "most_common_priority": max(set(priorities), key=priorities.count) if results else "P2"
+    }
+
+def _sse_event(event: str, data: Any) -> str:
+    """Format a server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/analyze/stream")
+async def analyze_item_stream(request: AIAnalysisRequest):
+    """Stream analysis tokens as server-sent events, ending with the parsed result"""
+    provider = await _get_request_provider(request.provider_id)
+    
+    async def event_stream():
+        async for event, data in ai_manager.stream_analysis(request.item, provider, request.analysisType):
+            if event == "token":
+                yield _sse_event("token", {"text": data})
+            else:
+                yield _sse_event("result", data.dict())
     
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/analyze/multi")
+async def analyze_multi_provider(request: AIMultiAnalysisRequest):
+    """Analyze item using multiple providers for comparison"""
+    providers = _get_multi_providers(request)
     
-    # Filter successful results
-    successful_results = [r for r in results if isinstance(r, AIAnalysisResponse)]
+    # Analyze with up to max_providers concurrently, each with its own deadline
+    successful_results = []
+    timed_out = []
+    async for provider, result in ai_manager.iter_multi_analysis(
+        request.item, providers, request.analysisType, request.provider_timeout, request.quorum
+    ):
+        if result is None:
+            timed_out.append(provider.id)
+        else:
+            successful_results.append(result)
     
     return {
         "results": successful_results,
         "providers_used": len(successful_results),
-        "consensus": {
-            "average_confidence": sum(r.confidence for r in successful_results) / len(successful_results) if successful_results else 0,
-            "most_common_priority": max(set(r.suggestedPriority for r in successful_results), key=[r.suggestedPriority for r in successful_results].count) if successful_results else "P2"
+        "timed_out": timed_out,
+        "consensus": _build_consensus(successful_results)
+    }
+
+@app.post("/api/analyze/multi/stream")
+async def analyze_multi_provider_stream(request: AIMultiAnalysisRequest):
+    """Stream each provider's analysis as server-sent events as soon as it arrives"""
+    providers = _get_multi_providers(request)
+    
+    async def event_stream():
+        results = []
+        finished = set()
+        async for provider, result in ai_manager.iter_multi_analysis(
+            request.item, providers, request.analysisType, request.provider_timeout, request.quorum
+        ):
+            finished.add(provider.id)
+            if result is None:
+                yield _sse_event("timeout", {"provider_id": provider.id, "provider": provider.name})
+            else:
+                results.append(result)
+                yield _sse_event("result", {"provider_id": provider.id, **result.dict()})
+        
+        yield _sse_event("consensus", {
+            **_build_consensus(results),
+            "providers_used": len(results),
+            "cancelled": [p.id for p in providers if p.id not in finished]
+        })
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/ai/hedging")
+async def get_hedging_stats():
+    """Get hedged request configuration and counters"""
+    stats = ai_manager.hedge_stats
+    return {
+        "enabled": ai_manager.hedge_enabled,
+        "budget": ai_manager.hedge_budget,
+        "requests": stats["requests"],
+        "hedged": stats["hedged"],
+        "hedge_wins": stats["hedge_wins"],
+        "hedged_fraction": stats["hedged"] / stats["requests"] if stats["requests"] else 0,
+        "hedge_delays": {
+            provider_id: round(ai_manager.get_hedge_delay(provider_id), 3)
+            for provider_id in ai_manager.providers
+        }
+    }
+
+@app.get("/api/ai/latency")
+async def get_latency_stats():
+    """Get total latency and time-to-first-byte percentiles per provider"""
+    return {"providers": ai_manager.get_latency_summary()}
+
+@app.get("/api/ai/coalescing")
+async def get_coalescing_stats():
+    """Get single-flight coalescing counters for analysis requests"""
+    stats = ai_manager.coalesce_stats
+    total = stats["upstream_calls"] + stats["coalesced"]
+    return {
+        "enabled": ai_manager.coalesce_enabled,
+        "requests": total,
+        "upstream_calls": stats["upstream_calls"],
+        "coalesced": stats["coalesced"],
+        "saved_fraction": stats["coalesced"] / total if total else 0,
+        "in_flight": len(ai_manager.in_flight)
+    }
+
+@app.get("/api/ai/usage")
+async def get_usage_dashboard():
+    """Get estimated token usage, cost and latency per provider and model"""
+    # Optional pricing as {"model": {"input": usd_per_1k_tokens, "output": usd_per_1k_tokens}}
+    pricing = json.loads(os.getenv("AI_MODEL_PRICING", "{}"))
+    latency = ai_manager.get_latency_summary()
+    
+    rows = []
+    for usage in ai_manager.token_usage.values():
+        price = pricing.get(usage["model"])
+        rows.append({
+            **usage,
+            "avg_prompt_tokens": round(usage["prompt_tokens"] / usage["calls"], 1) if usage["calls"] else 0,
+            "estimated_cost_usd": round(
+                usage["prompt_tokens"] / 1000 * price.get("input", 0) +
+                usage["completion_tokens"] / 1000 * price.get("output", 0), 4
+            ) if price else None,
+            "latency": latency.get(usage["provider_id"])
+        })
+    
+    return {
+        "providers": rows,
+        "totals": {
+            "calls": sum(r["calls"] for r in rows),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in rows),
+            "completion_tokens": sum(r["completion_tokens"] for r in rows),
+            "estimated_cost_usd": round(sum(r["estimated_cost_usd"] or 0 for r in rows), 4)
+        },
+        "prompt_budget": {
+            "title_tokens": ai_manager.prompt_title_tokens,
+            "description_tokens": ai_manager.prompt_description_tokens
         }
     }
 
@@ -565,9 +2014,679 @@ async def get_available_models():
         "gemini": [
             "gemini-2.5-pro", "gemini-2.5-flash", "gemini-2.0-flash", 
             "gemini-2.0-flash-lite", "gemini-1.5-pro", "gemini-1.5-flash"
-        ]
+        ],
+        "mock": list(MockLlmChat.PRESETS)
+    }
+
+# ============================================================================
+# ANALYSIS JOB QUEUE
+# ============================================================================
+
+def _atomic_write_json(path: str, data: Any):
+    """Write JSON to path via a temp file so a crash never leaves a partial file"""
+    with tracer.span("storage.write_json", path=os.path.basename(path)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+class TokenBucket:
+    """Async token bucket refilled continuously at a per-minute rate"""
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_seconds(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens are available, 0 if they are now"""
+        amount = min(amount, self.capacity)
+        self._refill()
+        return max(0.0, (amount - self.tokens) / self.rate)
+    
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """Take `amount` tokens if they are available now, without waiting"""
+        if self.lock.locked() or self.wait_seconds(amount) > 0:
+            return False
+        self.tokens -= min(amount, self.capacity)
+        return True
+    
+    async def acquire(self, amount: float = 1.0):
+        """Wait until `amount` tokens are available and take them"""
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class AIBatchRequest(BaseModel):
+    items: List[RAIDItem]
+    analysisType: str = "analysis"
+    provider_id: Optional[str] = None
+    async_job: bool = False  # Return job ids instead of waiting for results
+
+class AnalysisJobQueue:
+    """Persistent queue of analysis jobs served by a worker pool.
+    
+    Jobs are plain dicts persisted to RAID_DATA_DIR/analysis_jobs.json so queued
+    work survives a restart. Workers respect a per-provider concurrency limit and
+    requests/min rate limit, and retry failed analyses with exponential backoff.
+    Jobs without a pinned provider go to the least busy active provider with capacity
+    free; a job whose providers are all backing off or at their limits is put back
+    with a not_before time rather than holding a worker while it waits.
+    """
+    TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+    
+    def __init__(self, manager: MultiAIManager):
+        self.manager = manager
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.workers: List[asyncio.Task] = []
+        self.retry_tasks: Set[asyncio.Task] = set()
+        self.waiters: Dict[str, asyncio.Event] = {}
+        self.pending_by_item: Dict[tuple, str] = {}
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.rate_limiters: Dict[str, TokenBucket] = {}
+        self.running: Dict[str, int] = {}
+        self.counters = {"submitted": 0, "succeeded": 0, "failed": 0, "cancelled": 0, "retries": 0, "deferred": 0}
+        self.sequence = 0
+        self.dirty = False
+        self.persist_path = os.path.join(DATA_DIR, "analysis_jobs.json")
+        self.worker_count = int(os.getenv("AI_JOB_WORKERS", "4"))
+        self.provider_concurrency = int(os.getenv("AI_JOB_PROVIDER_CONCURRENCY", "2"))
+        self.provider_rpm = float(os.getenv("AI_JOB_PROVIDER_RPM", "60"))
+        self.provider_tpm = float(os.getenv("AI_JOB_PROVIDER_TPM", "100000"))
+        self.expected_output_tokens = int(os.getenv("AI_EXPECTED_OUTPUT_TOKENS", "400"))
+        self.max_attempts = int(os.getenv("AI_JOB_MAX_ATTEMPTS", "3"))
+        self.retry_base_delay = float(os.getenv("AI_JOB_RETRY_BASE_DELAY", "2.0"))
+        self.retention_seconds = float(os.getenv("AI_JOB_RETENTION_HOURS", "24")) * 3600
+        self.batch_timeout = float(os.getenv("AI_BATCH_TIMEOUT_SECONDS", "300"))
+        self.capacity_poll = float(os.getenv("AI_JOB_CAPACITY_POLL_SECONDS", "0.25"))
+    
+    async def start(self):
+        """Restore persisted jobs and start the worker pool"""
+        self.queue = asyncio.PriorityQueue()
+        self._load()
+        for job in sorted(self.jobs.values(), key=lambda j: j["enqueued_at"]):
+            if job["status"] not in self.TERMINAL_STATUSES:
+                job["status"] = "queued"
+                self.pending_by_item[(job["item"].get("id"), job["analysisType"])] = job["id"]
+                self._enqueue(job)
+        
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        self.workers.append(asyncio.create_task(self._flusher()))
+    
+    async def stop(self):
+        """Stop workers and flush job state to disk"""
+        tasks = self.workers + list(self.retry_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self.retry_tasks.clear()
+        await self._persist()
+    
+    def submit(self, item: RAIDItem, analysis_type: str = "analysis", provider_id: Optional[str] = None,
+               priority: int = 0, batch_id: Optional[str] = None, dedupe: bool = False) -> Dict[str, Any]:
+        """Submit an analysis job, lower priority values run first.
+        
+        With dedupe, a job still queued for the same item and analysis type is
+        refreshed with the latest item instead of queueing another one.
+        """
+        dedupe_key = (item.id, analysis_type)
+        if dedupe and dedupe_key in self.pending_by_item:
+            job = self.jobs[self.pending_by_item[dedupe_key]]
+            if job["status"] in ("queued", "retrying"):
+                job["item"] = item.dict()
+                self.dirty = True
+                return job
+        
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": "queued",
+            "item": item.dict(),
+            "analysisType": analysis_type,
+            "provider_id": provider_id,
+            "priority": priority,
+            "batch_id": batch_id,
+            "attempts": 0,
+            "created_at": datetime.utcnow().isoformat(),
+            "enqueued_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+        self.jobs[job["id"]] = job
+        self.pending_by_item[dedupe_key] = job["id"]
+        self.counters["submitted"] += 1
+        self._enqueue(job)
+        return job
+    
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait for a job to reach a terminal status"""
+        job = self.jobs[job_id]
+        if job["status"] not in self.TERMINAL_STATUSES:
+            event = self.waiters.setdefault(job_id, asyncio.Event())
+            await asyncio.wait_for(event.wait(), timeout)
+        return job
+    
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, age and outcome counters"""
+        now = time.time()
+        by_status: Dict[str, int] = {}
+        for job in self.jobs.values():
+            by_status[job["status"]] = by_status.get(job["status"], 0) + 1
+        queued = [j["enqueued_at"] for j in self.jobs.values() if j["status"] == "queued"]
+        return {
+            "queue_depth": len(queued),
+            "oldest_queued_age_seconds": round(now - min(queued), 3) if queued else 0,
+            "by_status": by_status,
+            "running_by_provider": dict(self.running),
+            "backoff_seconds_by_provider": {
+                provider_id: round(until - now, 1)
+                for provider_id, until in self.manager.backoff_until.items() if until > now
+            },
+            "workers": self.worker_count,
+            **self.counters
+        }
+    
+    def _enqueue(self, job: Dict[str, Any]):
+        self.sequence += 1
+        self.queue.put_nowait((job["priority"], self.sequence, job["id"]))
+        self.dirty = True
+    
+    def _candidate_providers(self, job: Dict[str, Any]) -> List[AIProvider]:
+        if job["provider_id"]:
+            provider = self.manager.providers.get(job["provider_id"])
+            return [provider] if provider else []
+        return [p for p in self.manager.providers.values() if p.enabled and p.status == "active"]
+    
+    def _ready_in(self, provider_id: str, tokens: int) -> float:
+        """Seconds until the provider can take a job of `tokens` tokens, 0 if it can now"""
+        semaphore, (request_bucket, token_bucket) = self._provider_limits(provider_id)
+        wait = max(self.manager.backoff_until.get(provider_id, 0) - time.time(),
+                   request_bucket.wait_seconds(), token_bucket.wait_seconds(tokens))
+        if semaphore.locked():
+            wait = max(wait, self.capacity_poll)  # Frees when a running job finishes
+        return max(0.0, wait)
+    
+    def _resolve_provider(self, job: Dict[str, Any], tokens: int) -> tuple:
+        """(provider, 0) for the least busy candidate that is ready, else (None, seconds to wait)"""
+        candidates = self._candidate_providers(job)
+        if not candidates:
+            return None, None
+        waits = {provider.id: self._ready_in(provider.id, tokens) for provider in candidates}
+        ready = [provider for provider in candidates if waits[provider.id] == 0]
+        if not ready:
+            return None, min(waits.values())
+        return min(ready, key=lambda p: self.running.get(p.id, 0)), 0.0
+    
+    def _provider_limits(self, provider_id: str):
+        if provider_id not in self.semaphores:
+            self.semaphores[provider_id] = asyncio.Semaphore(self.provider_concurrency)
+            self.rate_limiters[provider_id] = (TokenBucket(self.provider_rpm), TokenBucket(self.provider_tpm))
+        return self.semaphores[provider_id], self.rate_limiters[provider_id]
+    
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet"""
+        job = self.jobs.get(job_id)
+        if not job or job["status"] not in ("queued", "retrying"):
+            return False
+        self._finish(job, "cancelled")
+        return True
+    
+    async def _worker(self):
+        while True:
+            _, _, job_id = await self.queue.get()
+            job = self.jobs.get(job_id)
+            try:
+                if job and job["status"] == "queued":
+                    await self._run_job(job)
+            except Exception as e:
+                self._finish(job, "failed", error=str(e)[:200])
+            finally:
+                self.queue.task_done()
+    
+    async def _run_job(self, job: Dict[str, Any]):
+        item = RAIDItem(**job["item"])
+        rule_result = rule_engine.precheck(item, job["analysisType"])
+        if rule_result and rule_result["confident"]:
+            result = rule_engine.build_response(item, rule_result, time.time())
+            store_analysis_result(job["item"], result, job["analysisType"])
+            job["result"] = result.dict()
+            self._finish(job, "succeeded")
+            return
+        
+        prompt = self.manager._build_analysis_prompt(item, job["analysisType"])
+        tokens = estimate_tokens(prompt) + self.expected_output_tokens
+        provider, wait = self._resolve_provider(job, tokens)
+        if wait is None:
+            self._retry_or_fail(job, "No active AI providers available")
+            return
+        if provider is None:
+            # Every candidate is backing off or at its limits; free the worker for other providers' jobs
+            job["not_before"] = datetime.utcfromtimestamp(time.time() + wait).isoformat()
+            self.counters["deferred"] += 1
+            self._requeue_later(job, wait)
+            return
+        
+        semaphore, (request_bucket, token_bucket) = self._provider_limits(provider.id)
+        # Capacity was checked just above with no await since, so none of this waits
+        async with semaphore:
+            request_bucket.try_acquire()
+            token_bucket.try_acquire(tokens)
+            job.pop("not_before", None)
+            job["status"] = "running"
+            job["attempts"] += 1
+            job["started_at"] = datetime.utcnow().isoformat()
+            self.running[provider.id] = self.running.get(provider.id, 0) + 1
+            self.dirty = True
+            try:
+                result = await self.manager.analyze_with_provider(item, provider, job["analysisType"])
+            finally:
+                self.running[provider.id] -= 1
+        
+        if rule_result:
+            result = result.copy(update={"flags": rule_engine.merge_flags(rule_result["flags"], result.flags)})
+        job["result"] = result.dict()
+        if self.manager.is_successful_analysis(result):
+            store_analysis_result(job["item"], result, job["analysisType"])
+            self._finish(job, "succeeded")
+        else:
+            self._retry_or_fail(job, result.flags[0].get("message") if result.flags else "Analysis failed")
+    
+    def _retry_or_fail(self, job: Dict[str, Any], error: str):
+        job["error"] = error
+        if job["attempts"] >= self.max_attempts:
+            self._finish(job, "failed", error=error)
+            return
+        
+        # Exponential backoff with jitter before the job is queued again, never sooner than retry-after
+        delay = self.retry_base_delay * (2 ** max(0, job["attempts"] - 1)) * random.uniform(0.8, 1.2)
+        if job["provider_id"]:
+            delay = max(delay, self.manager.backoff_until.get(job["provider_id"], 0) - time.time())
+        job["status"] = "retrying"
+        self.counters["retries"] += 1
+        self._requeue_later(job, delay)
+    
+    def _requeue_later(self, job: Dict[str, Any], delay: float):
+        """Put a retrying or deferred job back on the queue after `delay` seconds"""
+        self.dirty = True
+        
+        async def requeue():
+            await asyncio.sleep(delay)
+            if job["status"] in ("queued", "retrying"):
+                job["status"] = "queued"
+                self._enqueue(job)
+        
+        # The loop only keeps weak references to tasks, so hold one until the requeue runs
+        task = asyncio.create_task(requeue())
+        self.retry_tasks.add(task)
+        task.add_done_callback(self.retry_tasks.discard)
+    
+    def _finish(self, job: Dict[str, Any], status: str, error: Optional[str] = None):
+        job["status"] = status
+        job["finished_at"] = datetime.utcnow().isoformat()
+        job["finished_ts"] = time.time()
+        if error:
+            job["error"] = error
+        self.counters[status] += 1
+        self.dirty = True
+        dedupe_key = (job["item"].get("id"), job["analysisType"])
+        if self.pending_by_item.get(dedupe_key) == job["id"]:
+            del self.pending_by_item[dedupe_key]
+        event = self.waiters.pop(job["id"], None)
+        if event:
+            event.set()
+    
+    def _load(self):
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path) as f:
+                self.jobs = {job["id"]: job for job in json.load(f)}
+        except (OSError, ValueError):
+            self.jobs = {}
+    
+    async def _persist(self):
+        # Drop finished jobs past retention before writing the snapshot
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j["id"] for j in self.jobs.values() if j.get("finished_ts", cutoff + 1) < cutoff]:
+            del self.jobs[job_id]
+        self.dirty = False
+        await asyncio.to_thread(_atomic_write_json, self.persist_path, list(self.jobs.values()))
+    
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(1.0)
+            if self.dirty:
+                try:
+                    await self._persist()
+                except OSError:
+                    self.dirty = True
+
+job_queue = AnalysisJobQueue(ai_manager)
+
+class PortfolioReanalysisScheduler:
+    """Nightly re-analysis of stale open items through the job queue.
+    
+    Items are dispatched in priority order with a bounded number outstanding, so the
+    queue's per-provider request/token buckets and retry-after backoff set the pace.
+    Progress is checkpointed to RAID_DATA_DIR so a restart resumes the same run, and
+    dispatch stops when the configured window closes.
+    """
+    def __init__(self, queue: AnalysisJobQueue):
+        self.queue = queue
+        self.enabled = os.getenv("AI_NIGHTLY_ENABLED", "false").lower() == "true"
+        self.window_start = os.getenv("AI_NIGHTLY_START", "02:00")  # UTC HH:MM
+        self.window_minutes = float(os.getenv("AI_NIGHTLY_WINDOW_MINUTES", "240"))
+        self.max_age_hours = float(os.getenv("AI_NIGHTLY_MAX_AGE_HOURS", "20"))
+        self.max_outstanding = int(os.getenv("AI_NIGHTLY_MAX_OUTSTANDING", "8"))
+        self.checkpoint_path = os.path.join(DATA_DIR, "nightly_reanalysis.json")
+        self.state: Dict[str, Any] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.run_task: Optional[asyncio.Task] = None
+        self.run_lock = asyncio.Lock()  # One run at a time, whether nightly or triggered
+    
+    def start(self):
+        """Resume an interrupted run and schedule nightly runs"""
+        self.state = self._load_checkpoint()
+        if self.task is None and (self.enabled or self.state.get("status") == "running"):
+            self.task = asyncio.create_task(self._loop())
+    
+    def trigger(self, window_minutes: Optional[float] = None) -> bool:
+        """Start a run now unless one is already in progress"""
+        if self.run_lock.locked() or (self.run_task and not self.run_task.done()):
+            return False
+        self.run_task = asyncio.create_task(self.run(window_minutes))
+        return True
+    
+    async def stop(self):
+        for task in (self.task, self.run_task):
+            if task:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self.task = self.run_task = None
+    
+    def select_items(self) -> List[Dict[str, Any]]:
+        """Open items whose analysis is missing, stale or too old, most important first"""
+        cutoff = (datetime.utcnow() - timedelta(hours=self.max_age_hours)).isoformat()
+        stale = []
+        for item in raid_items_db:
+            if item.get("status") in CLOSED_STATUSES:
+                continue
+            record = _analysis_record(item, "analysis")
+            if (record is None or record.get("stale") or record["inputHash"] != compute_analysis_hash(item)
+                    or record.get("lastAnalyzedAt", "") < cutoff):
+                stale.append(item)
+        
+        priority_rank = {p: i for i, p in enumerate(VALID_PRIORITIES)}
+        stale.sort(key=lambda i: (priority_rank.get(i.get("priority"), len(VALID_PRIORITIES)), -(i.get("severityScore") or 0)))
+        return stale
+    
+    async def run(self, window_minutes: Optional[float] = None):
+        """Run (or resume) a re-analysis pass until done or the window closes.
+        
+        Returns at once if another run is in progress, so the nightly window opening
+        during a triggered run does not resume the same state twice.
+        """
+        if self.run_lock.locked():
+            return self.state
+        async with self.run_lock:
+            try:
+                return await self._run(window_minutes)
+            except Exception as e:
+                # A terminal status lets trigger() and the nightly loop start the next run
+                self.state["status"] = "failed"
+                self.state["error"] = str(e)[:200]
+                self.state["finished_at"] = datetime.utcnow().isoformat()
+                try:
+                    await self._checkpoint()
+                except OSError:
+                    pass
+                return self.state
+    
+    async def _run(self, window_minutes: Optional[float]):
+        if self.state.get("status") != "running":
+            window = window_minutes or self.window_minutes
+            self.state = {
+                "run_id": str(uuid.uuid4()),
+                "status": "running",
+                "started_at": datetime.utcnow().isoformat(),
+                "deadline": time.time() + window * 60,
+                "done": [],
+                "failed": []
+            }
+            await self._checkpoint()
+        
+        deadline = self.state["deadline"]
+        done = set(self.state["done"]) | set(self.state["failed"])
+        items = [item for item in self.select_items() if item["id"] not in done]
+        self.state["remaining"] = len(items)
+        outstanding: Dict[asyncio.Task, str] = {}
+        submitted: Dict[str, str] = {}  # item id -> job id created by this run
+        
+        async def wait_for_some(timeout: Optional[float]):
+            finished, _ = await asyncio.wait(outstanding, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                job = task.result()
+                self.state["done" if job["status"] == "succeeded" else "failed"].append(outstanding.pop(task))
+                self.state["remaining"] -= 1
+            if finished:
+                await self._checkpoint()
+        
+        try:
+            for item in items:
+                while len(outstanding) >= self.max_outstanding and time.time() < deadline:
+                    await wait_for_some(deadline - time.time())
+                if time.time() >= deadline:
+                    break
+                existing_job_id = self.queue.pending_by_item.get((item["id"], "analysis"))
+                job = self.queue.submit(RAIDItem(**item), "analysis", priority=2, dedupe=True)
+                if job["id"] != existing_job_id:
+                    submitted[item["id"]] = job["id"]
+                outstanding[asyncio.create_task(self.queue.wait(job["id"]))] = item["id"]
+            
+            while outstanding and time.time() < deadline:
+                await wait_for_some(deadline - time.time())
+        finally:
+            # Jobs this run queued that are still waiting when the window closes are left for
+            # the next run; jobs it merely joined belong to whoever submitted them
+            for task, item_id in outstanding.items():
+                task.cancel()
+                if item_id in submitted:
+                    self.queue.cancel(submitted[item_id])
+        
+        self.state["status"] = "completed" if self.state["remaining"] == 0 else "window_closed"
+        self.state["finished_at"] = datetime.utcnow().isoformat()
+        await self._checkpoint()
+        return self.state
+    
+    def seconds_until_window(self) -> float:
+        hour, minute = (int(part) for part in self.window_start.split(":"))
+        now = datetime.utcnow()
+        start = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if start <= now:
+            start += timedelta(days=1)
+        return (start - now).total_seconds()
+    
+    async def _loop(self):
+        if self.state.get("status") == "running":
+            await self.run()
+        while self.enabled:
+            await asyncio.sleep(self.seconds_until_window())
+            await self.run()
+    
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        try:
+            with open(self.checkpoint_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # A run interrupted after its window closed is not resumed
+        if state.get("status") == "running" and state.get("deadline", 0) <= time.time():
+            state["status"] = "window_closed"
+        return state
+    
+    async def _checkpoint(self):
+        await asyncio.to_thread(_atomic_write_json, self.checkpoint_path, self.state)
+
+reanalysis_scheduler = PortfolioReanalysisScheduler(job_queue)
+
+@app.on_event("startup")
+async def start_background_services():
+    """Start background workers"""
+    await job_queue.start()
+    ai_manager.start_health_prober()
+    reanalysis_scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_background_services():
+    """Stop background workers"""
+    await ai_manager.stop_health_prober()
+    await reanalysis_scheduler.stop()
+    await job_queue.stop()
+
+def _job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job status without the submitted item payload"""
+    return {k: v for k, v in job.items() if k not in ("item", "finished_ts")} | {
+        "item_id": job["item"].get("id"),
+        "age_seconds": round(time.time() - job["enqueued_at"], 3)
+    }
+
+@app.post("/api/analyze/jobs", status_code=202)
+async def submit_analysis_job(request: AIAnalysisRequest):
+    """Submit RAID item analysis to the job queue"""
+    if request.provider_id and request.provider_id not in ai_manager.providers:
+        raise HTTPException(status_code=404, detail="Provider not found")
+    
+    job = job_queue.submit(request.item, request.analysisType, request.provider_id)
+    return {"job_id": job["id"], "status": job["status"]}
+
+@app.post("/api/batch-analyze")
+async def batch_analyze(request: AIBatchRequest):
+    """Analyze multiple RAID items through the job queue"""
+    if request.provider_id and request.provider_id not in ai_manager.providers:
+        raise HTTPException(status_code=404, detail="Provider not found")
+    
+    batch_id = str(uuid.uuid4())
+    jobs = [
+        job_queue.submit(item, request.analysisType, request.provider_id, priority=1, batch_id=batch_id)
+        for item in request.items
+    ]
+    
+    if request.async_job:
+        return {"batch_id": batch_id, "job_ids": [job["id"] for job in jobs]}
+    
+    # Jobs still unfinished at the timeout keep running and can be polled by batch_id
+    await asyncio.gather(*(job_queue.wait(job["id"], job_queue.batch_timeout) for job in jobs),
+                         return_exceptions=True)
+    
+    results = []
+    for job in jobs:
+        result = job["result"] or {}
+        if job["status"] == "failed":
+            error = job["error"]
+        elif job["status"] not in job_queue.TERMINAL_STATUSES:
+            error = f"Timed out after {job_queue.batch_timeout:.0f}s, job still {job['status']}"
+        else:
+            error = None
+        results.append({
+            "itemId": job["item"].get("id"),
+            "itemTitle": job["item"].get("title"),
+            "analysis": result.get("analysis", ""),
+            "suggestedPriority": result.get("suggestedPriority", job["item"].get("priority")),
+            "suggestedStatus": result.get("suggestedStatus"),
+            "confidence": result.get("confidence", 0.0),
+            "flags": result.get("flags", []),
+            "error": error
+        })
+    
+    return {"batch_id": batch_id, "results": results}
+
+@app.get("/api/ai/reanalysis")
+async def get_reanalysis_status():
+    """Get nightly re-analysis schedule and checkpointed progress"""
+    state = reanalysis_scheduler.state
+    return {
+        "enabled": reanalysis_scheduler.enabled,
+        "window_start_utc": reanalysis_scheduler.window_start,
+        "window_minutes": reanalysis_scheduler.window_minutes,
+        "next_window_in_seconds": round(reanalysis_scheduler.seconds_until_window()),
+        "stale_items": len(reanalysis_scheduler.select_items()),
+        "run": {
+            **{k: v for k, v in state.items() if k not in ("done", "failed")},
+            "done": len(state.get("done", [])),
+            "failed": len(state.get("failed", []))
+        } if state else None
     }
 
+@app.post("/api/ai/reanalysis/run", status_code=202)
+async def run_reanalysis(window_minutes: Optional[float] = None):
+    """Start a re-analysis pass now, in the background"""
+    if not reanalysis_scheduler.trigger(window_minutes):
+        raise HTTPException(status_code=409, detail="A re-analysis run is already in progress")
+    
+    return {"message": "Re-analysis run started", "stale_items": len(reanalysis_scheduler.select_items())}
+
+@app.get("/api/jobs/stats")
+async def get_job_stats():
+    """Get job queue depth, age and outcome metrics"""
+    return job_queue.stats()
+
+@app.get("/api/jobs")
+async def list_jobs(batch_id: Optional[str] = None, status: Optional[str] = None):
+    """List analysis jobs, optionally filtered by batch or status"""
+    jobs = [
+        _job_response(job) for job in job_queue.jobs.values()
+        if (batch_id is None or job["batch_id"] == batch_id) and (status is None or job["status"] == status)
+    ]
+    return {"jobs": jobs, "total": len(jobs)}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Get analysis job status and result, optionally waiting up to `wait` seconds"""
+    if job_id not in job_queue.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if wait > 0:
+        try:
+            await job_queue.wait(job_id, timeout=min(wait, 60))
+        except asyncio.TimeoutError:
+            pass
+    
+    return _job_response(job_queue.jobs[job_id])
+
+@app.get("/api/jobs/{job_id}/events")
+async def subscribe_job(job_id: str):
+    """Stream job status as server-sent events until it completes"""
+    if job_id not in job_queue.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        yield _sse_event("status", _job_response(job_queue.jobs[job_id]))
+        while True:
+            try:
+                job = await job_queue.wait(job_id, timeout=15)
+                yield _sse_event("complete", _job_response(job))
+                return
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
 # ============================================================================
 # RAID ITEMS CRUD ENDPOINTS
 # ============================================================================
@@ -596,6 +2715,83 @@ def add_history_entry(item: RAIDItem, action: str, actor: str = "System", note:
     }
     item.history.append(entry)
 
+# Fields that feed _build_analysis_prompt; a stored analysis is stale once any changes
+ANALYSIS_INPUT_FIELDS = ("type", "title", "description", "status", "priority",
+                         "impact", "likelihood", "workstream", "owner", "dueDate")
+
+def compute_analysis_hash(item: Dict[str, Any]) -> str:
+    """Hash the item fields that feed the analysis prompt"""
+    payload = json.dumps([item.get(field) for field in ANALYSIS_INPUT_FIELDS], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _find_raid_item(item_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    return next((item for item in raid_items_db if item["id"] == item_id), None) if item_id else None
+
+def _analysis_record(item: Dict[str, Any], analysis_type: str) -> Optional[Dict[str, Any]]:
+    """Stored analysis of a type; validation results live under ai["validation"]"""
+    ai = item.get("ai") or {}
+    record = ai.get("validation") if analysis_type == "validation" else ai
+    return record if record and record.get("inputHash") else None
+
+def store_analysis_result(item_snapshot: Dict[str, Any], result: AIAnalysisResponse, analysis_type: str):
+    """Persist a successful analysis on the stored item with the hash of the fields it was based on"""
+    item = _find_raid_item(item_snapshot.get("id"))
+    if item is None or not ai_manager.is_successful_analysis(result):
+        return
+    
+    record = {
+        "analysis": result.analysis,
+        "suggestedPriority": result.suggestedPriority,
+        "suggestedStatus": result.suggestedStatus,
+        "validationNotes": "; ".join(f.get("message", "") for f in result.flags),
+        "confidence": result.confidence,
+        "flags": result.flags,
+        "provider_used": result.provider_used,
+        "analysisType": analysis_type,
+        "lastAnalyzedAt": datetime.utcnow().isoformat(),
+        "inputHash": compute_analysis_hash(item_snapshot),
+        "stale": False
+    }
+    
+    ai = item.get("ai") or {}
+    if analysis_type == "validation":
+        item["ai"] = {**ai, "validation": record}
+    else:
+        if ai.get("validation"):
+            record["validation"] = ai["validation"]
+        item["ai"] = record
+
+def get_stored_analysis(item: RAIDItem, analysis_type: str) -> Optional[AIAnalysisResponse]:
+    """Stored analysis for the item if it was computed from the same input fields"""
+    stored_item = _find_raid_item(item.id)
+    record = _analysis_record(stored_item, analysis_type) if stored_item else None
+    if not record or record["inputHash"] != compute_analysis_hash(item.dict()):
+        CACHE_REQUESTS.inc(("stored_analysis", "miss"))
+        return None
+    
+    CACHE_REQUESTS.inc(("stored_analysis", "hit"))
+    
+    return AIAnalysisResponse(
+        analysis=record["analysis"],
+        suggestedPriority=record["suggestedPriority"],
+        suggestedStatus=record.get("suggestedStatus"),
+        confidence=record["confidence"],
+        flags=record["flags"],
+        provider_used=f"{record['provider_used']} (stored)",
+        response_time=0.0
+    )
+
+def mark_stale_analyses(item: Dict[str, Any]) -> List[str]:
+    """Flag stored analyses whose input hash no longer matches, returning their types"""
+    input_hash = compute_analysis_hash(item)
+    stale_types = []
+    for analysis_type in ("analysis", "validation"):
+        record = _analysis_record(item, analysis_type)
+        if record and record["inputHash"] != input_hash:
+            record["stale"] = True
+            stale_types.append(analysis_type)
+    return stale_types
+
 @app.get("/api/raid-items")
 async def get_raid_items():
     """Get all RAID items"""
@@ -607,14 +2803,14 @@ async def get_raid_items():
 @app.get("/api/raid-items/{item_id}")
 async def get_raid_item(item_id: str):
     """Get specific RAID item by ID"""
-    item = next((item for item in raid_items_db if item["id"] == item_id), None)
+    with tracer.span("storage.find", register_size=len(raid_items_db)):
+        item = next((item for item in raid_items_db if item["id"] == item_id), None)
     if not item:
         raise HTTPException(status_code=404, detail="RAID item not found")
     return item
 
-@app.post("/api/raid-items")
-async def create_raid_item(item_data: RAIDItemCreate):
-    """Create new RAID item"""
+def build_raid_item(item_data: RAIDItemCreate, actor: str = "User", note: str = "") -> Dict[str, Any]:
+    """Build a new stored RAID item with ID, timestamps, severity and creation history"""
     # Generate ID and timestamps
     item_id = str(uuid.uuid4())
     now = datetime.utcnow().isoformat()
@@ -635,22 +2831,34 @@ async def create_raid_item(item_data: RAIDItemCreate):
     )
     
     # Add creation history entry
-    add_history_entry(new_item, "Item Created", "User")
-    
-    # Convert to dict and store
-    item_dict = new_item.dict()
-    raid_items_db.append(item_dict)
+    add_history_entry(new_item, "Item Created", actor, note)
+    return new_item.dict()
+
+@app.post("/api/raid-items")
+async def create_raid_item(item_data: RAIDItemCreate):
+    """Create new RAID item"""
+    item_dict = build_raid_item(item_data)
+    # Look for duplicates before indexing so the new item doesn't match itself
+    with tracer.span("duplicates.find") as span:
+        duplicates = _duplicate_matches(duplicate_index.find(item_data.title, item_data.description))
+        span.set_attribute("duplicates.count", len(duplicates))
+    with tracer.span("storage.insert", register_size=len(raid_items_db)):
+        raid_items_db.append(item_dict)
+    with tracer.span("duplicates.index"):
+        duplicate_index.add(item_dict)
     
     return {
         "message": "RAID item created successfully",
-        "item": item_dict
+        "item": item_dict,
+        "possible_duplicates": duplicates
     }
 
 @app.put("/api/raid-items/{item_id}")
 async def update_raid_item(item_id: str, updates: RAIDItemUpdate):
     """Update existing RAID item"""
     # Find item
-    item_index = next((i for i, item in enumerate(raid_items_db) if item["id"] == item_id), None)
+    with tracer.span("storage.find", register_size=len(raid_items_db)):
+        item_index = next((i for i, item in enumerate(raid_items_db) if item["id"] == item_id), None)
     if item_index is None:
         raise HTTPException(status_code=404, detail="RAID item not found")
     
@@ -670,6 +2878,15 @@ async def update_raid_item(item_id: str, updates: RAIDItemUpdate):
     
     # Update item
     current_item.update(update_data)
+    if "title" in update_data or "description" in update_data:
+        with tracer.span("duplicates.index"):
+            duplicate_index.add(current_item)
+    
+    # Re-analyze only when fields that fed the stored analysis changed
+    if "ai" not in update_data:
+        for analysis_type in mark_stale_analyses(current_item):
+            if ai_manager.reanalyze_on_update:
+                job_queue.submit(RAIDItem(**current_item), analysis_type, priority=1, dedupe=True)
     
     # Add history entry for significant changes
     if any(k in update_data for k in ["status", "priority", "owner", "dueDate"]):
@@ -696,17 +2913,40 @@ async def update_raid_item(item_id: str, updates: RAIDItemUpdate):
 @app.delete("/api/raid-items/{item_id}")
 async def delete_raid_item(item_id: str):
     """Delete RAID item"""
-    item_index = next((i for i, item in enumerate(raid_items_db) if item["id"] == item_id), None)
+    with tracer.span("storage.find", register_size=len(raid_items_db)):
+        item_index = next((i for i, item in enumerate(raid_items_db) if item["id"] == item_id), None)
     if item_index is None:
         raise HTTPException(status_code=404, detail="RAID item not found")
     
-    deleted_item = raid_items_db.pop(item_index)
+    with tracer.span("storage.delete"):
+        deleted_item = raid_items_db.pop(item_index)
+        duplicate_index.remove(item_id)
+        upload_store.detach_item(item_id)
     
     return {
         "message": "RAID item deleted successfully",
         "deleted_item": deleted_item
     }
 
+@app.post("/api/raid-items/ai/refresh-stale")
+async def refresh_stale_analyses(include_unanalyzed: bool = False, analysisType: str = "analysis"):
+    """Queue re-analysis only for items whose analysis inputs changed since the last run"""
+    job_ids = []
+    for item in raid_items_db:
+        record = _analysis_record(item, analysisType)
+        if record is None and not include_unanalyzed:
+            continue
+        if record is None or record["inputHash"] != compute_analysis_hash(item):
+            job = job_queue.submit(RAIDItem(**item), analysisType, priority=1, dedupe=True)
+            job_ids.append(job["id"])
+    
+    return {
+        "message": f"Queued re-analysis for {len(job_ids)} items",
+        "checked": len(raid_items_db),
+        "queued": len(job_ids),
+        "job_ids": job_ids
+    }
+
 @app.get("/api/raid-items/stats/dashboard")
 async def get_dashboard_stats():
     """Get dashboard statistics"""
@@ -765,64 +3005,2801 @@ async def get_dashboard_stats():
     }
 
 # ============================================================================
-# FILE UPLOAD ENDPOINTS
+# RULE-BASED VALIDATION
 # ============================================================================
 
-from fastapi import UploadFile, File
-from fastapi.responses import FileResponse
-import shutil
+class RAIDRuleEngine:
+    """Deterministic data-quality checks evaluated locally before any LLM validation.
+    
+    Rules run column by column over the whole register in one pass. When the rules
+    find a definite defect the validation answer is known, so the LLM call is skipped.
+    """
+    REQUIRED_FIELDS = ("type", "title", "description", "status", "priority",
+                       "impact", "likelihood", "workstream", "owner")
+    ENUM_FIELDS = (("type", VALID_TYPES), ("status", VALID_STATUSES), ("priority", VALID_PRIORITIES),
+                   ("impact", VALID_IMPACTS), ("likelihood", VALID_LIKELIHOODS))
+    # Statuses that make no sense for an item type
+    INVALID_STATUS_FOR_TYPE = {
+        "Assumption": {"Mitigating"},
+        "Dependency": {"Mitigating"},
+        "Issue": {"Proposed"}
+    }
+    # Severity score (impact x likelihood) to expected priority
+    PRIORITY_BY_SCORE = {12: "P0", 9: "P0", 8: "P1", 6: "P1", 4: "P2", 3: "P2", 2: "P3", 1: "P3"}
+    MIN_DESCRIPTION_WORDS = 5
+    
+    def __init__(self):
+        self.skip_llm_confidence = float(os.getenv("RULES_SKIP_LLM_CONFIDENCE", "0.9"))
+        self.stats = {"passes": 0, "items_evaluated": 0, "llm_calls_avoided": 0, "last_pass_ms": 0.0}
+    
+    def evaluate(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Evaluate all rules over a list of item dicts"""
+        start_time = time.perf_counter()
+        flags: List[List[Dict[str, Any]]] = [[] for _ in items]
+        columns = {field: [item.get(field) for item in items]
+                   for field in self.REQUIRED_FIELDS + ("id", "dueDate")}
+        
+        for field in self.REQUIRED_FIELDS:
+            for i, value in enumerate(columns[field]):
+                if not value or (isinstance(value, str) and value.isspace()):
+                    flags[i].append(self._flag("MISSING_FIELD", f"Required field '{field}' is empty", "high", field))
+        
+        for field, allowed in self.ENUM_FIELDS:
+            allowed = frozenset(allowed)
+            for i, value in enumerate(columns[field]):
+                if value and value not in allowed:
+                    flags[i].append(self._flag("INVALID_VALUE", f"'{value}' is not a valid {field}", "high", field))
+        
+        for i, description in enumerate(columns["description"]):
+            if description and len(description.split()) < self.MIN_DESCRIPTION_WORDS:
+                flags[i].append(self._flag("VAGUE_DESCRIPTION", "Description is too short to be actionable",
+                                           "medium", "description"))
+        
+        expected_lookup = {}
+        for impact, likelihood in set(zip(columns["impact"], columns["likelihood"])):
+            expected_lookup[(impact, likelihood)] = self.PRIORITY_BY_SCORE[calculate_severity_score(impact, likelihood)]
+        expected_priorities = [expected_lookup[pair] for pair in zip(columns["impact"], columns["likelihood"])]
+        for i, (priority, expected) in enumerate(zip(columns["priority"], expected_priorities)):
+            if priority in VALID_PRIORITIES and priority != expected:
+                gap = abs(VALID_PRIORITIES.index(priority) - VALID_PRIORITIES.index(expected))
+                flags[i].append(self._flag(
+                    "PRIORITY_MISMATCH",
+                    f"Priority {priority} does not match impact/likelihood (expected {expected})",
+                    "high" if gap >= 2 else "medium", "priority"
+                ))
+        
+        for i, (item_type, status) in enumerate(zip(columns["type"], columns["status"])):
+            if status in self.INVALID_STATUS_FOR_TYPE.get(item_type, ()):
+                flags[i].append(self._flag("STATUS_TYPE_MISMATCH", f"Status '{status}' is not appropriate for item type {item_type}",
+                                           "medium", "status"))
+        
+        today = datetime.utcnow().isoformat()[:10]
+        for i, (due_date, status, item_type) in enumerate(zip(columns["dueDate"], columns["status"], columns["type"])):
+            if status in CLOSED_STATUSES:
+                continue
+            if due_date and due_date[:10] < today:
+                flags[i].append(self._flag("OVERDUE", f"Due date {due_date[:10]} has passed", "medium", "dueDate"))
+            elif not due_date and item_type != "Assumption":
+                flags[i].append(self._flag("MISSING_DUE_DATE", "Open item has no due date", "low", "dueDate"))
+        
+        results = []
+        for item_id, item_flags, expected in zip(columns["id"], flags, expected_priorities):
+            # A high-severity defect is a definite answer; otherwise the LLM can still judge clarity
+            if any(f["severity"] == "high" for f in item_flags):
+                confidence = 0.95
+            elif item_flags:
+                confidence = 0.8
+            else:
+                confidence = 0.6
+            results.append({
+                "item_id": item_id,
+                "flags": item_flags,
+                "expected_priority": expected,
+                "confidence": confidence,
+                "confident": confidence >= self.skip_llm_confidence
+            })
+        
+        self.stats["passes"] += 1
+        self.stats["items_evaluated"] += len(items)
+        self.stats["last_pass_ms"] = round((time.perf_counter() - start_time) * 1000, 3)
+        return results
+    
+    def precheck(self, item: RAIDItem, analysis_type: str) -> Optional[Dict[str, Any]]:
+        """Run rules ahead of an LLM validation, None for other analysis types"""
+        if analysis_type != "validation":
+            return None
+        rule_result = self.evaluate([item.dict()])[0]
+        if rule_result["confident"]:
+            self.stats["llm_calls_avoided"] += 1
+        return rule_result
+    
+    def build_response(self, item: RAIDItem, rule_result: Dict[str, Any], start_time: float) -> AIAnalysisResponse:
+        """Build a validation response from rule results alone"""
+        codes = sorted({f["code"] for f in rule_result["flags"]})
+        return AIAnalysisResponse(
+            analysis=f"Rule-based validation found {len(rule_result['flags'])} issue(s): {', '.join(codes)}",
+            suggestedPriority=rule_result["expected_priority"],
+            suggestedStatus=item.status,
+            confidence=rule_result["confidence"],
+            flags=rule_result["flags"],
+            provider_used="Rule engine",
+            response_time=round(time.time() - start_time, 2)
+        )
+    
+    @staticmethod
+    def merge_flags(rule_flags: List[Dict[str, Any]], ai_flags: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add rule flags to LLM flags, skipping codes the LLM already reported for the same field"""
+        seen = {(f.get("code"), f.get("field")) for f in ai_flags}
+        return [f for f in rule_flags if (f["code"], f.get("field")) not in seen] + ai_flags
+    
+    @staticmethod
+    def _flag(code: str, message: str, severity: str, field: str) -> Dict[str, Any]:
+        return {"code": code, "message": message, "severity": severity, "field": field, "source": "rules"}
 
-@app.post("/api/upload")
-async def upload_file(file: UploadFile = File(...)):
-    """Upload file for processing"""
-    try:
-        # Create uploads directory if it doesn't exist
-        upload_dir = "/app/uploads"
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Generate unique filename
-        file_id = str(uuid.uuid4())
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"{file_id}{file_extension}"
-        file_path = os.path.join(upload_dir, unique_filename)
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Store file metadata
-        file_metadata = {
-            "id": file_id,
-            "original_name": file.filename,
-            "filename": unique_filename,
-            "path": file_path,
-            "size": os.path.getsize(file_path),
-            "content_type": file.content_type,
-            "uploaded_at": datetime.utcnow().isoformat()
-        }
+rule_engine = RAIDRuleEngine()
+
+@app.get("/api/raid-items/validation/rules")
+async def validate_raid_items_with_rules(include_clean: bool = False):
+    """Run rule-based validation across all RAID items"""
+    results = rule_engine.evaluate(raid_items_db)
+    flagged = [r for r in results if r["flags"]]
+    
+    return {
+        "results": results if include_clean else flagged,
+        "total": len(results),
+        "flagged": len(flagged),
+        "elapsed_ms": rule_engine.stats["last_pass_ms"],
+        "stats": rule_engine.stats
+    }
+
+# ============================================================================
+# NEAR-DUPLICATE DETECTION
+# ============================================================================
+
+import zlib
+
+class DuplicateIndex:
+    """MinHash/LSH index of item titles and descriptions for near-duplicate detection.
+    
+    Each item is shingled into words and word pairs and summarized as a MinHash
+    signature. The signature is split into bands, and items sharing any band land in
+    the same bucket. A lookup therefore only compares against bucket neighbours, which
+    are verified with exact Jaccard similarity, rather than the whole register. The
+    index is kept in step with create, update and delete.
+    """
+    BANDS = 20
+    ROWS = 3  # Candidate threshold is about (1/BANDS)^(1/ROWS), ~0.37
+    PRIME = (1 << 61) - 1
+    STOPWORDS = frozenset("a an and are as at be by for from has in is it of on or that the this to was will with".split())
+    
+    def __init__(self):
+        self.threshold = float(os.getenv("DUPLICATE_THRESHOLD", "0.5"))
+        rng = random.Random(0x5EED)
+        self.permutations = [(rng.randrange(1, self.PRIME), rng.randrange(0, self.PRIME))
+                             for _ in range(self.BANDS * self.ROWS)]
+        self.buckets: List[Dict[tuple, set]] = [{} for _ in range(self.BANDS)]
+        self.entries: Dict[str, tuple] = {}  # item id -> (shingles, band keys, stored item)
+    
+    @classmethod
+    def shingles(cls, title: str, description: str) -> frozenset:
+        tokens = [t for t in re.findall(r"[a-z0-9]+", f"{title} {description}".lower()) if t not in cls.STOPWORDS]
+        return frozenset(tokens) | frozenset(zip(tokens, tokens[1:]))
+    
+    def band_keys(self, shingles: frozenset) -> List[tuple]:
+        if not shingles:
+            return []
+        hashes = [zlib.crc32(repr(s).encode()) for s in shingles]
+        signature = [min((a * h + b) % self.PRIME for h in hashes) for a, b in self.permutations]
+        return [tuple(signature[band * self.ROWS:(band + 1) * self.ROWS]) for band in range(self.BANDS)]
+    
+    def signature(self, item: Dict[str, Any]) -> tuple:
+        """Shingles and band keys for an item; deterministic, so it can be computed in another process"""
+        shingles = self.shingles(item.get("title") or "", item.get("description") or "")
+        return shingles, self.band_keys(shingles)
+    
+    def add(self, item: Dict[str, Any], signature: Optional[tuple] = None):
+        self.remove(item["id"])
+        shingles, keys = signature or self.signature(item)
+        for band, key in enumerate(keys):
+            self.buckets[band].setdefault(key, set()).add(item["id"])
+        self.entries[item["id"]] = (shingles, keys, item)
+    
+    def remove(self, item_id: str):
+        entry = self.entries.pop(item_id, None)
+        if not entry:
+            return
+        for band, key in enumerate(entry[1]):
+            bucket = self.buckets[band].get(key)
+            if bucket:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self.buckets[band][key]
+    
+    def rebuild(self, items: List[Dict[str, Any]]):
+        self.buckets = [{} for _ in range(self.BANDS)]
+        self.entries = {}
+        for item in items:
+            self.add(item)
+    
+    def find(self, title: str, description: str, exclude_id: Optional[str] = None,
+             threshold: Optional[float] = None, limit: int = 10) -> List[tuple]:
+        """Return (item id, similarity) for indexed items at or above the threshold"""
+        shingles = self.shingles(title, description)
+        return self._verify(shingles, self._candidates(self.band_keys(shingles)) - {exclude_id},
+                            self.threshold if threshold is None else threshold)[:limit]
+    
+    def find_for_item(self, item_id: str, threshold: Optional[float] = None, limit: int = 10) -> List[tuple]:
+        shingles, keys, _ = self.entries[item_id]
+        return self._verify(shingles, self._candidates(keys) - {item_id},
+                            self.threshold if threshold is None else threshold)[:limit]
+    
+    def clusters(self, threshold: Optional[float] = None) -> List[List[str]]:
+        """Group indexed items into clusters of near-duplicates, each led by its root item"""
+        threshold = self.threshold if threshold is None else threshold
+        parent: Dict[str, str] = {}
+        
+        def root(item_id: str) -> str:
+            while parent.get(item_id, item_id) != item_id:
+                item_id = parent[item_id]
+            return item_id
         
-        upload_files_db.append(file_metadata)
+        checked = set()
+        for band in self.buckets:
+            for bucket in band.values():
+                if len(bucket) < 2:
+                    continue
+                members = sorted(bucket)
+                for i, first in enumerate(members):
+                    for second in members[i + 1:]:
+                        if (first, second) in checked:
+                            continue
+                        checked.add((first, second))
+                        if self.similarity(first, second) >= threshold:
+                            parent[root(second)] = root(first)
         
+        groups: Dict[str, List[str]] = {}
+        for item_id in parent:
+            cluster_root = root(item_id)
+            group = groups.setdefault(cluster_root, [cluster_root])
+            if item_id != cluster_root:
+                group.append(item_id)
+        return sorted(groups.values(), key=len, reverse=True)
+    
+    def similarity(self, first: str, second: str) -> float:
+        return self._jaccard(self.entries[first][0], self.entries[second][0])
+    
+    def _candidates(self, keys: List[tuple]) -> set:
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates |= self.buckets[band].get(key, set())
+        return candidates
+    
+    def _verify(self, shingles: frozenset, candidates: set, threshold: float) -> List[tuple]:
+        matches = [(c, self._jaccard(shingles, self.entries[c][0])) for c in candidates if c in self.entries]
+        return sorted((m for m in matches if m[1] >= threshold), key=lambda m: -m[1])
+    
+    @staticmethod
+    def _jaccard(first: frozenset, second: frozenset) -> float:
+        union = len(first | second)
+        return round(len(first & second) / union, 3) if union else 0.0
+    
+    def stats(self) -> Dict[str, Any]:
+        bucket_sizes = [len(bucket) for band in self.buckets for bucket in band.values()]
         return {
-            "message": "File uploaded successfully",
-            "file": file_metadata
+            "indexed_items": len(self.entries),
+            "threshold": self.threshold,
+            "bands": self.BANDS,
+            "rows": self.ROWS,
+            "max_bucket_size": max(bucket_sizes, default=0)
         }
+
+duplicate_index = DuplicateIndex()
+
+class DuplicateCheckRequest(BaseModel):
+    title: str
+    description: str = ""
+
+def _duplicate_matches(matches: List[tuple]) -> List[Dict[str, Any]]:
+    """Describe duplicate matches with enough of each item to show in a warning"""
+    found = []
+    for item_id, similarity in matches:
+        item = duplicate_index.entries.get(item_id, (None, None, None))[2]
+        if item:
+            found.append({"id": item_id, "title": item.get("title"), "type": item.get("type"),
+                          "owner": item.get("owner"), "status": item.get("status"), "similarity": similarity})
+    return found
+
+@app.get("/api/raid-items/duplicates/clusters")
+async def get_duplicate_clusters(threshold: Optional[float] = None):
+    """List clusters of possible duplicate RAID items.
+    
+    Each cluster starts with its root item; other members report their similarity to
+    the root, which can be below the threshold when they joined through another member.
+    """
+    clusters = [_duplicate_matches([(member, duplicate_index.similarity(cluster[0], member)) for member in cluster])
+                for cluster in duplicate_index.clusters(threshold)]
+    return {"clusters": clusters, "total": len(clusters), "index": duplicate_index.stats()}
+
+@app.post("/api/raid-items/duplicates/check")
+async def check_duplicates(request: DuplicateCheckRequest, threshold: Optional[float] = None, limit: int = 10):
+    """Find possible duplicates of an item before it is created"""
+    return {"duplicates": _duplicate_matches(duplicate_index.find(request.title, request.description,
+                                                                  threshold=threshold, limit=limit))}
+
+@app.get("/api/raid-items/{item_id}/duplicates")
+async def get_item_duplicates(item_id: str, threshold: Optional[float] = None, limit: int = 10):
+    """Find possible duplicates of a RAID item"""
+    if item_id not in duplicate_index.entries:
+        raise HTTPException(status_code=404, detail="RAID item not found")
+    return {"item_id": item_id,
+            "duplicates": _duplicate_matches(duplicate_index.find_for_item(item_id, threshold, limit))}
+
+# ============================================================================
+# EXECUTIVE SUMMARY
+# ============================================================================
+
+class ExecutiveSummaryRequest(BaseModel):
+    items: Optional[List[RAIDItem]] = None  # Defaults to the stored register
+    provider_id: Optional[str] = None
+    include_closed: bool = False
+
+class ExecutiveSummarizer:
+    """Map-reduce executive summary over the RAID register.
+    
+    Items are grouped by workstream, with large workstreams split to fit the prompt
+    budget. Groups are summarized in parallel and reduced into one summary. Group and
+    reduce results are cached by a hash of their prompt, so only changed groups are
+    summarized again.
+    """
+    SUMMARY_KEYS = ("summary", "highlights")
+    
+    def __init__(self, manager: MultiAIManager):
+        self.manager = manager
+        self.cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.cache_size = int(os.getenv("AI_SUMMARY_CACHE_SIZE", "512"))
+        self.group_tokens = int(os.getenv("AI_SUMMARY_GROUP_TOKENS", "3000"))
+        self.concurrency = int(os.getenv("AI_SUMMARY_CONCURRENCY", "4"))
+        self.reduce_fan_in = int(os.getenv("AI_SUMMARY_REDUCE_FAN_IN", "10"))
+        self.stats = {"hits": 0, "misses": 0}
+    
+    def build_groups(self, items: List[Dict[str, Any]]) -> List[tuple]:
+        """Split items into (group name, item lines) by workstream and prompt budget"""
+        priority_rank = {p: i for i, p in enumerate(VALID_PRIORITIES)}
+        by_workstream: Dict[str, List[str]] = {}
+        for item in sorted(items, key=lambda i: (priority_rank.get(i.get("priority"), len(VALID_PRIORITIES)),
+                                                 -(i.get("severityScore") or 0), i.get("title") or "")):
+            by_workstream.setdefault(item.get("workstream") or "Unassigned", []).append(self._item_line(item))
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+        groups = []
+        for workstream in sorted(by_workstream):
+            parts, part, used = [], [], 0
+            for line in by_workstream[workstream]:
+                tokens = estimate_tokens(line)
+                if part and used + tokens > self.group_tokens:
+                    parts.append(part)
+                    part, used = [], 0
+                part.append(line)
+                used += tokens
+            parts.append(part)
+            for index, part in enumerate(parts):
+                name = workstream if len(parts) == 1 else f"{workstream} (part {index + 1}/{len(parts)})"
+                groups.append((name, part))
+        return groups
+    
+    async def summarize(self, items: List[Dict[str, Any]], provider: AIProvider, stats: Dict[str, Any]) -> Dict[str, Any]:
+        groups = self.build_groups(items)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def summarize_group(name: str, lines: List[str]):
+            async with semaphore:
+                return await self._summarize_group(provider, name, lines)
+        
+        group_summaries = await asyncio.gather(*(summarize_group(name, lines) for name, lines in groups))
+        executive = await self._reduce(provider, list(group_summaries), stats)
+        return {
+            "summary": executive["summary"],
+            "highlights": executive["highlights"],
+            "groups": group_summaries,
+            "provider_used": f"{provider.name} ({provider.model})"
+        }
+    
+    async def _summarize_group(self, provider: AIProvider, name: str, lines: List[str]) -> Dict[str, Any]:
+        prompt = f"""Workstream: {name}
+RAID items ({len(lines)}):
+{chr(10).join(lines)}
 
-@app.get("/api/upload/{file_id}")
-async def get_uploaded_file(file_id: str):
-    """Get uploaded file by ID"""
-    file_metadata = next((f for f in upload_files_db if f["id"] == file_id), None)
-    if not file_metadata:
-        raise HTTPException(status_code=404, detail="File not found")
+Summarize this workstream for an executive audience. Respond in JSON format:
+{{
+    "summary": "2-3 sentence summary of the workstream's risk position",
+    "highlights": ["Most important item or action"]
+}}"""
+        fallback = f"{len(lines)} open item(s); top item: {lines[0][2:120]}"
+        result = await self._cached_completion(provider, prompt, fallback)
+        return {"group": name, "item_count": len(lines), **result}
     
-    return FileResponse(
-        file_metadata["path"],
-        filename=file_metadata["original_name"],
-        media_type=file_metadata["content_type"]
-    )
+    async def _reduce(self, provider: AIProvider, summaries: List[Dict[str, Any]], stats: Dict[str, Any]) -> Dict[str, Any]:
+        # Reduce in batches until the summaries fit in a single prompt
+        while len(summaries) > self.reduce_fan_in:
+            batches = [summaries[i:i + self.reduce_fan_in] for i in range(0, len(summaries), self.reduce_fan_in)]
+            summaries = list(await asyncio.gather(*(self._reduce_batch(provider, batch) for batch in batches)))
+        return await self._reduce_batch(provider, summaries, stats)
+    
+    async def _reduce_batch(self, provider: AIProvider, summaries: List[Dict[str, Any]],
+                            stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        sections = "\n\n".join(
+            f"{s['group']}: {s['summary']}\n" + "\n".join(f"  * {h}" for h in s["highlights"])
+            for s in summaries
+        )
+        context = f"Register statistics: {json.dumps(stats)}\n\n" if stats else ""
+        prompt = f"""{context}Workstream summaries:
+{sections}
+
+Combine these into an executive summary of the programme's RAID position, leading with what
+needs leadership attention. Respond in JSON format:
+{{
+    "summary": "Executive summary (one short paragraph)",
+    "highlights": ["Top cross-workstream risk, issue or decision needed"]
+}}"""
+        fallback = " ".join(s["summary"] for s in summaries)[:1000]
+        result = await self._cached_completion(provider, prompt, fallback)
+        return {"group": ", ".join(s["group"] for s in summaries), **result}
+    
+    async def _cached_completion(self, provider: AIProvider, prompt: str, fallback: str) -> Dict[str, Any]:
+        key = hashlib.sha256(f"{provider.id}\0{provider.model}\0{prompt}".encode()).hexdigest()
+        cached = self.cache.get(key)
+        if cached:
+            self.cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return {**cached, "cached": True}
+        
+        self.stats["misses"] += 1
+        try:
+            response = await self.manager.complete(
+                provider,
+                "You are an expert programme manager writing concise RAID summaries for executives.",
+                prompt,
+                "raid-summary"
+            )
+        except Exception as e:
+            # Failed calls are not cached so the next request tries again
+            return {"summary": fallback, "highlights": [], "cached": False, "error": str(e)[:100]}
+        
+        extractor = JSONObjectExtractor(self.SUMMARY_KEYS)
+        data = extractor.feed(response) or {"summary": response.strip()}
+        highlights = data.get("highlights") if isinstance(data.get("highlights"), list) else []
+        result = {"summary": str(data.get("summary") or fallback), "highlights": [str(h) for h in highlights]}
+        
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return {**result, "cached": False}
+    
+    @staticmethod
+    def _item_line(item: Dict[str, Any]) -> str:
+        severity = item.get("severityScore") or calculate_severity_score(item.get("impact"), item.get("likelihood"))
+        due = (item.get("dueDate") or "no due date")[:10]
+        return (f"- [{item.get('priority')}] {item.get('type')} | {item.get('status')} | severity {severity} | "
+                f"owner {item.get('owner')} | due {due}: {compact_text(item.get('title') or '', 30)} - "
+                f"{compact_text(item.get('description') or '', 80)}")
+
+executive_summarizer = ExecutiveSummarizer(ai_manager)
+
+def _register_stats(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Counts quoted in the executive summary, computed locally"""
+    today = datetime.utcnow().isoformat()[:10]
+    open_items = [i for i in items if i.get("status") not in CLOSED_STATUSES]
+    by_type: Dict[str, int] = {}
+    for item in items:
+        by_type[item.get("type", "Risk")] = by_type.get(item.get("type", "Risk"), 0) + 1
+    return {
+        "total": len(items),
+        "open": len(open_items),
+        "by_type": by_type,
+        "critical_open": sum(1 for i in open_items if i.get("priority") in ("P0", "P1")),
+        "overdue": sum(1 for i in open_items if i.get("dueDate") and i["dueDate"][:10] < today)
+    }
+
+@app.post("/api/ai/executive-summary")
+async def generate_executive_summary(request: ExecutiveSummaryRequest):
+    """Generate an executive summary of the register by map-reduce over workstreams"""
+    items = [item.dict() for item in request.items] if request.items is not None else raid_items_db
+    stats = _register_stats(items)
+    selected = items if request.include_closed else [i for i in items if i.get("status") not in CLOSED_STATUSES]
+    
+    if not selected:
+        return {"summary": "There are no open RAID items.", "highlights": [], "groups": [],
+                "stats": stats, "cache": executive_summarizer.stats}
+    
+    provider = await _get_request_provider(request.provider_id)
+    result = await executive_summarizer.summarize(selected, provider, stats)
+    return {**result, "stats": stats, "cache": executive_summarizer.stats}
+
+# ============================================================================
+# FILE UPLOAD ENDPOINTS
+# ============================================================================
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+from starlette.requests import ClientDisconnect
+from email.utils import formatdate, parsedate_to_datetime
+from multipart.multipart import MultipartParser, parse_options_header
+import mimetypes
+
+UPLOAD_DIR = os.getenv("RAID_UPLOAD_DIR", "/app/uploads")
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(1024 * 1024 * 1024)))
+UPLOAD_WRITE_BUFFER = 1024 * 1024
+# Room for multipart boundaries and part headers on top of the file itself
+UPLOAD_FRAMING_BYTES = 64 * 1024
+
+class StreamingUploadWriter:
+    """Write an upload to a temporary file off the event loop, hashing it in the same pass.
+    
+    Incoming data is buffered into blocks that are hashed and written in a worker
+    thread, so the event loop only ever copies bytes. The size limit is checked as data
+    arrives, before anything beyond it is written.
+    """
+    def __init__(self, directory: str, max_bytes: int, path: Optional[str] = None, offset: int = 0,
+                 label: str = "File"):
+        self.incoming_dir = os.path.join(directory, ".incoming")
+        # With a path the writer fills a region of an existing file, such as one chunk of a session
+        self.owns_file = path is None
+        self.path = path or os.path.join(self.incoming_dir, f"{uuid.uuid4()}.part")
+        self.offset = offset
+        self.max_bytes = max_bytes
+        self.label = label
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.file = None
+    
+    async def open(self):
+        def open_file():
+            if not self.owns_file:
+                f = open(self.path, "r+b")
+                f.seek(self.offset)
+                return f
+            os.makedirs(self.incoming_dir, exist_ok=True)
+            return open(self.path, "wb")
+        self.file = await asyncio.to_thread(open_file)
+    
+    async def write(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"{self.label} exceeds the {self.max_bytes} byte limit")
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= UPLOAD_WRITE_BUFFER:
+            await self._flush()
+    
+    async def close(self):
+        if self.file and not self.file.closed:
+            await self._flush()
+            await asyncio.to_thread(self.file.close)
+    
+    async def commit(self) -> str:
+        """Close the temporary file and move it into content-addressed storage"""
+        await self.close()
+        return await _store_blob(self.path, self.sha256)
+    
+    async def discard(self):
+        if self.file and not self.file.closed:
+            await asyncio.to_thread(self.file.close)
+        if not self.owns_file:
+            return
+        try:
+            await asyncio.to_thread(os.remove, self.path)
+        except FileNotFoundError:
+            pass
+    
+    @property
+    def sha256(self) -> str:
+        return self.hasher.hexdigest()
+    
+    async def _flush(self):
+        if self.buffer:
+            blocks, self.buffer, self.buffered = self.buffer, [], 0
+            await asyncio.to_thread(self._write_blocks, blocks)
+    
+    def _write_blocks(self, blocks: List[bytes]):
+        # Joining, hashing and writing all happen here; hashlib releases the GIL for large blocks
+        block = b"".join(blocks)
+        self.hasher.update(block)
+        self.file.write(block)
+
+async def _receive_upload(request: Request, field_name: str = "file") -> tuple:
+    """Stream the named file part of a multipart request to disk.
+    
+    Returns (writer, original filename, content type). Other form parts are ignored, and
+    a body that ends before the file part's closing boundary is rejected as truncated.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+    declared_length = request.headers.get("content-length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > UPLOAD_MAX_BYTES + UPLOAD_FRAMING_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {UPLOAD_MAX_BYTES} byte upload limit")
+    
+    # The parser is push-based and synchronous; callbacks queue events that are handled between reads
+    events: List[tuple] = []
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": lambda: events.append(("part_begin", b"")),
+        "on_header_field": lambda data, start, end: events.append(("header_field", data[start:end])),
+        "on_header_value": lambda data, start, end: events.append(("header_value", data[start:end])),
+        "on_header_end": lambda: events.append(("header_end", b"")),
+        "on_headers_finished": lambda: events.append(("headers_finished", b"")),
+        "on_part_data": lambda data, start, end: events.append(("part_data", data[start:end])),
+        "on_part_end": lambda: events.append(("part_end", b"")),
+    })
+    
+    writer = None
+    original_name, file_content_type = "", ""
+    in_file_part = file_part_complete = False
+    headers: Dict[bytes, bytes] = {}
+    header_field, header_value = b"", b""
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, data in events:
+                if kind == "part_data":
+                    if in_file_part:
+                        await writer.write(data)
+                elif kind == "part_begin":
+                    headers = {}
+                elif kind == "header_field":
+                    header_field += data
+                elif kind == "header_value":
+                    header_value += data
+                elif kind == "header_end":
+                    headers[header_field.lower()] = header_value
+                    header_field, header_value = b"", b""
+                elif kind == "headers_finished":
+                    _, options = parse_options_header(headers.get(b"content-disposition", b""))
+                    if writer is None and options.get(b"name") == field_name.encode() and b"filename" in options:
+                        original_name = options[b"filename"].decode("utf-8", errors="replace")
+                        file_content_type = headers.get(b"content-type", b"").decode("latin-1")
+                        writer = StreamingUploadWriter(UPLOAD_DIR, UPLOAD_MAX_BYTES)
+                        await writer.open()
+                        in_file_part = True
+                elif kind == "part_end":
+                    file_part_complete = file_part_complete or in_file_part
+                    in_file_part = False
+            events.clear()
+        parser.finalize()
+        if writer and not file_part_complete:
+            raise HTTPException(status_code=400, detail="Upload ended before the file was complete")
+    except BaseException:
+        if writer:
+            await writer.discard()
+        raise
+    
+    if writer is None:
+        raise HTTPException(status_code=400, detail=f"No '{field_name}' file in upload")
+    content_type = file_content_type or mimetypes.guess_type(original_name)[0] or "application/octet-stream"
+    return writer, original_name, content_type
+
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"]
+        }}}
+    }
+}
+
+class UploadMetadataStore:
+    """Indexed, persistent upload metadata.
+    
+    Records are indexed by id, by attached item, by content type (exact and major
+    type, e.g. "image/*") and by upload date, and stored blobs are reference-counted
+    by hash, so listings and orphan checks touch only the matching entries. The
+    snapshot is written in the background when it changes. At startup it is reconciled
+    with the upload directory, restoring blobs written after the last snapshot, and if
+    it is missing or unreadable the store is rebuilt from the directory alone.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.persist_path = os.path.join(DATA_DIR, "uploads.json")
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.blobs: Dict[str, int] = {}  # sha256 -> size of every stored blob
+        self.by_sha: Dict[str, set] = {}
+        self.by_item: Dict[str, set] = {}
+        self.by_content_type: Dict[str, set] = {}
+        self.by_date: List[tuple] = []  # Sorted (uploaded_at, id)
+        self.unattached: set = set()
+        self.dirty = False
+        self.flusher = None
+    
+    async def start(self):
+        """Load the snapshot and reconcile it with the upload directory"""
+        loaded = await asyncio.to_thread(self._load)
+        if await asyncio.to_thread(self._scan) or not loaded:
+            self.dirty = True
+        self.flusher = asyncio.create_task(self._flusher())
+    
+    async def stop(self):
+        if self.flusher:
+            self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
+        await self._persist()
+    
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        return self.records.get(file_id)
+    
+    def add(self, record: Dict[str, Any]):
+        record.setdefault("item_ids", [])
+        self.records[record["id"]] = record
+        self.by_sha.setdefault(record["sha256"], set()).add(record["id"])
+        for key in self._content_type_keys(record["content_type"]):
+            self.by_content_type.setdefault(key, set()).add(record["id"])
+        bisect.insort(self.by_date, (record["uploaded_at"], record["id"]))
+        for item_id in record["item_ids"]:
+            self.by_item.setdefault(item_id, set()).add(record["id"])
+        if not record["item_ids"]:
+            self.unattached.add(record["id"])
+        self.dirty = True
+    
+    def remove(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Drop a record, returning it; its blob is left for the caller if now unreferenced"""
+        record = self.records.pop(file_id, None)
+        if not record:
+            return None
+        self._discard(self.by_sha, record["sha256"], file_id)
+        for key in self._content_type_keys(record["content_type"]):
+            self._discard(self.by_content_type, key, file_id)
+        index = bisect.bisect_left(self.by_date, (record["uploaded_at"], file_id))
+        if index < len(self.by_date) and self.by_date[index][1] == file_id:
+            self.by_date.pop(index)
+        for item_id in record["item_ids"]:
+            self._discard(self.by_item, item_id, file_id)
+        self.unattached.discard(file_id)
+        self.dirty = True
+        return record
+    
+    def add_blob(self, sha256: str, size: int):
+        self.blobs[sha256] = size
+        self.dirty = True
+    
+    def remove_blob(self, sha256: str):
+        self.blobs.pop(sha256, None)
+        self.dirty = True
+    
+    def attach(self, file_id: str, item_id: str):
+        record = self.records[file_id]
+        if item_id not in record["item_ids"]:
+            record["item_ids"].append(item_id)
+            self.by_item.setdefault(item_id, set()).add(file_id)
+            self.unattached.discard(file_id)
+            self.dirty = True
+    
+    def detach(self, file_id: str, item_id: str):
+        record = self.records.get(file_id)
+        if record and item_id in record["item_ids"]:
+            record["item_ids"].remove(item_id)
+            self._discard(self.by_item, item_id, file_id)
+            if not record["item_ids"]:
+                self.unattached.add(file_id)
+            self.dirty = True
+    
+    def detach_item(self, item_id: str):
+        for file_id in list(self.by_item.get(item_id, ())):
+            self.detach(file_id, item_id)
+    
+    def list_for_item(self, item_id: str) -> List[Dict[str, Any]]:
+        return self._sorted(self.by_item.get(item_id, ()))
+    
+    def list_by_content_type(self, content_type: str) -> List[Dict[str, Any]]:
+        return self._sorted(self.by_content_type.get(content_type.lower(), ()))
+    
+    def list_by_date(self, since: Optional[str] = None, until: Optional[str] = None,
+                     limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Records uploaded in [since, until), newest first"""
+        start = bisect.bisect_left(self.by_date, (since,)) if since else 0
+        end = bisect.bisect_left(self.by_date, (until,)) if until else len(self.by_date)
+        results = []
+        for index in range(end - 1, start - 1, -1):
+            results.append(self.records[self.by_date[index][1]])
+            if limit and len(results) >= limit:
+                break
+        return results
+    
+    def orphans(self, older_than: Optional[str] = None, live_item_ids: Optional[set] = None) -> Dict[str, List]:
+        """Records attached to no existing item, and stored blobs that no record references.
+        
+        Attachments are persisted but items may not be, so pass the ids of the live register
+        to also report records whose items are all gone; without it only records with no
+        attachment at all are orphans.
+        """
+        file_ids = set(self.unattached)
+        if live_item_ids is not None:
+            for item_id in self.by_item.keys() - live_item_ids:
+                file_ids |= {file_id for file_id in self.by_item[item_id]
+                             if live_item_ids.isdisjoint(self.records[file_id]["item_ids"])}
+        records = [r for r in self._sorted(file_ids) if not older_than or r["uploaded_at"] < older_than]
+        blobs = [{"sha256": sha, "size": size, "path": _blob_path(sha)}
+                 for sha, size in self.blobs.items() if not self.by_sha.get(sha)]
+        return {"records": records, "blobs": blobs}
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "records": len(self.records),
+            "blobs": len(self.blobs),
+            "stored_bytes": sum(self.blobs.values()),
+            "unattached_records": len(self.unattached)
+        }
+    
+    def _sorted(self, file_ids) -> List[Dict[str, Any]]:
+        return sorted((self.records[i] for i in file_ids), key=lambda r: r["uploaded_at"], reverse=True)
+    
+    @staticmethod
+    def _content_type_keys(content_type: str) -> tuple:
+        content_type = (content_type or "application/octet-stream").split(";")[0].strip().lower()
+        return (content_type, f"{content_type.split('/')[0]}/*")
+    
+    @staticmethod
+    def _discard(index: Dict[str, set], key: str, file_id: str):
+        members = index.get(key)
+        if members:
+            members.discard(file_id)
+            if not members:
+                del index[key]
+    
+    def _load(self) -> bool:
+        try:
+            with open(self.persist_path) as f:
+                snapshot = json.load(f)
+            records, blobs = snapshot["records"], snapshot["blobs"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        self.blobs = dict(blobs)
+        for record in records:
+            self.add(record)
+        self.dirty = False
+        return True
+    
+    def _scan(self) -> bool:
+        """Restore records for files in the upload directory the store does not know about.
+        
+        Blobs missing from disk are dropped from the blob table. Returns whether anything changed.
+        """
+        if not os.path.isdir(self.directory):
+            return False
+        changed = False
+        on_disk = set()
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir() and re.fullmatch(r"[0-9a-f]{2}", entry.name):
+                for blob in os.scandir(entry.path):
+                    if re.fullmatch(r"[0-9a-f]{64}", blob.name):
+                        on_disk.add(blob.name)
+                        if blob.name not in self.blobs:
+                            self._restore(blob.name, blob.name, blob.stat())
+                            changed = True
+            elif entry.is_file():
+                # Files stored before content addressing, named <upload id><extension>
+                hasher = hashlib.sha256()
+                with open(entry.path, "rb") as f:
+                    for block in iter(lambda: f.read(UPLOAD_WRITE_BUFFER), b""):
+                        hasher.update(block)
+                sha256, stat = hasher.hexdigest(), entry.stat()
+                blob_path = _blob_path(sha256)
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                if os.path.exists(blob_path):
+                    os.remove(entry.path)
+                else:
+                    os.replace(entry.path, blob_path)
+                file_id = os.path.splitext(entry.name)[0]
+                on_disk.add(sha256)
+                self._restore(sha256, entry.name, stat, file_id)
+                changed = True
+        
+        for sha256 in self.blobs.keys() - on_disk:
+            self.remove_blob(sha256)
+            changed = True
+        return changed
+    
+    def _restore(self, sha256: str, original_name: str, stat: os.stat_result, file_id: Optional[str] = None):
+        self.add_blob(sha256, stat.st_size)
+        self.add({
+            "id": file_id or str(uuid.uuid4()),
+            "original_name": original_name,
+            "filename": sha256,
+            "path": _blob_path(sha256),
+            "size": stat.st_size,
+            "sha256": sha256,
+            "content_type": mimetypes.guess_type(original_name)[0] or "application/octet-stream",
+            "uploaded_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat(),
+            "restored": True
+        })
+    
+    async def _persist(self):
+        self.dirty = False
+        snapshot = {"records": [dict(r, item_ids=list(r["item_ids"])) for r in self.records.values()],
+                    "blobs": dict(self.blobs)}
+        await asyncio.to_thread(_atomic_write_json, self.persist_path, snapshot)
+    
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(1.0)
+            if self.dirty:
+                try:
+                    await self._persist()
+                except OSError:
+                    self.dirty = True
+
+upload_store = UploadMetadataStore(UPLOAD_DIR)
+
+def _blob_path(sha256: str) -> str:
+    """Content-addressed location of a stored file"""
+    return os.path.join(UPLOAD_DIR, sha256[:2], sha256)
+
+async def _store_blob(temp_path: str, sha256: str) -> str:
+    """Move a fully written temp file into content-addressed storage, reusing identical content"""
+    blob_path = _blob_path(sha256)
+    
+    def store() -> int:
+        if os.path.exists(blob_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(temp_path, blob_path)
+        return os.path.getsize(blob_path)
+    
+    with tracer.span("upload.store_blob", sha256=sha256):
+        upload_store.add_blob(sha256, await asyncio.to_thread(store))
+    return blob_path
+
+def _add_upload_record(original_name: str, content_type: str, size: int, sha256: str,
+                       item_id: Optional[str] = None) -> Dict[str, Any]:
+    """Record an upload that references a stored blob, optionally attached to an item"""
+    file_metadata = {
+        "id": str(uuid.uuid4()),
+        "original_name": original_name,
+        "filename": sha256,
+        "path": _blob_path(sha256),
+        "size": size,
+        "sha256": sha256,
+        "content_type": content_type or mimetypes.guess_type(original_name)[0] or "application/octet-stream",
+        "uploaded_at": datetime.utcnow().isoformat(),
+        "item_ids": []
+    }
+    upload_store.add(file_metadata)
+    if item_id:
+        _attach_upload(file_metadata["id"], item_id)
+    return file_metadata
+
+def _attach_upload(file_id: str, item_id: str):
+    """Attach an upload to a RAID item on both sides"""
+    item = _find_raid_item(item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="RAID item not found")
+    upload_store.attach(file_id, item_id)
+    if file_id not in (item.get("attachments") or []):
+        item["attachments"] = (item.get("attachments") or []) + [file_id]
+
+@app.post("/api/upload", openapi_extra=UPLOAD_OPENAPI)
+async def upload_file(request: Request, item_id: Optional[str] = None):
+    """Upload file for processing, streamed to disk without blocking the event loop"""
+    try:
+        if item_id and not _find_raid_item(item_id):
+            raise HTTPException(status_code=404, detail="RAID item not found")
+        with tracer.span("upload.receive") as span:
+            writer, original_name, content_type = await _receive_upload(request)
+            span.set_attribute("upload.bytes", writer.size)
+        with tracer.span("upload.commit"):
+            await writer.commit()
+        with tracer.span("storage.upload_record"):
+            file_metadata = _add_upload_record(original_name, content_type, writer.size, writer.sha256, item_id)
+        
+        return {
+            "message": "File uploaded successfully",
+            "file": file_metadata
+        }
+        
+    except HTTPException:
+        raise
+    except ClientDisconnect:
+        # The partial file was already discarded; nobody is left to read a response
+        raise HTTPException(status_code=400, detail="Client disconnected during upload")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+class UploadSessionRequest(BaseModel):
+    filename: str
+    size: int
+    content_type: Optional[str] = None
+    item_id: Optional[str] = None  # Item to attach the finished upload to
+    sha256: Optional[str] = None  # Lets a file already attached to item_id complete without sending any data
+    chunk_size: Optional[int] = None
+
+class UploadSessionStore:
+    """Resumable chunked uploads.
+    
+    A session preallocates a part file and accepts fixed-size chunks in any order, each
+    written at its offset. A dropped connection only loses the chunk in flight; the
+    client asks which chunks are missing and resends those. Session state lives
+    next to the part file, so sessions also survive a restart. Completing a session
+    while chunks are still being written is refused, and so are chunks that arrive
+    once it is completing, so the file cannot change under its hash.
+    """
+    DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+    MIN_CHUNK_SIZE = 256 * 1024
+    MAX_CHUNK_SIZE = 64 * 1024 * 1024
+    
+    def __init__(self, directory: str):
+        self.directory = os.path.join(directory, ".sessions")
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.writers: Dict[str, int] = {}  # session id -> chunks being written
+        self.completing: set = set()
+        self.ttl = timedelta(hours=float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24")))
+    
+    def load(self):
+        """Reload sessions saved by a previous run, dropping expired ones"""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        session = json.load(f)
+                    self.sessions[session["id"]] = session
+                except (OSError, ValueError, KeyError):
+                    continue
+        self._expire()
+    
+    def part_path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.part")
+    
+    async def create(self, request: UploadSessionRequest) -> Dict[str, Any]:
+        self._expire()
+        chunk_size = min(max(request.chunk_size or self.DEFAULT_CHUNK_SIZE, self.MIN_CHUNK_SIZE), self.MAX_CHUNK_SIZE)
+        now = datetime.utcnow().isoformat()
+        session = {
+            "id": str(uuid.uuid4()),
+            "original_name": request.filename,
+            "size": request.size,
+            "content_type": request.content_type,
+            "sha256": request.sha256.lower() if request.sha256 else None,
+            "item_id": request.item_id,
+            "chunk_size": chunk_size,
+            "total_chunks": max(1, -(-request.size // chunk_size)),
+            "received": [],
+            "created_at": now,
+            "updated_at": now
+        }
+        
+        def preallocate():
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.part_path(session["id"]), "wb") as f:
+                f.truncate(request.size)
+        
+        await asyncio.to_thread(preallocate)
+        self.sessions[session["id"]] = session
+        await self._persist(session)
+        return session
+    
+    def chunk_length(self, session: Dict[str, Any], index: int) -> int:
+        return min(session["chunk_size"], session["size"] - index * session["chunk_size"])
+    
+    async def write_chunk(self, session: Dict[str, Any], index: int, stream, checksum: Optional[str]):
+        """Stream one chunk into place, verifying its length and optional SHA-256"""
+        if not 0 <= index < session["total_chunks"]:
+            raise HTTPException(status_code=400, detail=f"Chunk index must be between 0 and {session['total_chunks'] - 1}")
+        session_id = session["id"]
+        # Checked and registered before the first await, so complete() sees every writer
+        if session_id not in self.sessions:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        if session_id in self.completing:
+            raise HTTPException(status_code=409, detail="Upload is being completed")
+        self.writers[session_id] = self.writers.get(session_id, 0) + 1
+        try:
+            await self._write_chunk(session, index, stream, checksum)
+        finally:
+            self.writers[session_id] -= 1
+            if not self.writers[session_id]:
+                del self.writers[session_id]
+    
+    async def _write_chunk(self, session: Dict[str, Any], index: int, stream, checksum: Optional[str]):
+        length = self.chunk_length(session, index)
+        writer = StreamingUploadWriter(UPLOAD_DIR, length, path=self.part_path(session["id"]),
+                                       offset=index * session["chunk_size"], label=f"Chunk {index}")
+        with tracer.span("upload.write_chunk", chunk=index, bytes=length):
+            try:
+                await writer.open()
+            except FileNotFoundError:
+                raise HTTPException(status_code=404, detail="Upload session not found")
+            try:
+                async for data in stream:
+                    await writer.write(data)
+            except ClientDisconnect:
+                raise HTTPException(status_code=400, detail=f"Chunk {index} was interrupted, resend it")
+            finally:
+                await writer.close()
+        
+        if writer.size != length:
+            raise HTTPException(status_code=400, detail=f"Chunk {index} has {writer.size} bytes, expected {length}")
+        if checksum and writer.sha256 != checksum.lower():
+            raise HTTPException(status_code=400, detail=f"Chunk {index} failed its checksum, resend it")
+        
+        async with self._lock(session["id"]):
+            if session["id"] not in self.sessions:
+                raise HTTPException(status_code=404, detail="Upload session not found")
+            if index not in session["received"]:
+                session["received"].append(index)
+            session["updated_at"] = datetime.utcnow().isoformat()
+            await self._persist(session)
+    
+    async def complete(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Verify the assembled file and move it into content-addressed storage"""
+        async with self._lock(session["id"]):
+            # A concurrent complete may have finished (and discarded) the session while this one waited
+            if session["id"] not in self.sessions:
+                raise HTTPException(status_code=404, detail="Upload session not found")
+            if self.writers.get(session["id"]):
+                raise HTTPException(status_code=409, detail="Chunks are still being written; complete once they finish")
+            self.completing.add(session["id"])
+            try:
+                return await self._complete(session)
+            finally:
+                self.completing.discard(session["id"])
+    
+    async def _complete(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        missing = self.missing_chunks(session)
+        if missing:
+            raise HTTPException(status_code=409, detail={"message": "Upload has missing chunks", "missing": missing[:100]})
+        
+        def hash_file() -> str:
+            hasher = hashlib.sha256()
+            with open(self.part_path(session["id"]), "rb") as f:
+                for block in iter(lambda: f.read(UPLOAD_WRITE_BUFFER), b""):
+                    hasher.update(block)
+            return hasher.hexdigest()
+        
+        with tracer.span("upload.verify", bytes=session["size"]):
+            sha256 = await asyncio.to_thread(hash_file)
+        if session["sha256"] and sha256 != session["sha256"]:
+            await self.discard(session["id"])
+            raise HTTPException(status_code=422, detail="Uploaded content does not match the declared SHA-256")
+        
+        await _store_blob(self.part_path(session["id"]), sha256)
+        await self.discard(session["id"], keep_part=True)
+        return _add_upload_record(session["original_name"], session["content_type"], session["size"], sha256,
+                                  session.get("item_id"))
+    
+    async def discard(self, session_id: str, keep_part: bool = False):
+        self.sessions.pop(session_id, None)
+        self.locks.pop(session_id, None)
+        paths = [os.path.join(self.directory, f"{session_id}.json")] + ([] if keep_part else [self.part_path(session_id)])
+        
+        def remove():
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        
+        await asyncio.to_thread(remove)
+    
+    @staticmethod
+    def missing_chunks(session: Dict[str, Any]) -> List[int]:
+        received = set(session["received"])
+        return [i for i in range(session["total_chunks"]) if i not in received]
+    
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        return self.locks.setdefault(session_id, asyncio.Lock())
+    
+    async def _persist(self, session: Dict[str, Any]):
+        await asyncio.to_thread(_atomic_write_json, os.path.join(self.directory, f"{session['id']}.json"), session)
+    
+    def _expire(self):
+        cutoff = (datetime.utcnow() - self.ttl).isoformat()
+        for session_id in [sid for sid, s in self.sessions.items() if s["updated_at"] < cutoff]:
+            self.sessions.pop(session_id, None)
+            for path in (os.path.join(self.directory, f"{session_id}.json"), self.part_path(session_id)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+upload_sessions = UploadSessionStore(UPLOAD_DIR)
+
+@app.on_event("startup")
+async def start_upload_services():
+    """Load upload metadata and resumable sessions"""
+    await upload_store.start()
+    await asyncio.to_thread(upload_sessions.load)
+
+@app.on_event("shutdown")
+async def stop_upload_services():
+    await upload_store.stop()
+
+def _upload_session_response(session: Dict[str, Any]) -> Dict[str, Any]:
+    return {**session, "missing": UploadSessionStore.missing_chunks(session)}
+
+def _get_upload_session(session_id: str) -> Dict[str, Any]:
+    session = upload_sessions.sessions.get(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+@app.post("/api/uploads/sessions")
+async def create_upload_session(request: UploadSessionRequest):
+    """Start a resumable upload, or complete it at once if the item already has the content"""
+    if request.size < 0:
+        raise HTTPException(status_code=400, detail="Size must not be negative")
+    if request.size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {UPLOAD_MAX_BYTES} byte upload limit")
+    if request.item_id and not _find_raid_item(request.item_id):
+        raise HTTPException(status_code=404, detail="RAID item not found")
+    
+    # A claimed hash proves nothing about possession, so the shortcut is limited to content
+    # already attached to the same item; anything else must upload its data
+    sha256 = (request.sha256 or "").lower()
+    if (request.item_id and re.fullmatch(r"[0-9a-f]{64}", sha256)
+            and upload_store.by_sha.get(sha256, set()) & upload_store.by_item.get(request.item_id, set())):
+        try:
+            stored_size = await asyncio.to_thread(os.path.getsize, _blob_path(sha256))
+        except OSError:
+            stored_size = None
+        if stored_size == request.size:
+            file_metadata = _add_upload_record(request.filename, request.content_type, request.size, sha256,
+                                               request.item_id)
+            return {"status": "complete", "deduplicated": True, "file": file_metadata}
+    
+    session = await upload_sessions.create(request)
+    return {"status": "pending", "session": _upload_session_response(session)}
+
+@app.get("/api/uploads/sessions/{session_id}")
+async def get_upload_session(session_id: str):
+    """Get upload progress, including the chunks still missing"""
+    return _upload_session_response(_get_upload_session(session_id))
+
+@app.put("/api/uploads/sessions/{session_id}/chunks/{index}")
+async def put_upload_chunk(session_id: str, index: int, request: Request):
+    """Upload one chunk as the raw request body; resending a chunk overwrites it"""
+    session = _get_upload_session(session_id)
+    await upload_sessions.write_chunk(session, index, request.stream(), request.headers.get("x-chunk-sha256"))
+    return {"received": len(session["received"]), "total_chunks": session["total_chunks"]}
+
+@app.post("/api/uploads/sessions/{session_id}/complete")
+async def complete_upload_session(session_id: str):
+    """Assemble and verify an upload once every chunk has arrived"""
+    file_metadata = await upload_sessions.complete(_get_upload_session(session_id))
+    return {"message": "File uploaded successfully", "file": file_metadata}
+
+@app.delete("/api/uploads/sessions/{session_id}")
+async def abort_upload_session(session_id: str):
+    """Abandon a resumable upload and remove its partial data"""
+    _get_upload_session(session_id)
+    await upload_sessions.discard(session_id)
+    return {"message": "Upload session aborted"}
+
+class RangeFileResponse(FileResponse):
+    """FileResponse that sends a single byte range when asked.
+    
+    When the server offers the ASGI "http.response.zerocopysend" extension, the open
+    file is handed to it so the kernel copies it straight to the socket with
+    sendfile. Otherwise blocks are read in a worker thread so large downloads never
+    block the event loop.
+    """
+    chunk_size = 256 * 1024
+    
+    def __init__(self, path: str, byte_range: Optional[tuple] = None, **kwargs):
+        super().__init__(path, **kwargs)
+        size = self.stat_result.st_size
+        self.byte_range = byte_range or (0, size - 1)
+        self.headers["content-length"] = str(self.byte_range[1] - self.byte_range[0] + 1 if size else 0)
+        if byte_range:
+            self.headers["content-range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+    
+    async def __call__(self, scope, receive, send):
+        start, end = self.byte_range
+        count = end - start + 1 if self.stat_result.st_size else 0
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        
+        if self.send_header_only or count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        else:
+            f = await asyncio.to_thread(open, self.path, "rb")
+            try:
+                if "http.response.zerocopysend" in scope.get("extensions", {}):
+                    await send({"type": "http.response.zerocopysend", "file": f, "offset": start,
+                                "count": count, "more_body": False})
+                else:
+                    await asyncio.to_thread(f.seek, start)
+                    remaining = count
+                    while remaining:
+                        block = await asyncio.to_thread(f.read, min(self.chunk_size, remaining))
+                        # A truncated file ends the body early rather than hanging the client
+                        remaining = remaining - len(block) if block else 0
+                        await send({"type": "http.response.body", "body": block, "more_body": remaining > 0})
+            finally:
+                await asyncio.to_thread(f.close)
+        
+        if self.background is not None:
+            await self.background()
+
+def _parse_byte_range(header: str, size: int) -> Optional[tuple]:
+    """Parse a single "bytes=" range into inclusive (start, end).
+    
+    Returns None for headers to ignore (other units, multiple or malformed ranges),
+    which means the whole file is sent; raises 416 when the range can't be satisfied.
+    """
+    units, _, spec = header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = (part.strip() for part in spec.strip().partition("-"))
+    if not (first or last) or not all(part.isascii() and part.isdigit() for part in (first, last) if part):
+        return None
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(0, size - int(last)), size - 1
+    if last and first and int(last) < start:
+        return None
+    if start >= size or end < start:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"content-range": f"bytes */{size}"})
+    return start, end
+
+def _not_modified_since(header: Optional[str], mtime: float) -> bool:
+    try:
+        return header is not None and int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+# Upload ids point at content-addressed blobs that never change, so clients may cache them indefinitely
+UPLOAD_CACHE_CONTROL = os.getenv("UPLOAD_CACHE_CONTROL", "private, max-age=31536000, immutable")
+
+@app.api_route("/api/upload/{file_id}", methods=["GET", "HEAD"])
+async def get_uploaded_file(file_id: str, request: Request):
+    """Get uploaded file by ID, with byte ranges and conditional requests"""
+    with tracer.span("storage.upload_lookup"):
+        file_metadata = upload_store.get(file_id)
+    if not file_metadata:
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_metadata["path"])
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File content not found")
+    
+    etag = f'"{file_metadata["sha256"]}"'
+    cache_headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "cache-control": UPLOAD_CACHE_CONTROL,
+        "accept-ranges": "bytes"
+    }
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        not_modified = "*" in tags or etag in tags
+    else:
+        not_modified = _not_modified_since(request.headers.get("if-modified-since"), stat_result.st_mtime)
+    if not_modified:
+        return Response(status_code=304, headers=cache_headers)
+    
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and request.method == "GET":
+        # If-Range only allows the partial response while the client's copy is current
+        if_range = request.headers.get("if-range")
+        if if_range is None or (if_range == etag if if_range.startswith(("\"", "W/"))
+                                else _not_modified_since(if_range, stat_result.st_mtime)):
+            byte_range = _parse_byte_range(range_header, stat_result.st_size)
+    
+    return RangeFileResponse(
+        file_metadata["path"],
+        byte_range=byte_range,
+        status_code=206 if byte_range else 200,
+        headers=cache_headers,
+        filename=file_metadata["original_name"],
+        media_type=file_metadata["content_type"],
+        stat_result=stat_result,
+        method=request.method
+    )
+
+@app.delete("/api/upload/{file_id}")
+async def delete_uploaded_file(file_id: str):
+    """Delete an upload, and its stored content once nothing else references it"""
+    file_metadata = upload_store.get(file_id)
+    if not file_metadata:
+        raise HTTPException(status_code=404, detail="File not found")
+    for item_id in list(file_metadata["item_ids"]):
+        item = _find_raid_item(item_id)
+        if item and file_id in (item.get("attachments") or []):
+            item["attachments"] = [a for a in item["attachments"] if a != file_id]
+    upload_store.remove(file_id)
+    
+    content_deleted = not upload_store.by_sha.get(file_metadata["sha256"])
+    if content_deleted:
+        try:
+            await asyncio.to_thread(os.remove, file_metadata["path"])
+        except FileNotFoundError:
+            pass
+        upload_store.remove_blob(file_metadata["sha256"])
+    return {"message": "File deleted successfully", "content_deleted": content_deleted}
+
+@app.get("/api/uploads")
+async def list_uploads(item_id: Optional[str] = None, content_type: Optional[str] = None,
+                       since: Optional[str] = None, until: Optional[str] = None, limit: int = 100):
+    """List uploads by attached item, content type (e.g. "application/pdf" or "image/*") or date, newest first"""
+    if item_id:
+        files = upload_store.list_for_item(item_id)
+    elif content_type:
+        files = upload_store.list_by_content_type(content_type)
+    else:
+        files = upload_store.list_by_date(since, until, limit)
+    
+    # Narrow the indexed selection by any remaining filters
+    if content_type and item_id:
+        keys = set(UploadMetadataStore._content_type_keys(content_type))
+        files = [f for f in files if keys & set(UploadMetadataStore._content_type_keys(f["content_type"]))]
+    if (item_id or content_type) and (since or until):
+        files = [f for f in files if (not since or f["uploaded_at"] >= since) and (not until or f["uploaded_at"] < until)]
+    return {"files": files[:limit], "total": len(files), "stats": upload_store.stats()}
+
+@app.get("/api/uploads/orphans")
+async def list_orphan_uploads(older_than_hours: float = 24):
+    """Uploads attached to no existing item for a while, and stored content no upload references"""
+    cutoff = (datetime.utcnow() - timedelta(hours=older_than_hours)).isoformat()
+    return upload_store.orphans(cutoff, {item["id"] for item in raid_items_db})
+
+class AttachmentRequest(BaseModel):
+    file_id: str
+
+@app.get("/api/raid-items/{item_id}/attachments")
+async def list_item_attachments(item_id: str):
+    """List the uploads attached to a RAID item"""
+    return {"item_id": item_id, "files": upload_store.list_for_item(item_id)}
+
+@app.post("/api/raid-items/{item_id}/attachments")
+async def attach_upload(item_id: str, request: AttachmentRequest):
+    """Attach an uploaded file to a RAID item"""
+    if not upload_store.get(request.file_id):
+        raise HTTPException(status_code=404, detail="File not found")
+    _attach_upload(request.file_id, item_id)
+    return {"message": "File attached successfully", "file": upload_store.get(request.file_id)}
+
+@app.delete("/api/raid-items/{item_id}/attachments/{file_id}")
+async def detach_upload(item_id: str, file_id: str):
+    """Detach an uploaded file from a RAID item; the upload itself is kept"""
+    if item_id not in (upload_store.get(file_id) or {}).get("item_ids", []):
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    upload_store.detach(file_id, item_id)
+    item = _find_raid_item(item_id)
+    if item:
+        item["attachments"] = [a for a in (item.get("attachments") or []) if a != file_id]
+    return {"message": "File detached successfully"}
+
+# ============================================================================
+# DOCUMENT EXTRACTION PIPELINE
+# ============================================================================
+
+import codecs
+
+class TextChunker:
+    """Split streamed text into overlapping chunks, preferring paragraph and line breaks.
+    
+    Text is fed incrementally so a document never has to be held in memory whole;
+    only the current chunk and its overlap are buffered.
+    """
+    BOUNDARIES = ("\n\n", "\n", ". ")
+    
+    def __init__(self, chunk_chars: int = 6000, overlap_chars: int = 600):
+        self.chunk_chars = max(chunk_chars, 100)
+        # Cuts land past the middle of the chunk, so the overlap must stay below it to make progress
+        self.overlap_chars = min(overlap_chars, self.chunk_chars // 4)
+        self.buffer = ""
+        self.emitted = 0  # Leading buffer characters already sent in a previous chunk
+    
+    def feed(self, text: str) -> List[str]:
+        self.buffer += text
+        chunks = []
+        while len(self.buffer) >= self.chunk_chars:
+            cut = self._boundary()
+            chunks.append(self.buffer[:cut])
+            start = cut - self.overlap_chars
+            # Start the overlap at a line or word break when there is one
+            for sep in ("\n", " "):
+                index = self.buffer.find(sep, start, cut)
+                if index != -1:
+                    start = index + 1
+                    break
+            self.buffer = self.buffer[start:]
+            self.emitted = cut - start
+        return chunks
+    
+    def flush(self) -> List[str]:
+        chunks = [self.buffer] if len(self.buffer) > self.emitted and self.buffer.strip() else []
+        self.buffer, self.emitted = "", 0
+        return chunks
+    
+    def _boundary(self) -> int:
+        for sep in self.BOUNDARIES:
+            index = self.buffer.rfind(sep, self.chunk_chars // 2, self.chunk_chars)
+            if index != -1:
+                return index + len(sep)
+        return self.chunk_chars
+
+async def _iter_file_text(path: str, block_size: int = 64 * 1024):
+    """Yield (bytes read, decoded text) from a file, reading blocks off the event loop"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open(path, "rb") as f:
+        while True:
+            block = await asyncio.to_thread(f.read, block_size)
+            if not block:
+                break
+            yield len(block), decoder.decode(block)
+    yield 0, decoder.decode(b"", final=True)
+
+async def _iter_string_text(text: str, block_size: int = 64 * 1024):
+    for i in range(0, len(text), block_size):
+        piece = text[i:i + block_size]
+        yield len(piece), piece
+
+class CandidateDeduper:
+    """Merge candidate items extracted from overlapping chunks or several providers"""
+    SIMILARITY = 0.8
+    
+    def __init__(self):
+        self.items: List[Dict[str, Any]] = []
+        self.by_key: Dict[tuple, Dict[str, Any]] = {}
+        self.by_type: Dict[str, List[tuple]] = {}
+        self.seen = 0
+    
+    def add(self, candidate: Dict[str, Any], source: Any) -> bool:
+        """Add a candidate, returning False when it duplicates an earlier one"""
+        self.seen += 1
+        tokens = frozenset(re.findall(r"[a-z0-9]+", candidate["title"].lower()))
+        match = self.by_key.get((candidate["type"], tokens))
+        if match is None:
+            for other_tokens, other in self.by_type.get(candidate["type"], []):
+                if tokens and len(tokens & other_tokens) / len(tokens | other_tokens) >= self.SIMILARITY:
+                    match = other
+                    break
+        
+        if match is not None:
+            if len(candidate["description"]) > len(match["description"]):
+                match["description"] = candidate["description"]
+            if source not in match["sources"]:
+                match["sources"].append(source)
+            return False
+        
+        candidate["sources"] = [source]
+        self.items.append(candidate)
+        self.by_key[(candidate["type"], tokens)] = candidate
+        self.by_type.setdefault(candidate["type"], []).append((tokens, candidate))
+        return True
+    
+    @property
+    def duplicates(self) -> int:
+        return self.seen - len(self.items)
+
+class ExtractionRequest(BaseModel):
+    provider_id: Optional[str] = None
+    workstream: Optional[str] = None  # Default for candidates without one
+    owner: Optional[str] = None
+    dry_run: bool = False  # Return candidates without inserting them
+
+class TextAnalysisRequest(BaseModel):
+    text: str
+    providers: List[str] = []
+
+class DocumentExtractionPipeline:
+    """Extract candidate RAID items from documents.
+    
+    The document is read as a stream and split into overlapping chunks that feed a
+    bounded queue; a fixed number of workers run extraction on the chunks in parallel,
+    so memory stays flat and the provider sees limited concurrency. Candidates are
+    deduplicated across chunks and bulk-inserted once the document is done.
+    """
+    EXTRACTABLE_CONTENT_TYPES = ("text/", "application/json", "application/xml", "application/csv")
+    EXTRACTABLE_EXTENSIONS = (".txt", ".md", ".csv", ".json", ".log", ".xml", ".html", ".htm", ".rst")
+    MAX_RUNS = 200
+    TYPE_NAMES = {
+        "risk": "Risk", "risks": "Risk",
+        "assumption": "Assumption", "assumptions": "Assumption",
+        "issue": "Issue", "issues": "Issue",
+        "dependency": "Dependency", "dependencies": "Dependency",
+    }
+    
+    def __init__(self, manager: MultiAIManager):
+        self.manager = manager
+        self.runs: Dict[str, Dict[str, Any]] = {}
+        self.updated: Dict[str, asyncio.Event] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.chunk_chars = int(os.getenv("AI_EXTRACT_CHUNK_CHARS", "6000"))
+        self.overlap_chars = int(os.getenv("AI_EXTRACT_OVERLAP_CHARS", "600"))
+        self.concurrency = int(os.getenv("AI_EXTRACT_CONCURRENCY", "4"))
+        self.max_attempts = max(1, int(os.getenv("AI_EXTRACT_MAX_ATTEMPTS", "3")))
+    
+    @classmethod
+    def is_extractable(cls, file_metadata: Dict[str, Any]) -> bool:
+        content_type = file_metadata.get("content_type") or ""
+        name = (file_metadata.get("original_name") or "").lower()
+        return content_type.startswith(cls.EXTRACTABLE_CONTENT_TYPES) or name.endswith(cls.EXTRACTABLE_EXTENSIONS)
+    
+    def start(self, file_metadata: Dict[str, Any], provider: AIProvider, request: ExtractionRequest) -> Dict[str, Any]:
+        """Start extracting from an uploaded file in the background"""
+        run = {
+            **self.new_progress(),
+            "id": str(uuid.uuid4()),
+            "file_id": file_metadata["id"],
+            "provider_id": provider.id,
+            "dry_run": request.dry_run,
+            "status": "queued",
+            "total_bytes": file_metadata.get("size"),
+            "items_created": 0,
+            "item_ids": [],
+            "candidates": [],
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "finished_at": None
+        }
+        self.runs[run["id"]] = run
+        self.updated[run["id"]] = asyncio.Event()
+        self.tasks[run["id"]] = asyncio.create_task(self._run_file(run, file_metadata, provider, request))
+        self._prune()
+        return run
+    
+    async def wait(self, run_id: str, timeout: float) -> Dict[str, Any]:
+        """Wait for the next progress update on a run"""
+        event = self.updated.get(run_id)
+        if event is None:
+            raise HTTPException(status_code=404, detail="Extraction not found")
+        await asyncio.wait_for(event.wait(), timeout)
+        if run_id not in self.runs:
+            raise HTTPException(status_code=404, detail="Extraction not found")
+        return self.runs[run_id]
+    
+    @staticmethod
+    def new_progress() -> Dict[str, Any]:
+        return {"bytes_read": 0, "chunks_total": 0, "chunks_done": 0, "candidates_found": 0,
+                "duplicates": 0, "errors": []}
+    
+    async def extract(self, pieces, provider: AIProvider, progress: Dict[str, Any],
+                      run_id: Optional[str] = None, defaults: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        """Chunk streamed (size, text) pieces and extract deduplicated candidates from them"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        deduper = CandidateDeduper()
+        
+        async def produce():
+            chunker = TextChunker(self.chunk_chars, self.overlap_chars)
+            try:
+                async for size, text in pieces:
+                    progress["bytes_read"] += size
+                    for chunk in chunker.feed(text):
+                        await queue.put((progress["chunks_total"], chunk))
+                        progress["chunks_total"] += 1
+                for chunk in chunker.flush():
+                    await queue.put((progress["chunks_total"], chunk))
+                    progress["chunks_total"] += 1
+            finally:
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+        
+        async def work():
+            while True:
+                entry = await queue.get()
+                if entry is None:
+                    return
+                index, chunk = entry
+                try:
+                    for candidate in await self._extract_chunk(provider, chunk, defaults or {}):
+                        deduper.add(candidate, index)
+                except Exception as e:
+                    progress["errors"].append({"chunk": index, "error": str(e)[:200]})
+                progress["chunks_done"] += 1
+                progress["candidates_found"] = deduper.seen
+                progress["duplicates"] = deduper.duplicates
+                if run_id:
+                    self._notify(run_id)
+        
+        await asyncio.gather(produce(), *(work() for _ in range(self.concurrency)))
+        return deduper.items
+    
+    async def _extract_chunk(self, provider: AIProvider, chunk: str, defaults: Dict[str, str]) -> List[Dict[str, Any]]:
+        prompt = f"""Extract RAID items (risks, assumptions, issues and dependencies) from this document excerpt.
+The excerpt may start or end mid-sentence; ignore partial sentences at the edges.
+
+Document excerpt:
+\"\"\"
+{chunk}
+\"\"\"
+
+Respond in JSON format:
+{{
+    "items": [
+        {{
+            "type": "Risk|Assumption|Issue|Dependency",
+            "title": "Short title",
+            "description": "What the document says about it",
+            "impact": "Low|Medium|High|Critical",
+            "likelihood": "Low|Medium|High",
+            "owner": "Owner if named, else empty",
+            "workstream": "Workstream if named, else empty",
+            "dueDate": "YYYY-MM-DD if stated, else empty"
+        }}
+    ]
+}}
+
+Return an empty list if the excerpt contains no RAID items."""
+        for attempt in range(1, self.max_attempts + 1):
+            await self.manager.wait_for_backoff(provider.id)
+            try:
+                response = await self.manager.complete(
+                    provider,
+                    "You are an expert RAID analyst extracting structured RAID items from project documents.",
+                    prompt,
+                    "raid-extraction"
+                )
+                break
+            except Exception:
+                if attempt == self.max_attempts:
+                    raise
+                await asyncio.sleep(attempt)
+        
+        data = JSONObjectExtractor(("items",)).feed(response) or {}
+        raw_items = data.get("items") if isinstance(data.get("items"), list) else []
+        return [c for c in (self._normalize_candidate(raw, defaults) for raw in raw_items) if c]
+    
+    @classmethod
+    def _normalize_candidate(cls, raw: Any, defaults: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Coerce a raw extracted item into RAIDItemCreate fields, or None if unusable"""
+        if not isinstance(raw, dict) or not str(raw.get("title") or "").strip():
+            return None
+        raw_type = cls.TYPE_NAMES.get(str(raw.get("type") or "").strip().lower())
+        if raw_type is None:
+            return None
+        
+        def pick(field: str, valid: tuple, default: str) -> str:
+            value = str(raw.get(field) or "").strip().title()
+            return value if value in valid else default
+        
+        impact, likelihood = pick("impact", VALID_IMPACTS, "Medium"), pick("likelihood", VALID_LIKELIHOODS, "Medium")
+        title = str(raw["title"]).strip()[:200]
+        due_date = str(raw.get("dueDate") or "").strip()
+        return {
+            "type": raw_type,
+            "title": title,
+            "description": str(raw.get("description") or "").strip() or title,
+            "status": "Open",
+            "priority": RAIDRuleEngine.PRIORITY_BY_SCORE[calculate_severity_score(impact, likelihood)],
+            "impact": impact,
+            "likelihood": likelihood,
+            "workstream": str(raw.get("workstream") or "").strip() or defaults.get("workstream") or "Unassigned",
+            "owner": str(raw.get("owner") or "").strip() or defaults.get("owner") or "Unassigned",
+            "dueDate": due_date if re.fullmatch(r"\d{4}-\d{2}-\d{2}", due_date) else None
+        }
+    
+    async def _run_file(self, run: Dict[str, Any], file_metadata: Dict[str, Any], provider: AIProvider,
+                        request: ExtractionRequest):
+        run["status"] = "running"
+        self._notify(run["id"])
+        try:
+            defaults = {"workstream": request.workstream, "owner": request.owner}
+            candidates = await self.extract(_iter_file_text(file_metadata["path"]), provider, run, run["id"], defaults)
+            run["candidates"] = candidates
+            if not request.dry_run:
+                note = f"Extracted from {file_metadata['original_name']}"
+                fields = set(RAIDItemCreate.__fields__)
+                created = [
+                    build_raid_item(RAIDItemCreate(**{k: v for k, v in c.items() if k in fields},
+                                                   references=[f"upload:{file_metadata['id']}"]), "AI Extraction", note)
+                    for c in candidates
+                ]
+                raid_items_db.extend(created)
+                for item in created:
+                    duplicate_index.add(item)
+                run["item_ids"] = [item["id"] for item in created]
+                run["items_created"] = len(created)
+            run["status"] = "succeeded"
+        except Exception as e:
+            run["status"] = "failed"
+            run["error"] = str(e)[:200]
+        finally:
+            run["finished_at"] = datetime.utcnow().isoformat()
+            self.tasks.pop(run["id"], None)
+            self._notify(run["id"])
+    
+    def _notify(self, run_id: str):
+        event = self.updated.get(run_id)
+        if event:
+            event.set()
+            self.updated[run_id] = asyncio.Event()
+    
+    def _prune(self):
+        finished = [run_id for run_id, run in self.runs.items() if run["finished_at"]]
+        for run_id in finished[:max(0, len(self.runs) - self.MAX_RUNS)]:
+            self.runs.pop(run_id)
+            self.updated.pop(run_id, None)
+
+document_pipeline = DocumentExtractionPipeline(ai_manager)
+
+def _extraction_response(run: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in run.items() if k != "candidates" or run["dry_run"]}
+
+@app.post("/api/upload/{file_id}/extract", status_code=202)
+async def extract_from_upload(file_id: str, request: ExtractionRequest):
+    """Start extracting RAID items from an uploaded document"""
+    file_metadata = upload_store.get(file_id)
+    if not file_metadata:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not DocumentExtractionPipeline.is_extractable(file_metadata):
+        raise HTTPException(status_code=415, detail="Only text documents can be extracted")
+    
+    provider = await _get_request_provider(request.provider_id)
+    run = document_pipeline.start(file_metadata, provider, request)
+    return {"message": "Extraction started", "extraction": _extraction_response(run)}
+
+@app.get("/api/extractions/{run_id}")
+async def get_extraction(run_id: str):
+    """Get extraction progress and results"""
+    if run_id not in document_pipeline.runs:
+        raise HTTPException(status_code=404, detail="Extraction not found")
+    return _extraction_response(document_pipeline.runs[run_id])
+
+@app.get("/api/extractions/{run_id}/events")
+async def subscribe_extraction(run_id: str):
+    """Stream extraction progress as server-sent events until it finishes"""
+    if run_id not in document_pipeline.runs:
+        raise HTTPException(status_code=404, detail="Extraction not found")
+    
+    async def event_stream():
+        run = document_pipeline.runs[run_id]
+        while not run["finished_at"]:
+            yield _sse_event("progress", _extraction_response(run))
+            try:
+                run = await document_pipeline.wait(run_id, timeout=15)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+            except HTTPException:
+                break  # Pruned after finishing; `run` is the same dict, so it holds the final state
+        yield _sse_event("complete", _extraction_response(run))
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.post("/api/ai/analyze-text")
+async def analyze_text(request: TextAnalysisRequest):
+    """Extract RAID items from text with one or more providers and build a consensus"""
+    providers = [ai_manager.providers[p] for p in request.providers if p in ai_manager.providers]
+    if not providers:
+        providers = [await _get_request_provider(None)]
+    
+    async def run_provider(provider: AIProvider) -> Dict[str, Any]:
+        start_time = time.time()
+        progress = document_pipeline.new_progress()
+        candidates = await document_pipeline.extract(_iter_string_text(request.text), provider, progress)
+        chunks = max(progress["chunks_total"], 1)
+        return {
+            "provider": provider.name,
+            "model": provider.model,
+            "analysis": {"items": candidates, "chunks": progress["chunks_total"], "errors": progress["errors"]},
+            "confidence": round(1 - len(progress["errors"]) / chunks, 2),
+            "processing_time": time.time() - start_time
+        }
+    
+    results = await asyncio.gather(*(run_provider(p) for p in providers))
+    
+    # Items found by more providers carry more weight in the consensus
+    deduper = CandidateDeduper()
+    for index, result in enumerate(results):
+        for candidate in result["analysis"]["items"]:
+            deduper.add({k: v for k, v in candidate.items() if k != "sources"}, index)
+    ranked = sorted(deduper.items, key=lambda c: -len(c["sources"]))
+    consensus = {
+        f"{item_type.lower()}s" if item_type != "Dependency" else "dependencies":
+            [c["title"] for c in ranked if c["type"] == item_type]
+        for item_type in VALID_TYPES
+    }
+    consensus["confidence_score"] = (
+        round(sum(len(c["sources"]) for c in ranked) / (len(ranked) * len(providers)), 2) if ranked else 0.0
+    )
+    return {"results": results, "consensus": consensus}
+
+# ============================================================================
+# SPREADSHEET IMPORT
+# ============================================================================
+
+import csv
+import io
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pydantic import ValidationError
+
+try:
+    import openpyxl  # Optional, only needed for XLSX imports
+except ImportError:
+    openpyxl = None
+
+IMPORT_COLUMN_ALIASES = {
+    "type": "type", "raidtype": "type", "category": "type", "itemtype": "type",
+    "title": "title", "name": "title", "summary": "title", "subject": "title",
+    "description": "description", "details": "description", "detail": "description", "notes": "description",
+    "status": "status", "state": "status",
+    "priority": "priority",
+    "impact": "impact", "severity": "impact",
+    "likelihood": "likelihood", "probability": "likelihood",
+    "workstream": "workstream", "stream": "workstream", "team": "workstream", "area": "workstream",
+    "owner": "owner", "assignee": "owner", "assignedto": "owner", "raisedby": "owner",
+    "duedate": "dueDate", "due": "dueDate", "deadline": "dueDate",
+    "targetdate": "targetDate", "target": "targetDate",
+    "governancetags": "governanceTags", "tags": "governanceTags", "labels": "governanceTags",
+    "references": "references", "links": "references", "reference": "references",
+}
+IMPORT_REQUIRED_FIELDS = ("type", "title")
+
+def _import_choice(value: str, valid: tuple) -> Optional[str]:
+    """Match a cell to one of the valid values, ignoring case"""
+    lowered = value.strip().lower()
+    return next((v for v in valid if v.lower() == lowered), None)
+
+def _map_import_row(row: List[str], columns: List[Optional[str]], defaults: Dict[str, str]) -> tuple:
+    """Convert a spreadsheet row to RAIDItemCreate fields, returning (fields, errors)"""
+    raw = {field: row[i].strip() for i, field in enumerate(columns) if field and i < len(row) and row[i].strip()}
+    fields: Dict[str, Any] = {}
+    errors = []
+    
+    item_type = raw.get("type", "")
+    letter_types = {t[0]: t for t in VALID_TYPES}
+    fields["type"] = (_import_choice(item_type, VALID_TYPES) or _import_choice(item_type.rstrip("sS"), VALID_TYPES)
+                      or letter_types.get(item_type.upper()))
+    if not fields["type"]:
+        errors.append({"field": "type", "message": f"'{item_type}' is not one of {', '.join(VALID_TYPES)}"})
+    fields["title"] = raw.get("title", "")[:200]
+    if not fields["title"]:
+        errors.append({"field": "title", "message": "Title is required"})
+    fields["description"] = raw.get("description") or fields["title"]
+    
+    priority = raw.get("priority", "")
+    if priority.isdigit():
+        priority = f"P{priority}"
+    for field, value, valid in (("status", raw.get("status"), VALID_STATUSES),
+                                ("priority", priority, VALID_PRIORITIES),
+                                ("impact", raw.get("impact"), VALID_IMPACTS),
+                                ("likelihood", raw.get("likelihood"), VALID_LIKELIHOODS)):
+        if value:
+            fields[field] = _import_choice(value, valid)
+            if not fields[field]:
+                errors.append({"field": field, "message": f"'{value}' is not one of {', '.join(valid)}"})
+    
+    for field in ("workstream", "owner"):
+        fields[field] = raw.get(field) or defaults.get(field) or ""
+        if not fields[field]:
+            errors.append({"field": field, "message": f"{field.title()} is required"})
+    for field in ("dueDate", "targetDate"):
+        if raw.get(field):
+            fields[field] = raw[field][:10]
+            if not re.fullmatch(r"\d{4}-\d{2}-\d{2}", fields[field]):
+                errors.append({"field": field, "message": f"'{raw[field]}' is not a YYYY-MM-DD date"})
+    for field in ("governanceTags", "references"):
+        if raw.get(field):
+            fields[field] = [v.strip() for v in re.split(r"[,;\n]", raw[field]) if v.strip()]
+    return fields, errors
+
+def _read_csv_record(f) -> bytes:
+    """Read one CSV record, which spans several lines when a quoted field contains newlines"""
+    record = f.readline()
+    while record.count(b'"') % 2 and (line := f.readline()):
+        record += line
+    return record
+
+def _split_csv(path: str, rows_per_segment: int) -> tuple:
+    """Return the header and (start, end, first row number) byte ranges of whole records.
+    
+    Quote parity per line is enough to find record boundaries, since escaped quotes
+    come in pairs, and it runs at C speed so the split is cheap next to parsing.
+    """
+    with open(path, "rb") as f:
+        header_record = _read_csv_record(f)
+        header = next(csv.reader(io.StringIO(header_record.decode("utf-8-sig", errors="replace"), newline="")), [])
+        segments = []
+        start = offset = f.tell()
+        first_row, rows, in_quotes = 2, 0, False
+        for line in f:
+            offset += len(line)
+            if line.count(b'"') % 2:
+                in_quotes = not in_quotes
+            if not in_quotes:
+                rows += 1
+                if rows == rows_per_segment:
+                    segments.append((start, offset, first_row))
+                    start, first_row, rows = offset, first_row + rows, 0
+        if offset > start:
+            segments.append((start, offset, first_row))
+    return header, segments
+
+def _import_csv_segment(path: str, start: int, end: int, first_row: int, columns: List[Optional[str]],
+                        defaults: Dict[str, str], dry_run: bool, source: Dict[str, str]) -> Dict[str, Any]:
+    """Parse, validate and build the items in one byte range of a CSV file; runs in a worker process"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8", errors="replace")
+    
+    items, errors, rows = [], [], 0
+    for index, row in enumerate(csv.reader(io.StringIO(text, newline=""))):
+        if not any(cell.strip() for cell in row):
+            continue
+        rows += 1
+        fields, row_errors = _map_import_row(row, columns, defaults)
+        if not row_errors:
+            try:
+                fields["references"] = fields.get("references", []) + [source["reference"]]
+                item_data = RAIDItemCreate(**fields)
+            except ValidationError as e:
+                row_errors = [{"field": ".".join(str(p) for p in err["loc"]), "message": err["msg"]} for err in e.errors()]
+        if row_errors:
+            errors.append({"row": first_row + index, "errors": row_errors})
+        elif not dry_run:
+            item = build_raid_item(item_data, "Import", source["note"])
+            items.append((item, duplicate_index.signature(item)))
+    return {"rows": rows, "items": items, "errors": errors}
+
+def _convert_xlsx_to_csv(path: str, csv_path: str, sheet: Optional[str]) -> int:
+    """Write a worksheet out as CSV so it can be split and parsed in parallel; runs in a worker process"""
+    # Stored blobs have no extension, so hand openpyxl a file object rather than a path it would reject
+    with open(path, "rb") as source:
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            worksheet = workbook[sheet] if sheet else workbook.active
+            rows = 0
+            with open(csv_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                for row in worksheet.iter_rows(values_only=True):
+                    writer.writerow(["" if v is None else v.date().isoformat() if isinstance(v, datetime) else v
+                                     for v in row])
+                    rows += 1
+            return rows
+        finally:
+            workbook.close()
+
+class ImportRequest(BaseModel):
+    mapping: Optional[Dict[str, str]] = None  # Column header -> RAIDItemCreate field, overriding detection
+    workstream: Optional[str] = None  # Default for rows without one
+    owner: Optional[str] = None
+    sheet: Optional[str] = None  # XLSX worksheet, defaults to the active one
+    dry_run: bool = False  # Validate and report without inserting
+
+class SpreadsheetImporter:
+    """Import RAID items from uploaded CSV and XLSX files using a process pool.
+    
+    The file is split into byte ranges of whole CSV records, and each range is parsed,
+    validated and built into items in a worker process, so the work spreads over every
+    core and stays off the event loop. Finished ranges are inserted as they arrive,
+    while only a bounded number of ranges are in flight. XLSX workbooks are first
+    converted to CSV in a worker.
+    """
+    XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    MAX_REPORTED_ERRORS = 20
+    
+    def __init__(self):
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.workers = int(os.getenv("IMPORT_WORKERS", "0")) or os.cpu_count() or 1
+        self.rows_per_segment = int(os.getenv("IMPORT_SEGMENT_ROWS", "1000"))
+        # Workers run at a lower CPU priority so API requests win when cores are shared
+        self.worker_nice = int(os.getenv("IMPORT_WORKER_NICE", "10"))
+        self.retention_seconds = float(os.getenv("IMPORT_RETENTION_HOURS", "24")) * 3600
+        self.pool: Optional[ProcessPoolExecutor] = None
+    
+    @classmethod
+    def file_kind(cls, file_metadata: Dict[str, Any]) -> Optional[str]:
+        name = (file_metadata.get("original_name") or "").lower()
+        content_type = file_metadata.get("content_type") or ""
+        if name.endswith((".xlsx", ".xlsm")) or content_type == cls.XLSX_CONTENT_TYPE:
+            return "xlsx"
+        if name.endswith(".csv") or content_type in ("text/csv", "application/csv"):
+            return "csv"
+        return None
+    
+    def start(self, file_metadata: Dict[str, Any], kind: str, request: ImportRequest) -> Dict[str, Any]:
+        job = {
+            "id": str(uuid.uuid4()),
+            "file_id": file_metadata["id"],
+            "kind": kind,
+            "status": "queued",
+            "dry_run": request.dry_run,
+            "columns": {},
+            "segments_total": 0,
+            "segments_done": 0,
+            "rows_processed": 0,
+            "rows_imported": 0,
+            "rows_failed": 0,
+            "errors": [],
+            "error": None,
+            "created_at": datetime.utcnow().isoformat(),
+            "finished_at": None
+        }
+        self._prune()
+        self.jobs[job["id"]] = job
+        self.tasks[job["id"]] = asyncio.create_task(self._run(job, file_metadata, request))
+        return job
+    
+    def _prune(self):
+        """Drop finished imports, and their error reports, past retention"""
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [j["id"] for j in self.jobs.values() if j.get("finished_ts", cutoff + 1) < cutoff]:
+            del self.jobs[job_id]
+    
+    async def shutdown(self):
+        for task in list(self.tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        if self.pool:
+            await asyncio.to_thread(self.pool.shutdown, True, cancel_futures=True)
+            self.pool = None
+    
+    def map_columns(self, header: List[str], mapping: Optional[Dict[str, str]]) -> List[Optional[str]]:
+        fields = set(RAIDItemCreate.__fields__)
+        explicit = {k.strip().lower(): v for k, v in (mapping or {}).items()}
+        columns = []
+        for name in header:
+            field = explicit.get(name.strip().lower()) or IMPORT_COLUMN_ALIASES.get(re.sub(r"[^a-z]", "", name.lower()))
+            columns.append(field if field in fields and field not in columns else None)
+        missing = [f for f in IMPORT_REQUIRED_FIELDS if f not in columns]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"No column found for: {', '.join(missing)}")
+        return columns
+    
+    def _executor(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            # Spawned workers don't inherit the event loop's threads and locks
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                            initializer=os.nice, initargs=(self.worker_nice,))
+        return self.pool
+    
+    async def _run(self, job: Dict[str, Any], file_metadata: Dict[str, Any], request: ImportRequest):
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        path, converted_path = file_metadata["path"], None
+        job["status"] = "running"
+        try:
+            if job["kind"] == "xlsx":
+                converted_path = os.path.join(UPLOAD_DIR, ".incoming", f"{job['id']}.csv")
+                await asyncio.to_thread(os.makedirs, os.path.dirname(converted_path), exist_ok=True)
+                await loop.run_in_executor(pool, _convert_xlsx_to_csv, path, converted_path, request.sheet)
+                path = converted_path
+            
+            header, segments = await loop.run_in_executor(pool, _split_csv, path, self.rows_per_segment)
+            columns = self.map_columns(header, request.mapping)
+            job["columns"] = {name: field for name, field in zip(header, columns) if field}
+            job["segments_total"] = len(segments)
+            
+            defaults = {"workstream": request.workstream, "owner": request.owner}
+            source = {"reference": f"upload:{file_metadata['id']}",
+                      "note": f"Imported from {file_metadata['original_name']}"}
+            remaining = iter(segments)
+            
+            def submit(segment: tuple) -> asyncio.Future:
+                return loop.run_in_executor(pool, _import_csv_segment, path, *segment, columns, defaults,
+                                            request.dry_run, source)
+            
+            pending = {submit(segment) for segment in itertools.islice(remaining, self.workers * 2)}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    await self._insert(job, future.result())
+                    segment = next(remaining, None)
+                    if segment:
+                        pending.add(submit(segment))
+            job["status"] = "succeeded"
+        except HTTPException as e:
+            job["status"], job["error"] = "failed", e.detail
+        except Exception as e:
+            job["status"], job["error"] = "failed", str(e)[:200]
+        finally:
+            job["finished_at"] = datetime.utcnow().isoformat()
+            job["finished_ts"] = time.time()
+            self.tasks.pop(job["id"], None)
+            if converted_path:
+                try:
+                    await asyncio.to_thread(os.remove, converted_path)
+                except FileNotFoundError:
+                    pass
+    
+    async def _insert(self, job: Dict[str, Any], result: Dict[str, Any]):
+        """Bulk insert one finished segment, yielding to other requests between slices"""
+        items = result["items"]
+        for start in range(0, len(items), 250):
+            batch = items[start:start + 250]
+            raid_items_db.extend(item for item, _ in batch)
+            for item, signature in batch:
+                duplicate_index.add(item, signature)
+            await asyncio.sleep(0)
+        job["segments_done"] += 1
+        job["rows_processed"] += result["rows"]
+        job["rows_failed"] += len(result["errors"])
+        job["rows_imported"] += len(result["items"])
+        job["errors"].extend(result["errors"])
+
+spreadsheet_importer = SpreadsheetImporter()
+
+@app.on_event("shutdown")
+async def stop_spreadsheet_importer():
+    await spreadsheet_importer.shutdown()
+
+def _import_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Import job status with the first few row errors; the full report is served separately"""
+    errors = sorted(job["errors"], key=lambda e: e["row"])[:SpreadsheetImporter.MAX_REPORTED_ERRORS]
+    return {**{k: v for k, v in job.items() if k != "finished_ts"}, "errors": errors}
+
+@app.post("/api/upload/{file_id}/import", status_code=202)
+async def import_spreadsheet(file_id: str, request: ImportRequest):
+    """Start importing RAID items from an uploaded CSV or XLSX file"""
+    file_metadata = upload_store.get(file_id)
+    if not file_metadata:
+        raise HTTPException(status_code=404, detail="File not found")
+    kind = SpreadsheetImporter.file_kind(file_metadata)
+    if not kind:
+        raise HTTPException(status_code=415, detail="Only CSV and XLSX files can be imported")
+    if kind == "xlsx" and openpyxl is None:
+        raise HTTPException(status_code=415, detail="XLSX import needs openpyxl installed; export the sheet as CSV")
+    
+    job = spreadsheet_importer.start(file_metadata, kind, request)
+    return {"message": "Import started", "import": _import_response(job)}
+
+@app.get("/api/imports/{import_id}")
+async def get_import(import_id: str):
+    """Get import progress and a sample of row errors"""
+    if import_id not in spreadsheet_importer.jobs:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return _import_response(spreadsheet_importer.jobs[import_id])
+
+@app.get("/api/imports/{import_id}/errors")
+async def get_import_errors(import_id: str):
+    """Get the full per-row error report of an import"""
+    if import_id not in spreadsheet_importer.jobs:
+        raise HTTPException(status_code=404, detail="Import not found")
+    errors = sorted(spreadsheet_importer.jobs[import_id]["errors"], key=lambda e: e["row"])
+    return {"import_id": import_id, "errors": errors, "total": len(errors)}
+
+# ============================================================================
+# METRICS ENDPOINT
+# ============================================================================
+
+RAID_ITEMS = metrics.gauge("raid_items", "RAID items in the register by type and status", ("type", "status"))
+RAID_ITEM_HISTORY_ENTRIES = metrics.gauge("raid_item_history_entries", "History entries across all RAID items")
+RAID_ITEM_HISTORY_MAX = metrics.gauge("raid_item_history_max_entries", "Longest history of a single RAID item")
+DUPLICATE_INDEX_ITEMS = metrics.gauge("duplicate_index_items", "RAID items in the near-duplicate index")
+UPLOAD_RECORDS = metrics.gauge("upload_records", "Upload metadata records")
+UPLOAD_BLOBS = metrics.gauge("upload_blobs", "Content-addressed blobs in the upload store")
+UPLOAD_STORED_BYTES = metrics.gauge("upload_stored_bytes", "Bytes held by upload blobs")
+UPLOAD_UNATTACHED = metrics.gauge("upload_unattached_records", "Upload records not attached to any RAID item")
+AI_PROVIDER_ACTIVE = metrics.gauge(
+    "ai_provider_active", "1 when the provider's last validation succeeded", ("provider", "model"))
+AI_TOKENS = metrics.counter(
+    "ai_tokens_total", "Estimated tokens by provider, model and direction", ("provider", "model", "direction"))
+AI_HEDGING = metrics.counter(
+    "ai_hedging_total", "Analyses eligible for hedging, hedged, and won by the hedge", ("event",))
+AI_LLM_CALLS_AVOIDED = metrics.counter(
+    "ai_llm_calls_avoided_total", "Analyses answered by the rule engine without an LLM call")
+RULE_ENGINE_LAST_PASS = metrics.gauge("rule_engine_last_pass_seconds", "Duration of the last rule engine pass")
+JOB_QUEUE_DEPTH = metrics.gauge("ai_job_queue_depth", "Analysis jobs waiting for a worker")
+JOB_QUEUE_OLDEST_AGE = metrics.gauge("ai_job_queue_oldest_age_seconds", "Age of the oldest queued analysis job")
+JOBS_RUNNING = metrics.gauge("ai_jobs_running", "Analysis jobs running per provider", ("provider",))
+JOBS = metrics.counter("ai_jobs_total", "Analysis job events (submitted, succeeded, failed, ...)", ("event",))
+
+# Items counted per event loop slice when a scrape walks the register
+METRICS_SCAN_SLICE = int(os.getenv("METRICS_SCAN_SLICE", "100000"))
+
+@metrics.collector
+async def collect_storage_metrics():
+    """Item and history counts, using C-level iteration over slices of the register and
+    yielding between slices so a large register does not stall other requests"""
+    by_type_status = Counter()
+    history_entries = history_max = 0
+    for start in range(0, len(raid_items_db), METRICS_SCAN_SLICE):
+        items = raid_items_db[start:start + METRICS_SCAN_SLICE]
+        by_type_status.update(zip(map(itemgetter("type"), items), map(itemgetter("status"), items)))
+        history_lengths = list(map(len, filter(None, map(itemgetter("history"), items))))
+        history_entries += sum(history_lengths)
+        history_max = max(history_max, max(history_lengths, default=0))
+        await asyncio.sleep(0)
+    RAID_ITEMS.values = dict(by_type_status)
+    RAID_ITEM_HISTORY_ENTRIES.set((), history_entries)
+    RAID_ITEM_HISTORY_MAX.set((), history_max)
+    DUPLICATE_INDEX_ITEMS.set((), len(duplicate_index.entries))
+    
+    upload_stats = upload_store.stats()
+    UPLOAD_RECORDS.set((), upload_stats["records"])
+    UPLOAD_BLOBS.set((), upload_stats["blobs"])
+    UPLOAD_STORED_BYTES.set((), upload_stats["stored_bytes"])
+    UPLOAD_UNATTACHED.set((), upload_stats["unattached_records"])
+
+@metrics.collector
+def collect_ai_metrics():
+    """Provider status, token usage and the hedging, coalescing and cache counters kept by the AI services"""
+    AI_PROVIDER_ACTIVE.values = {
+        (provider.id, provider.model): int(provider.status == "active") for provider in ai_manager.providers.values()
+    }
+    for usage in ai_manager.token_usage.values():
+        label_values = (usage["provider_id"], usage["model"])
+        AI_TOKENS.set(label_values + ("prompt",), usage["prompt_tokens"])
+        AI_TOKENS.set(label_values + ("completion",), usage["completion_tokens"])
+    for event, count in ai_manager.hedge_stats.items():
+        AI_HEDGING.set((event,), count)
+    
+    CACHE_REQUESTS.set(("coalescing", "hit"), ai_manager.coalesce_stats["coalesced"])
+    CACHE_REQUESTS.set(("coalescing", "miss"), ai_manager.coalesce_stats["upstream_calls"])
+    CACHE_REQUESTS.set(("executive_summary", "hit"), executive_summarizer.stats["hits"])
+    CACHE_REQUESTS.set(("executive_summary", "miss"), executive_summarizer.stats["misses"])
+    AI_LLM_CALLS_AVOIDED.set((), rule_engine.stats["llm_calls_avoided"])
+    RULE_ENGINE_LAST_PASS.set((), rule_engine.stats["last_pass_ms"] / 1000)
+
+@metrics.collector
+def collect_job_queue_metrics():
+    stats = job_queue.stats()
+    JOB_QUEUE_DEPTH.set((), stats["queue_depth"])
+    JOB_QUEUE_OLDEST_AGE.set((), stats["oldest_queued_age_seconds"])
+    JOBS_RUNNING.values = {(provider_id,): count for provider_id, count in stats["running_by_provider"].items()}
+    for event, count in job_queue.counters.items():
+        JOBS.set((event,), count)
+
+@app.on_event("startup")
+async def start_metrics():
+    event_loop_monitor.start()
+
+@app.on_event("shutdown")
+async def stop_metrics():
+    await event_loop_monitor.stop()
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(await metrics.render(), media_type="text/plain; version=0.0.4")
+
+# ============================================================================
+# PROFILING AND MEMORY DIAGNOSTICS
+# ============================================================================
+
+import hmac
+import sys
+import threading
+import tracemalloc
+from fastapi import Depends, Header
+
+# Admin endpoints and request profiling are only installed when a token is configured
+ADMIN_TOKEN = os.getenv("RAID_ADMIN_TOKEN", "")
+
+def _admin_token_matches(token: bytes) -> bool:
+    # Compare raw header bytes: compare_digest rejects str with non-ASCII characters
+    return bool(token) and hmac.compare_digest(token, ADMIN_TOKEN.encode())
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow the request only with the configured X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set RAID_ADMIN_TOKEN")
+    # Header values arrive decoded as latin-1, so this recovers the bytes that were sent
+    if not x_admin_token or not _admin_token_matches(x_admin_token.encode("latin-1")):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+class RequestProfiler:
+    """Statistical stack sampler for individual requests.
+
+    While at least one profiled request is in flight, a daemon thread samples the event
+    loop thread's stack every PROFILE_SAMPLE_INTERVAL seconds and adds the folded stack
+    to each profile. Samples therefore include any other work the loop does meanwhile,
+    and time spent awaiting I/O shows up as the loop's selector frames. No thread runs
+    and no request is touched while nothing is being profiled.
+    """
+    def __init__(self):
+        self.interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+        self.max_stored = int(os.getenv("PROFILE_MAX_STORED", "50"))
+        self.max_depth = int(os.getenv("PROFILE_MAX_DEPTH", "64"))
+        self.sample_rate = 0.0
+        self.sampling_until = 0.0
+        self.sampling_remaining = 0
+        self.active: Dict[str, Dict[str, Any]] = {}
+        self.profiles: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.loop_thread_id: Optional[int] = None
+    
+    def arm(self, sample_rate: float, max_requests: int, duration_seconds: float):
+        self.sample_rate = sample_rate
+        self.sampling_remaining = max_requests
+        self.sampling_until = time.time() + duration_seconds
+    
+    def disarm(self):
+        self.sample_rate = 0.0
+        self.sampling_remaining = 0
+    
+    def should_sample(self) -> bool:
+        if time.time() > self.sampling_until or self.sampling_remaining <= 0:
+            self.disarm()
+            return False
+        if random.random() >= self.sample_rate:
+            return False
+        self.sampling_remaining -= 1
+        return True
+    
+    def begin(self, scope, trigger: str) -> Dict[str, Any]:
+        profile = {
+            "id": str(uuid.uuid4()),
+            "trigger": trigger,
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": None,
+            "status": None,
+            "started_at": datetime.utcnow().isoformat(),
+            "started": time.perf_counter(),
+            "duration_ms": None,
+            "samples": Counter()
+        }
+        self.loop_thread_id = threading.get_ident()
+        with self.lock:
+            self.active[profile["id"]] = profile
+            self.wakeup.set()
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self.thread.start()
+        return profile
+    
+    def end(self, profile: Dict[str, Any], scope, status: int):
+        with self.lock:
+            self.active.pop(profile["id"], None)
+            # The sampler may still hold this profile; readers get a copy it never touches
+            profile["samples"] = Counter(profile["samples"])
+        route = scope.get("route")
+        profile["route"] = route.path if route is not None else None
+        profile["status"] = status
+        profile["duration_ms"] = round((time.perf_counter() - profile.pop("started")) * 1000, 2)
+        self.profiles[profile["id"]] = profile
+        while len(self.profiles) > self.max_stored:
+            self.profiles.popitem(last=False)
+    
+    def _run(self):
+        while True:
+            self.wakeup.wait()
+            with self.lock:
+                active = list(self.active.values())
+                if not active:
+                    self.wakeup.clear()
+            if active:
+                frame = sys._current_frames().get(self.loop_thread_id)
+                if frame is not None:
+                    stack = self._fold(frame)
+                    with self.lock:
+                        for profile in active:
+                            profile["samples"][stack] += 1
+                time.sleep(self.interval)
+    
+    def _fold(self, frame) -> str:
+        """Root-first "frame;frame;frame" stack, the input format of flamegraph tools"""
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+    
+    @staticmethod
+    def summary(profile: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in profile.items() if k != "samples"} | {"samples": sum(profile["samples"].values())}
+    
+    @staticmethod
+    def call_tree(samples: Counter, min_fraction: float) -> Dict[str, Any]:
+        """Nested call tree with sample counts, dropping branches below min_fraction of the total"""
+        root = {"name": "all", "samples": 0, "children": {}}
+        for stack, count in samples.items():
+            node = root
+            node["samples"] += count
+            for name in stack.split(";"):
+                node = node["children"].setdefault(name, {"name": name, "samples": 0, "children": {}})
+                node["samples"] += count
+        
+        cutoff = root["samples"] * min_fraction
+        
+        def prune(node):
+            children = sorted((c for c in node["children"].values() if c["samples"] >= cutoff),
+                              key=lambda c: c["samples"], reverse=True)
+            return {"name": node["name"], "samples": node["samples"], "children": [prune(c) for c in children]}
+        
+        return prune(root)
+
+request_profiler = RequestProfiler()
+
+def _profile_header_requested(scope) -> bool:
+    """An admin asked for this one request to be profiled with X-Profile: 1"""
+    headers = dict(scope["headers"])
+    if headers.get(b"x-profile", b"").lower() not in (b"1", b"true"):
+        return False
+    return _admin_token_matches(headers.get(b"x-admin-token", b""))
+
+class ProfilingMiddleware:
+    """Profile sampled requests and those carrying X-Profile, adding an X-Profile-Id header"""
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        trigger = None
+        if scope["type"] == "http":
+            if request_profiler.sample_rate and request_profiler.should_sample():
+                trigger = "sampled"
+            elif any(name == b"x-profile" for name, _ in scope["headers"]) and _profile_header_requested(scope):
+                trigger = "header"
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+        
+        profile = request_profiler.begin(scope, trigger)
+        status = [500]
+        
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"x-profile-id", profile["id"].encode())]}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            request_profiler.end(profile, scope, status[0])
+
+if ADMIN_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
+
+# Elements whose deep size is measured when estimating a large container
+MEMORY_SAMPLE_SIZE = int(os.getenv("MEMORY_SAMPLE_SIZE", "500"))
+
+def _deep_sizeof(obj, seen: set) -> int:
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k, seen) + _deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(_deep_sizeof(v, seen) for v in obj)
+    elif isinstance(obj, BaseModel):
+        size += _deep_sizeof(obj.__dict__, seen)
+    return size
+
+def _estimated_size(container, part=None) -> int:
+    """Container size plus the mean deep size of a random sample of its elements times
+    their number; `part` picks the piece of each element to measure"""
+    elements = list(container.items()) if isinstance(container, dict) else list(container)
+    if not elements:
+        return sys.getsizeof(container)
+    sample = random.sample(elements, min(len(elements), MEMORY_SAMPLE_SIZE))
+    measured = sum(_deep_sizeof(part(e) if part else e, set()) for e in sample)
+    return sys.getsizeof(container) + int(measured / len(sample) * len(elements))
+
+def memory_by_subsystem() -> Dict[str, Dict[str, Any]]:
+    """Estimated retained bytes of the main in-memory structures"""
+    history_bytes = _estimated_size(raid_items_db, part=lambda item: item.get("history"))
+    return {
+        "item_store": {
+            "objects": len(raid_items_db),
+            "bytes": _estimated_size(raid_items_db, part=lambda item: {k: v for k, v in item.items() if k != "history"})
+        },
+        "history": {
+            "objects": sum(map(len, filter(None, map(itemgetter("history"), raid_items_db)))),
+            "bytes": history_bytes
+        },
+        "duplicate_index": {
+            "objects": len(duplicate_index.entries),
+            # Entries reference the stored item, which is counted in the item store
+            "bytes": _estimated_size(duplicate_index.entries, part=lambda entry: entry[1][:2])
+                     + sum(_estimated_size(band) for band in duplicate_index.buckets)
+        },
+        "caches": {
+            "objects": len(executive_summarizer.cache) + len(ai_manager.validation_cache),
+            "bytes": sum(_estimated_size(cache) for cache in (
+                executive_summarizer.cache, ai_manager.validation_cache,
+                ai_manager.latency_samples, ai_manager.ttfb_samples, ai_manager.token_usage
+            ))
+        },
+        "uploads_metadata": {
+            "objects": len(upload_store.records),
+            "bytes": sum(_estimated_size(index) for index in (
+                upload_store.records, upload_store.blobs, upload_store.by_sha, upload_store.by_item,
+                upload_store.by_content_type, upload_store.by_date, upload_store.unattached
+            ))
+        },
+        "jobs": {
+            "objects": len(job_queue.jobs) + len(document_pipeline.runs) + len(spreadsheet_importer.jobs),
+            "bytes": sum(_estimated_size(jobs) for jobs in (
+                job_queue.jobs, document_pipeline.runs, spreadsheet_importer.jobs
+            ))
+        }
+    }
+
+class MemoryTracer:
+    """tracemalloc snapshots grouped by the section of this module that allocated.
+
+    Each allocation is attributed to the innermost frame in server.py, so memory
+    allocated inside pydantic or json on behalf of, say, the upload store is counted
+    under FILE UPLOAD ENDPOINTS. tracemalloc only sees allocations made after tracing
+    started, and slows allocation while it runs, so it is off until an admin starts it.
+    """
+    def __init__(self):
+        self.previous: Optional[tracemalloc.Snapshot] = None
+        self._sections: Optional[List[tuple]] = None
+    
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+    
+    def start(self, frames: int):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self.previous = None
+    
+    def stop(self):
+        tracemalloc.stop()
+        self.previous = None
+    
+    def sections(self) -> List[tuple]:
+        """(first line, title) of each "# ===" banner section in this file"""
+        if self._sections is None:
+            with open(__file__, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            self._sections = [(1, "SETUP, MODELS AND AI MANAGER")]
+            for i in range(len(lines) - 2):
+                if lines[i].startswith("# ====") and lines[i + 2].startswith("# ===="):
+                    self._sections.append((i + 1, lines[i + 1].lstrip("# ").strip()))
+        return self._sections
+    
+    def _subsystem(self, traceback: tracemalloc.Traceback, starts: List[int], titles: List[str]) -> tuple:
+        for frame in reversed(traceback):  # Innermost frame last
+            if frame.filename == __file__:
+                return titles[bisect.bisect_right(starts, frame.lineno) - 1], frame
+        return "FRAMEWORK AND LIBRARIES", traceback[-1]
+    
+    def snapshot(self, limit: int) -> Dict[str, Any]:
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        starts, titles = zip(*self.sections())
+        by_subsystem: Dict[str, Dict[str, int]] = {}
+        by_line: Dict[str, Dict[str, int]] = {}
+        for stat in snapshot.statistics("traceback"):
+            subsystem, frame = self._subsystem(stat.traceback, starts, titles)
+            totals = by_subsystem.setdefault(subsystem, {"bytes": 0, "blocks": 0})
+            totals["bytes"] += stat.size
+            totals["blocks"] += stat.count
+            line = by_line.setdefault(f"{os.path.basename(frame.filename)}:{frame.lineno}",
+                                      {"subsystem": subsystem, "bytes": 0, "blocks": 0})
+            line["bytes"] += stat.size
+            line["blocks"] += stat.count
+        
+        growth = []
+        if self.previous is not None:
+            growth = [
+                {"line": f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                 "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in snapshot.compare_to(self.previous, "lineno")[:limit]
+            ]
+        self.previous = snapshot
+        
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "by_subsystem": dict(sorted(by_subsystem.items(), key=lambda kv: kv[1]["bytes"], reverse=True)),
+            "top_lines": sorted(({"line": k, **v} for k, v in by_line.items()),
+                                key=lambda line: line["bytes"], reverse=True)[:limit],
+            "growth_since_last_snapshot": growth
+        }
+
+memory_tracer = MemoryTracer()
+
+class ProfilingRequest(BaseModel):
+    sample_rate: float = Field(0.01, gt=0, le=1)
+    max_requests: int = Field(20, gt=0)
+    duration_seconds: float = Field(300, gt=0)
+
+class MemoryTracingRequest(BaseModel):
+    frames: int = Field(25, ge=1, le=100)
+
+@app.get("/api/admin/profiling", dependencies=[Depends(require_admin)])
+async def get_profiling_status():
+    """Sampling state and the most recent request profiles"""
+    armed = request_profiler.sample_rate > 0 and time.time() < request_profiler.sampling_until
+    return {
+        "sampling": armed,
+        "sample_rate": request_profiler.sample_rate if armed else 0.0,
+        "remaining": request_profiler.sampling_remaining if armed else 0,
+        "until": datetime.utcfromtimestamp(request_profiler.sampling_until).isoformat() if armed else None,
+        "in_progress": len(request_profiler.active),
+        "profiles": [RequestProfiler.summary(p) for p in reversed(request_profiler.profiles.values())]
+    }
+
+@app.post("/api/admin/profiling", dependencies=[Depends(require_admin)])
+async def start_request_sampling(request: ProfilingRequest):
+    """Profile a random fraction of requests until max_requests or the duration is reached"""
+    request_profiler.arm(request.sample_rate, request.max_requests, request.duration_seconds)
+    return await get_profiling_status()
+
+@app.delete("/api/admin/profiling", dependencies=[Depends(require_admin)])
+async def stop_request_sampling(clear: bool = False):
+    """Stop sampling requests, optionally discarding the stored profiles"""
+    request_profiler.disarm()
+    if clear:
+        request_profiler.profiles.clear()
+    return await get_profiling_status()
+
+@app.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_request_profile(profile_id: str, format: str = "tree", min_fraction: float = 0.005):
+    """A request profile as a call tree (JSON) or as folded stacks for flamegraph tools"""
+    profile = request_profiler.profiles.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse("".join(f"{stack} {count}\n" for stack, count in profile["samples"].items()))
+    if format != "tree":
+        raise HTTPException(status_code=400, detail="format must be 'tree' or 'folded'")
+    return {
+        **RequestProfiler.summary(profile),
+        "sample_interval_ms": request_profiler.interval * 1000,
+        "call_tree": RequestProfiler.call_tree(profile["samples"], min_fraction)
+    }
+
+@app.get("/api/admin/memory", dependencies=[Depends(require_admin)])
+async def get_memory_usage():
+    """Estimated retained memory per subsystem, sampled so it stays cheap on large registers"""
+    return {
+        "subsystems": memory_by_subsystem(),
+        "sample_size": MEMORY_SAMPLE_SIZE,
+        "tracing": memory_tracer.tracing
+    }
+
+@app.post("/api/admin/memory/tracing", dependencies=[Depends(require_admin)])
+async def start_memory_tracing(request: MemoryTracingRequest):
+    """Start tracemalloc so snapshots can attribute new allocations"""
+    memory_tracer.start(request.frames)
+    return {"tracing": True, "frames": tracemalloc.get_traceback_limit()}
+
+@app.delete("/api/admin/memory/tracing", dependencies=[Depends(require_admin)])
+async def stop_memory_tracing():
+    """Stop tracemalloc and drop its traces"""
+    memory_tracer.stop()
+    return {"tracing": False}
+
+@app.get("/api/admin/memory/snapshot", dependencies=[Depends(require_admin)])
+async def get_memory_snapshot(limit: int = 20):
+    """Allocations traced since tracing started, grouped by subsystem, with growth since the last snapshot"""
+    if not memory_tracer.tracing:
+        raise HTTPException(status_code=409, detail="Memory tracing is off; POST /api/admin/memory/tracing first")
+    return await asyncio.to_thread(memory_tracer.snapshot, limit)
+
+class TracingSettingsRequest(BaseModel):
+    sample_rate: float = Field(..., ge=0, le=1)
+
+def _tracing_status() -> Dict[str, Any]:
+    return {
+        "sample_rate": tracer.sample_rate,
+        "trust_parent": tracer.trust_parent,
+        "export_path": tracer.export_path,
+        "otlp_endpoint": tracer.otlp_endpoint or None,
+        "queued_spans": len(tracer.finished),
+        "spans": {result: int(count) for (result,), count in TRACE_SPANS.values.items()}
+    }
+
+@app.get("/api/admin/tracing", dependencies=[Depends(require_admin)])
+async def get_tracing_settings():
+    """Trace sampling rate and exporter state"""
+    return _tracing_status()
+
+@app.put("/api/admin/tracing", dependencies=[Depends(require_admin)])
+async def update_tracing_settings(request: TracingSettingsRequest):
+    """Change the fraction of new traces that record spans, without a restart"""
+    tracer.sample_rate = request.sample_rate
+    return _tracing_status()
 
 if __name__ == "__main__":
     import uvicorn
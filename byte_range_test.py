@@ -0,0 +1,138 @@
+"""
+Byte-range download tests for RAIDMASTER Multi-AI API
+Checks _parse_byte_range on its own, then Range, If-None-Match and If-Range handling
+on the upload download endpoint.
+
+Usage: python -m pytest byte_range_test.py
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("RAID_DATA_DIR", tempfile.mkdtemp(prefix="raid-data-"))
+os.environ.setdefault("RAID_UPLOAD_DIR", tempfile.mkdtemp(prefix="raid-uploads-"))
+os.environ.setdefault("AI_HEALTH_PROBE_INTERVAL", "0")
+
+from fastapi import HTTPException  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+from server import _parse_byte_range  # noqa: E402
+
+CONTENT = bytes(range(256)) * 8
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-100", (100, 100)),
+    ("BYTES = 10-19", (10, 19)),
+    ("bytes=1000-", (1000, 1999)),
+    ("bytes=1990-5000", (1990, 1999)),
+    ("bytes=-10", (1990, 1999)),
+    ("bytes=-5000", (0, 1999)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert _parse_byte_range(header, 2000) == expected
+
+@pytest.mark.parametrize("header", [
+    "items=0-10", "bytes=0-10,20-30", "bytes=a-b", "bytes=-", "bytes=", "bytes=10-5",
+    "bytes=--5", "bytes=+5-9", "bytes=\u00b2-",
+])
+def test_ignored_ranges(header):
+    assert _parse_byte_range(header, 2000) is None
+
+@pytest.mark.parametrize("header, size", [("bytes=2000-", 2000), ("bytes=5000-6000", 2000), ("bytes=-0", 2000),
+                                          ("bytes=0-", 0)])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(HTTPException) as raised:
+        _parse_byte_range(header, size)
+    assert raised.value.status_code == 416
+    assert raised.value.headers == {"content-range": f"bytes */{size}"}
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+@pytest.fixture(scope="module")
+def upload(client):
+    response = client.post("/api/upload", files={"file": ("data.bin", CONTENT, "application/octet-stream")})
+    assert response.status_code == 200
+    file_metadata = response.json()["file"]
+    return f"/api/upload/{file_metadata['id']}", f'"{hashlib.sha256(CONTENT).hexdigest()}"'
+
+def test_full_download_advertises_ranges(client, upload):
+    url, etag = upload
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["etag"] == etag
+    assert response.headers["accept-ranges"] == "bytes"
+
+@pytest.mark.parametrize("header, start, end", [("bytes=10-19", 10, 19), ("bytes=2000-", 2000, 2047),
+                                                ("bytes=-48", 2000, 2047)])
+def test_range_is_206_with_content_range(client, upload, header, start, end):
+    url, _ = upload
+    response = client.get(url, headers={"range": header})
+    assert response.status_code == 206
+    assert response.content == CONTENT[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+def test_unsatisfiable_range_is_416(client, upload):
+    url, _ = upload
+    response = client.get(url, headers={"range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+def test_multiple_ranges_send_the_whole_file(client, upload):
+    url, _ = upload
+    response = client.get(url, headers={"range": "bytes=0-1,5-6"})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+@pytest.mark.parametrize("if_none_match", ["match", "*", 'W/match', '"other", match'])
+def test_if_none_match_is_304(client, upload, if_none_match):
+    url, etag = upload
+    response = client.get(url, headers={"if-none-match": if_none_match.replace("match", etag)})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+def test_if_none_match_with_other_etag_sends_the_file(client, upload):
+    url, _ = upload
+    response = client.get(url, headers={"if-none-match": '"other"'})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+def test_if_range_with_current_etag_is_partial(client, upload):
+    url, etag = upload
+    response = client.get(url, headers={"range": "bytes=0-9", "if-range": etag})
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+
+@pytest.mark.parametrize("if_range", ['"stale"', "Mon, 01 Jan 2001 00:00:00 GMT"])
+def test_stale_if_range_sends_the_whole_file(client, upload, if_range):
+    url, _ = upload
+    response = client.get(url, headers={"range": "bytes=0-9", "if-range": if_range})
+    assert response.status_code == 200
+    assert response.content == CONTENT
+
+def test_if_range_with_current_date_is_partial(client, upload):
+    url, _ = upload
+    last_modified = client.get(url).headers["last-modified"]
+    response = client.get(url, headers={"range": "bytes=0-9", "if-range": last_modified})
+    assert response.status_code == 206
+    assert response.content == CONTENT[:10]
+
+def test_head_ignores_range(client, upload):
+    url, _ = upload
+    response = client.head(url, headers={"range": "bytes=0-9"})
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == str(len(CONTENT))
@@ -0,0 +1,113 @@
+"""
+Spreadsheet import splitting tests for RAIDMASTER Multi-AI API
+Checks that _split_csv cuts CSV files only between whole records, even when quoted
+fields hold newlines and escaped quotes, and that segments parse with the right row numbers.
+
+Usage: python -m pytest csv_import_test.py
+"""
+
+import csv
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("RAID_DATA_DIR", tempfile.mkdtemp(prefix="raid-data-"))
+os.environ.setdefault("RAID_UPLOAD_DIR", tempfile.mkdtemp(prefix="raid-uploads-"))
+
+from server import _import_csv_segment, _split_csv, spreadsheet_importer  # noqa: E402
+
+HEADER = ["Type", "Title", "Description\n(details)", "Priority"]
+RECORDS = [
+    ["Risk", "Vendor delay", "Line one\nline two\nline three", "P1"],
+    ["Issue", 'Said "late"', 'Quoted "word"\non the next line', "2"],
+    ["Assumption", "Plain", "No newline", "P3"],
+    ["Nonsense", "Bad type", 'Starts\n"quoted"\nin the middle', "P2"],
+    ["Dependency", "Multi\nline title", "", "P0"],
+    ["Risk", "Last", "Trailing\n", "P2"],
+]
+DEFAULTS = {"workstream": "Delivery", "owner": "pm"}
+SOURCE = {"reference": "import:test", "note": "Imported from test"}
+
+def write_csv(path: str, records, lineterminator: str = "\r\n"):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator=lineterminator)
+        writer.writerow(HEADER)
+        writer.writerows(records)
+
+@pytest.fixture(params=["\r\n", "\n"], ids=["crlf", "lf"])
+def csv_path(request, tmp_path):
+    path = str(tmp_path / "items.csv")
+    write_csv(path, RECORDS, request.param)
+    return path
+
+def read_segment(path: str, start: int, end: int) -> list:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return list(csv.reader(io.StringIO(f.read(end - start).decode("utf-8"), newline="")))
+
+@pytest.mark.parametrize("rows_per_segment", [1, 2, 3, 4, 100])
+def test_segments_hold_whole_records(csv_path, rows_per_segment):
+    header, segments = _split_csv(csv_path, rows_per_segment)
+    assert header == HEADER
+
+    expected_count = -(-len(RECORDS) // rows_per_segment)
+    assert len(segments) == expected_count
+    assert segments[-1][1] == os.path.getsize(csv_path)
+    for (_, end, _), (next_start, _, _) in zip(segments, segments[1:]):
+        assert end == next_start
+
+    parsed = []
+    for start, end, first_row in segments:
+        records = read_segment(csv_path, start, end)
+        assert first_row == len(parsed) + 2
+        assert 0 < len(records) <= rows_per_segment
+        parsed.extend(records)
+    assert parsed == RECORDS
+
+def test_header_only_file_has_no_segments(tmp_path):
+    path = str(tmp_path / "empty.csv")
+    write_csv(path, [])
+    assert _split_csv(path, 10) == (HEADER, [])
+
+def test_blank_lines_keep_row_numbers(tmp_path):
+    path = str(tmp_path / "blank.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        f.write('Type,Title\nRisk,"a\nb"\n\nNonsense,c\n')
+    columns = spreadsheet_importer.map_columns(["Type", "Title"], None)
+
+    header, segments = _split_csv(path, 1)
+    assert [first_row for _, _, first_row in segments] == [2, 3, 4]
+    errors = [error for start, end, first_row in segments
+              for error in _import_csv_segment(path, start, end, first_row, columns, DEFAULTS, True, SOURCE)["errors"]]
+    assert [error["row"] for error in errors] == [4]
+
+@pytest.mark.parametrize("rows_per_segment", [1, 2, 4])
+def test_segment_rows_and_error_rows_follow_records(csv_path, rows_per_segment):
+    header, segments = _split_csv(csv_path, rows_per_segment)
+    columns = spreadsheet_importer.map_columns(header, {"Description\n(details)": "description"})
+    assert columns == ["type", "title", "description", "priority"]
+
+    results = [_import_csv_segment(csv_path, start, end, first_row, columns, DEFAULTS, True, SOURCE)
+               for start, end, first_row in segments]
+    assert sum(result["rows"] for result in results) == len(RECORDS)
+    errors = [error for result in results for error in result["errors"]]
+    assert [error["row"] for error in errors] == [5]
+    assert errors[0]["errors"][0]["field"] == "type"
+
+def test_segment_builds_items_with_multiline_fields(csv_path):
+    header, segments = _split_csv(csv_path, 2)
+    columns = spreadsheet_importer.map_columns(header, {"Description\n(details)": "description"})
+    start, end, first_row = segments[0]
+
+    result = _import_csv_segment(csv_path, start, end, first_row, columns, DEFAULTS, False, SOURCE)
+    items = [item for item, _ in result["items"]]
+    assert [item["title"] for item in items] == ["Vendor delay", 'Said "late"']
+    assert items[0]["description"] == "Line one\nline two\nline three"
+    assert items[1]["description"] == 'Quoted "word"\non the next line'
+    assert items[1]["priority"] == "P2"
+    assert all("import:test" in item["references"] for item in items)
@@ -0,0 +1,100 @@
+"""
+AI reply parser tests for RAIDMASTER Multi-AI API
+Checks parse_ai_reply against the malformed-reply corpus, whole and streamed in chunks,
+and that replies deviating from the expected schema are normalized or flagged as repaired.
+
+Usage: python -m pytest parser_test.py
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("RAID_DATA_DIR", tempfile.mkdtemp(prefix="raid-data-"))
+os.environ.setdefault("RAID_UPLOAD_DIR", tempfile.mkdtemp(prefix="raid-uploads-"))
+
+from server import JSONObjectExtractor, parse_ai_reply  # noqa: E402
+
+with open(os.path.join(BACKEND_DIR, "benchmarks", "fixtures", "malformed_replies.json"), encoding="utf-8") as f:
+    CORPUS = json.load(f)
+
+def reply(**fields) -> str:
+    return json.dumps({"analysis": "a", "suggestedPriority": "P2", "confidence": 0.6, **fields})
+
+def parse_chunked(text: str, chunk_size: int):
+    extractor = JSONObjectExtractor()
+    for i in range(0, len(text), chunk_size):
+        extractor.feed(text[i:i + chunk_size])
+    return parse_ai_reply(text, extractor)
+
+def assert_matches(parsed, expect: dict):
+    for key, expected in expect.items():
+        actual = len(parsed.flags) if key == "flag_count" else getattr(parsed, key)
+        if isinstance(expected, float):
+            assert actual == pytest.approx(expected), key
+        else:
+            assert actual == expected, key
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_corpus(case):
+    assert_matches(parse_ai_reply(case["reply"]), case["expect"])
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64])
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_corpus_streamed(case, chunk_size):
+    assert_matches(parse_chunked(case["reply"], chunk_size), case["expect"])
+
+def test_flag_list_is_normalized():
+    parsed = parse_ai_reply(reply(flags=["Missing owner", {"code": "STALE", "severity": "URGENT"}, 3, None]))
+    assert parsed.flags == [
+        {"code": "NOTE", "message": "Missing owner", "severity": "medium"},
+        {"code": "STALE", "message": "", "severity": "medium"},
+    ]
+    assert parsed.parse_status == "ok"
+
+def test_bare_string_flags_become_one_note():
+    parsed = parse_ai_reply(reply(flags="oops"))
+    assert parsed.flags == [{"code": "NOTE", "message": "oops", "severity": "medium"}]
+    assert parsed.parse_status == "ok"
+
+@pytest.mark.parametrize("flags", [{"code": "X", "message": "y"}, 3, True, 1.5])
+def test_flags_of_other_types_are_a_repair(flags):
+    parsed = parse_ai_reply(reply(flags=flags))
+    assert parsed.flags == []
+    assert parsed.parse_status == "repaired"
+
+@pytest.mark.parametrize("flags", [None, [], ""])
+def test_empty_flags(flags):
+    parsed = parse_ai_reply(reply(flags=flags))
+    assert parsed.flags == []
+    assert parsed.parse_status == "ok"
+
+@pytest.mark.parametrize("value, expected", [(0.82, 0.82), ("75%", 0.75), (82, 0.82), (-1, 0.0), (250, 1.0),
+                                             ("high", 0.75)])
+def test_confidence_is_clamped(value, expected):
+    assert parse_ai_reply(reply(confidence=value)).confidence == pytest.approx(expected)
+
+@pytest.mark.parametrize("priority, expected", [("p1", "P1"), (" P0 ", "P0"), ("P9", "P2"), (None, "P2"), (1, "P2")])
+def test_priority_is_validated(priority, expected):
+    assert parse_ai_reply(reply(suggestedPriority=priority)).suggestedPriority == expected
+
+@pytest.mark.parametrize("status, expected", [("in progress", "In Progress"), ("Done", None), (7, None)])
+def test_status_is_validated(status, expected):
+    assert parse_ai_reply(reply(suggestedStatus=status)).suggestedStatus == expected
+
+def test_mutated_replies_never_raise():
+    rng = random.Random(1234)
+    for case in CORPUS:
+        for _ in range(50):
+            text = case["reply"]
+            i = rng.randint(0, len(text))
+            text = rng.choice([text[:i], text[:i] + rng.choice('{}"\\,:[]') + text[i:], text[:i] + text[i + 1:]])
+            parsed = parse_ai_reply(text)
+            assert parsed.parse_status in ("ok", "repaired", "fallback", "error")
+            assert 0.0 <= parsed.confidence <= 1.0
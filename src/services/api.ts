@@ -504,9 +504,35 @@ class APIService {
     }
   }
 
-  // Generate executive summary (mock for now)
+  // Generate executive summary of the given items, falling back to local counts
   async generateExecutiveSummary(items: RAIDItem[]): Promise<string> {
-    // This could be extended to use AI for executive summary generation
+    try {
+      const response = await fetch(`${this.baseUrl}/ai/executive-summary`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        // The caller has already filtered the set, so keep any closed items it chose
+        body: JSON.stringify({ items, include_closed: true }),
+      });
+
+      if (!response.ok) {
+        throw new Error(`Executive summary failed: ${response.statusText}`);
+      }
+
+      const result: { summary: string; highlights: string[] } = await response.json();
+      let summary = `Executive Summary\n\n${result.summary}\n`;
+      if (result.highlights.length > 0) {
+        summary += `\n`;
+        result.highlights.forEach(highlight => {
+          summary += `- ${highlight}\n`;
+        });
+      }
+      return summary;
+    } catch (error) {
+      console.error('Executive summary error:', error);
+    }
+
     const total = items.length;
     const byType = items.reduce((acc, item) => {
       acc[item.type] = (acc[item.type] || 0) + 1;
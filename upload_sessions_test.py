@@ -0,0 +1,172 @@
+"""
+Resumable upload session tests for RAIDMASTER Multi-AI API
+Drives chunked upload sessions through the API: out-of-order chunks, missing chunks,
+length and checksum failures, declared-hash mismatches, the hash-only shortcut for
+content already attached to the same item, and completion racing chunk writes.
+
+Usage: python -m pytest upload_sessions_test.py
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault("RAID_DATA_DIR", tempfile.mkdtemp(prefix="raid-data-"))
+os.environ.setdefault("RAID_UPLOAD_DIR", tempfile.mkdtemp(prefix="raid-uploads-"))
+os.environ.setdefault("AI_HEALTH_PROBE_INTERVAL", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import server  # noqa: E402
+
+CHUNK_SIZE = server.UploadSessionStore.MIN_CHUNK_SIZE
+CONTENT = os.urandom(CHUNK_SIZE * 2 + 1000)
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def item_id(client):
+    response = client.post("/api/raid-items", json={
+        "type": "Risk", "title": "Vendor delay", "description": "Vendor may slip", "status": "Open",
+        "priority": "P1", "impact": "High", "likelihood": "Medium", "workstream": "Delivery", "owner": "pm"
+    })
+    return response.json()["item"]["id"]
+
+def create_session(client, content: bytes = CONTENT, **fields) -> dict:
+    response = client.post("/api/uploads/sessions", json={
+        "filename": "plan.bin", "size": len(content), "chunk_size": CHUNK_SIZE, **fields
+    })
+    assert response.status_code == 200
+    return response.json()
+
+def chunk(content: bytes, index: int) -> bytes:
+    return content[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+
+def put_chunk(client, session_id: str, index: int, data: bytes, checksum: str = None):
+    headers = {"x-chunk-sha256": checksum} if checksum else {}
+    return client.put(f"/api/uploads/sessions/{session_id}/chunks/{index}", content=data, headers=headers)
+
+def test_chunks_in_any_order_assemble_the_file(client):
+    session = create_session(client)["session"]
+    assert session["total_chunks"] == 3
+    assert session["missing"] == [0, 1, 2]
+
+    for index in (2, 0, 1):
+        assert put_chunk(client, session["id"], index, chunk(CONTENT, index)).status_code == 200
+    assert client.get(f"/api/uploads/sessions/{session['id']}").json()["missing"] == []
+
+    response = client.post(f"/api/uploads/sessions/{session['id']}/complete")
+    assert response.status_code == 200
+    file_metadata = response.json()["file"]
+    assert file_metadata["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+    assert client.get(f"/api/upload/{file_metadata['id']}").content == CONTENT
+    assert client.get(f"/api/uploads/sessions/{session['id']}").status_code == 404
+
+def test_complete_with_missing_chunks_is_409(client):
+    session = create_session(client)["session"]
+    put_chunk(client, session["id"], 1, chunk(CONTENT, 1))
+
+    response = client.post(f"/api/uploads/sessions/{session['id']}/complete")
+    assert response.status_code == 409
+    assert response.json()["detail"]["missing"] == [0, 2]
+
+def test_resent_chunk_overwrites_the_previous_one(client):
+    session = create_session(client)["session"]
+    put_chunk(client, session["id"], 0, os.urandom(CHUNK_SIZE))
+    for index in range(3):
+        put_chunk(client, session["id"], index, chunk(CONTENT, index))
+
+    response = client.post(f"/api/uploads/sessions/{session['id']}/complete")
+    assert response.json()["file"]["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+
+@pytest.mark.parametrize("index", [-1, 3])
+def test_chunk_index_out_of_range_is_400(client, index):
+    session = create_session(client)["session"]
+    assert put_chunk(client, session["id"], index, b"x").status_code == 400
+
+def test_chunk_with_wrong_length_is_400(client):
+    session = create_session(client)["session"]
+    response = put_chunk(client, session["id"], 0, chunk(CONTENT, 0)[:-1])
+    assert response.status_code == 400
+    assert client.get(f"/api/uploads/sessions/{session['id']}").json()["missing"] == [0, 1, 2]
+
+def test_chunk_over_its_length_is_413(client):
+    session = create_session(client)["session"]
+    assert put_chunk(client, session["id"], 2, chunk(CONTENT, 2) + b"extra").status_code == 413
+
+def test_chunk_checksum_mismatch_is_400_and_not_recorded(client):
+    session = create_session(client)["session"]
+    data = chunk(CONTENT, 0)
+    assert put_chunk(client, session["id"], 0, data, checksum="0" * 64).status_code == 400
+    assert client.get(f"/api/uploads/sessions/{session['id']}").json()["missing"] == [0, 1, 2]
+    assert put_chunk(client, session["id"], 0, data, checksum=hashlib.sha256(data).hexdigest().upper()).status_code == 200
+
+def test_declared_hash_mismatch_is_422_and_discards_the_session(client):
+    session = create_session(client, sha256=hashlib.sha256(b"something else").hexdigest())["session"]
+    for index in range(3):
+        put_chunk(client, session["id"], index, chunk(CONTENT, index))
+
+    assert client.post(f"/api/uploads/sessions/{session['id']}/complete").status_code == 422
+    assert client.get(f"/api/uploads/sessions/{session['id']}").status_code == 404
+
+def test_hash_only_shortcut_needs_the_content_on_the_same_item(client, item_id):
+    content = os.urandom(5000)
+    sha256 = hashlib.sha256(content).hexdigest()
+    assert client.post(f"/api/upload?item_id={item_id}", files={"file": ("a.bin", content)}).status_code == 200
+
+    other_item = client.post("/api/raid-items", json={
+        "type": "Issue", "title": "Other", "description": "Other", "status": "Open", "priority": "P2",
+        "impact": "Low", "likelihood": "Low", "workstream": "Delivery", "owner": "pm"
+    }).json()["item"]["id"]
+    for claimed_for in (None, other_item):
+        response = create_session(client, content, sha256=sha256, item_id=claimed_for)
+        assert response["status"] == "pending"
+
+    assert create_session(client, content, sha256=sha256.upper(), size=len(content) + 1,
+                          item_id=item_id)["status"] == "pending"
+    response = create_session(client, content, sha256=sha256, item_id=item_id)
+    assert response["status"] == "complete"
+    assert response["deduplicated"] is True
+    assert response["file"]["item_ids"] == [item_id]
+
+def test_session_for_unknown_item_is_404(client):
+    response = client.post("/api/uploads/sessions", json={"filename": "a", "size": 10, "item_id": "missing"})
+    assert response.status_code == 404
+
+def test_complete_while_a_chunk_is_being_written_is_409(client):
+    session = create_session(client)["session"]
+    for index in range(3):
+        put_chunk(client, session["id"], index, chunk(CONTENT, index))
+
+    server.upload_sessions.writers[session["id"]] = 1
+    try:
+        assert client.post(f"/api/uploads/sessions/{session['id']}/complete").status_code == 409
+    finally:
+        del server.upload_sessions.writers[session["id"]]
+    assert client.post(f"/api/uploads/sessions/{session['id']}/complete").status_code == 200
+
+def test_chunk_while_completing_is_409_and_after_completion_404(client):
+    session = create_session(client)["session"]
+    for index in range(3):
+        put_chunk(client, session["id"], index, chunk(CONTENT, index))
+
+    server.upload_sessions.completing.add(session["id"])
+    try:
+        assert put_chunk(client, session["id"], 0, chunk(CONTENT, 0)).status_code == 409
+    finally:
+        server.upload_sessions.completing.discard(session["id"])
+    assert client.post(f"/api/uploads/sessions/{session['id']}/complete").status_code == 200
+    assert put_chunk(client, session["id"], 0, chunk(CONTENT, 0)).status_code == 404
+
+def test_aborted_session_rejects_chunks(client):
+    session = create_session(client)["session"]
+    assert client.delete(f"/api/uploads/sessions/{session['id']}").status_code == 200
+    assert put_chunk(client, session["id"], 0, chunk(CONTENT, 0)).status_code == 404